@@ -0,0 +1,56 @@
+"""denormalised user ids
+
+Revision ID: b7a2c4e9f318
+Revises: 5e1d8b2f6a90
+Create Date: 2026-10-18 12:31:48.905127
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b7a2c4e9f318"
+down_revision: Union[str, None] = "5e1d8b2f6a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        UPDATE account
+        SET user_id = user_institution_link.user_id
+        FROM user_institution_link
+        WHERE account.user_institution_link_id = user_institution_link.id
+        """)
+    op.alter_column("account", "user_id", existing_type=sa.INTEGER(), nullable=False)
+
+    op.add_column("transaction", sa.Column("user_id", sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE transaction
+        SET user_id = account.user_id
+        FROM account
+        WHERE transaction.account_id = account.id
+        """)
+    op.alter_column(
+        "transaction", "user_id", existing_type=sa.INTEGER(), nullable=False
+    )
+    op.create_foreign_key(None, "transaction", "user", ["user_id"], ["id"])
+    op.create_index(
+        "ix_transaction_user_id_timestamp_id",
+        "transaction",
+        ["user_id", "timestamp", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transaction_user_id_timestamp_id", table_name="transaction")
+    op.drop_constraint("transaction_user_id_fkey", "transaction", type_="foreignkey")
+    op.drop_column("transaction", "user_id")
+    op.alter_column("account", "user_id", existing_type=sa.INTEGER(), nullable=True)
+    op.execute(
+        "UPDATE account SET user_id = NULL WHERE user_institution_link_id IS NOT NULL"
+    )
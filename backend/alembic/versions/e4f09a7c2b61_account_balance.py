@@ -0,0 +1,40 @@
+"""account balance
+
+Revision ID: e4f09a7c2b61
+Revises: b7a2c4e9f318
+Create Date: 2026-10-18 13:14:22.671938
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e4f09a7c2b61"
+down_revision: Union[str, None] = "b7a2c4e9f318"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("account", sa.Column("balance", sa.Numeric(), nullable=True))
+    op.execute("""
+        UPDATE account
+        SET balance = COALESCE(
+            (
+                SELECT transaction.account_balance
+                FROM transaction
+                WHERE transaction.account_id = account.id
+                ORDER BY transaction.timestamp DESC, transaction.id DESC
+                LIMIT 1
+            ),
+            account.initial_balance
+        )
+        """)
+    op.alter_column("account", "balance", existing_type=sa.Numeric(), nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("account", "balance")
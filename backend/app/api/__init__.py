@@ -15,8 +15,6 @@
 
 from logging import getLogger
 from fastapi import APIRouter
-from fastapi import BackgroundTasks
-from app.database.deps import DBSession
 from app import handlers
 from app.schemas.webhook import WebhookReq
 from app.utils import include_package_routes
@@ -27,7 +25,7 @@ logger = getLogger(__name__)
 
 
 @router.post("/webhook")
-def webhook(req: WebhookReq, background_tasks: BackgroundTasks, db: DBSession) -> None:
+def webhook(req: WebhookReq) -> None:
     name = f"handle_{req.webhook_type.lower()}_{req.webhook_code.lower()}"
     try:
         handler = getattr(handlers, name)
@@ -36,7 +34,7 @@ def webhook(req: WebhookReq, background_tasks: BackgroundTasks, db: DBSession) -
             "%s/%s currently not supported", req.webhook_type, req.webhook_code
         )
         return
-    background_tasks.add_task(handler, req)
+    handler(req)
 
 
 include_package_routes(router, __name__, __path__)
@@ -23,14 +23,14 @@ from sqlalchemy.exc import NoResultFound
 
 from app.crud.account import CRUDAccount, CRUDSyncableAccount
 from app.crud.institution import CRUDSyncableInstitution
+from app.crud.job import CRUDJob
+from app.crud.plstatement import CRUDPLStatement
 from app.crud.replacementpattern import CRUDReplacementPattern
 from app.crud.transaction import CRUDSyncableTransaction, CRUDTransaction
-from app.crud.user import CRUDUser
 from app.crud.userinstitutionlink import CRUDSyncableUserInstitutionLink
-from app.database.deps import DBSession
+from app.database.deps import DBSession, get_peak_checked_out, get_pools
 from app.deps.user import CurrentSuperuser
 from app.plaid.account import fetch_accounts
-from app.plaid.category import get_all_plaid_categories
 from app.plaid.transaction import (
     reset_transaction_to_metadata as _reset_transaction_to_metadata,
 )
@@ -39,21 +39,77 @@ from app.plaid.userinstitutionlink import (
     fetch_user_institution_link,
     update_item_webhook,
 )
+from app.schemas.account import AccountBalanceCheckApiOut
+from app.schemas.cache import CacheMetricsApiOut
+from app.schemas.job import JobApiOut
+from app.schemas.pool import PoolMetricsApiOut
 from app.schemas.transaction import TransactionPlaidIn, TransactionPlaidOut
 from app.schemas.userinstitutionlink import UserInstitutionLinkPlaidOut
+from app.settings import settings
+from app.utils.cache import get_caches
 
 router = APIRouter()
 
 
 @router.put("/accounts/update-balances")
-def accounts_update_balances(db: DBSession, me: CurrentSuperuser) -> None:
-    for account in CRUDAccount.read_many(db):
-        CRUDAccount.update_balance(db, account.id)
+def accounts_update_balances(db: DBSession, me: CurrentSuperuser) -> JobApiOut:
+    return CRUDJob.enqueue(
+        db,
+        "update_account_balances",
+        user_id=me.id,
+        dedup_key="update_account_balances",
+    )
+
+
+@router.get("/accounts/check-balances")
+def accounts_check_balances(
+    db: DBSession, me: CurrentSuperuser
+) -> Iterable[AccountBalanceCheckApiOut]:
+    return CRUDAccount.check_balances(db)
+
+
+@router.put("/analytics/rebuild-rollup")
+def analytics_rebuild_rollup(db: DBSession, me: CurrentSuperuser) -> None:
+    CRUDPLStatement.rebuild_rollups(db)
+
+
+@router.get("/analytics/check-rollup")
+def analytics_check_rollup(db: DBSession, me: CurrentSuperuser) -> Iterable[int]:
+    return CRUDPLStatement.check_rollups(db)
+
+
+@router.get("/cache/metrics")
+def cache_metrics(me: CurrentSuperuser) -> Iterable[CacheMetricsApiOut]:
+    for cache in get_caches():
+        yield CacheMetricsApiOut(
+            name=cache.name,
+            size=len(cache),
+            hits=cache.hits,
+            misses=cache.misses,
+            invalidations=cache.invalidations,
+        )
+
+
+@router.get("/database/pools")
+def database_pools(me: CurrentSuperuser) -> Iterable[PoolMetricsApiOut]:
+    # Per process, each uvicorn worker has its own pools
+    for name, pool in get_pools().items():
+        yield PoolMetricsApiOut(
+            name=name,
+            size=pool.size(),
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            peak_checked_out=get_peak_checked_out(name),
+        )
 
 
 @router.put("/categories/sync")
-def cateogries_sync(db: DBSession, me: CurrentSuperuser) -> None:
-    get_all_plaid_categories(db)
+def cateogries_sync(db: DBSession, me: CurrentSuperuser) -> JobApiOut:
+    return CRUDJob.enqueue(
+        db, "sync_categories", user_id=me.id, dedup_key="sync_categories"
+    )
 
 
 @router.put("/transactions/orphan-only-children")
@@ -69,12 +125,13 @@ def set_default_buckets(db: DBSession, me: CurrentSuperuser) -> None:
 @router.put("/transactions/update-amounts-default-currency")
 def update_transactions_amount_default_currency(
     db: DBSession, me: CurrentSuperuser
-) -> None:
-    for u in CRUDUser.read_many(db):
-        for a in CRUDAccount.read_many(db, user_id=u.id):
-            CRUDAccount.update_transactions_amount_default_currency(
-                db, a.id, u.default_currency_code
-            )
+) -> JobApiOut:
+    return CRUDJob.enqueue(
+        db,
+        "update_transactions_amount_default_currency",
+        user_id=me.id,
+        dedup_key="update_transactions_amount_default_currency",
+    )
 
 
 @router.get("/transactions/{transaction_id}")
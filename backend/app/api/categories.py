@@ -14,14 +14,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-from typing import Iterable
+from typing import Annotated, Iterable
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Response, status
 
 from app.crud.category import CRUDCategory
 from app.database.deps import DBSession
 from app.deps.user import CurrentUser
 from app.schemas.category import CategoryApiOut
+from app.utils.common import etag_matches, get_cache_control
 
 router = APIRouter()
 
@@ -34,3 +35,23 @@ def read(db: DBSession, me: CurrentUser, category_id: int) -> CategoryApiOut:
 @router.get("/")
 def read_many(db: DBSession, me: CurrentUser) -> Iterable[CategoryApiOut]:
     return CRUDCategory.read_many(db)
+
+
+@router.get(
+    "/{category_id}/icon",
+    responses={200: {"content": {"image/png": {}}}},
+    response_class=Response,
+)
+def read_icon(
+    db: DBSession,
+    category_id: int,
+    v: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    icon_hash = CRUDCategory.read_icon_hash(db, category_id)
+    etag = f'"{icon_hash}"'
+    headers = {"ETag": etag, "Cache-Control": get_cache_control(icon_hash, v)}
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    icon = CRUDCategory.read_icon(db, category_id)
+    return Response(icon, media_type="image/png", headers=headers)
@@ -20,6 +20,7 @@ from decimal import Decimal
 import requests
 from fastapi import APIRouter, HTTPException, status
 
+from app.database.deps import DBSession
 from app.utils.exchangerate import get_exchange_rate
 
 router = APIRouter()
@@ -28,8 +29,10 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/")
-def read_exchange_rate(from_currency: str, to_currency: str, date: date) -> Decimal:
+def read_exchange_rate(
+    db: DBSession, from_currency: str, to_currency: str, date: date
+) -> Decimal:
     try:
-        return get_exchange_rate(from_currency, to_currency, date)
+        return get_exchange_rate(db, from_currency, to_currency, date)
     except requests.HTTPError as e:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -13,15 +13,16 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from typing import Iterable
+from typing import Annotated, Iterable
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Response, status
 
 from app.crud.institution import CRUDInstitution, CRUDSyncableInstitution
 from app.database.deps import DBSession
 from app.deps.user import CurrentSuperuser
 from app.plaid.institution import fetch_institution
 from app.schemas.institution import InstitutionApiIn, InstitutionApiOut
+from app.utils.common import etag_matches, get_cache_control
 
 INSTITUTIONS = "institutions"
 
@@ -54,6 +55,28 @@ def read_many(db: DBSession) -> Iterable[InstitutionApiOut]:
     return CRUDInstitution.read_many(db)
 
 
+@router.get(
+    "/{institution_id}/logo",
+    responses={200: {"content": {"image/png": {}}}},
+    response_class=Response,
+)
+def read_logo(
+    db: DBSession,
+    institution_id: int,
+    v: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    logo_hash = CRUDInstitution.read_logo_hash(db, institution_id)
+    if not logo_hash:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    etag = f'"{logo_hash}"'
+    headers = {"ETag": etag, "Cache-Control": get_cache_control(logo_hash, v)}
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    logo = CRUDInstitution.read_logo(db, institution_id)
+    return Response(logo, media_type="image/png", headers=headers)
+
+
 @router.put("/{institution_id}/sync")
 def sync(db: DBSession, me: CurrentSuperuser, institution_id: int) -> InstitutionApiOut:
     institution_db = CRUDSyncableInstitution.read(db, id=institution_id)
@@ -19,7 +19,7 @@ from fastapi import APIRouter
 
 from app.crud.account import CRUDAccount
 from app.crud.userinstitutionlink import CRUDUserInstitutionLink
-from app.database.deps import DBSession
+from app.database.deps import AsyncDBSession, DBSession
 from app.deps.user import CurrentUser
 from app.exceptions.userinstitutionlink import SyncedEntity
 from app.schemas.account import AccountApiIn, AccountApiOut
@@ -29,8 +29,10 @@ router = APIRouter()
 
 
 @router.get("/")
-def read_many(db: DBSession, me: CurrentUser) -> Iterable[AccountApiOut]:
-    return CRUDAccount.read_many(db, user_id=me.id)
+async def read_many(db: AsyncDBSession, me: CurrentUser) -> Iterable[AccountApiOut]:
+    return await db.run_sync(
+        lambda session: list(CRUDAccount.read_many(session, user_id=me.id))
+    )
 
 
 @router.post("/")
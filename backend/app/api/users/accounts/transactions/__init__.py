@@ -14,9 +14,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from itertools import islice
 from typing import Annotated, Iterable
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    UploadFile,
+    status,
+)
 
 from app.crud.account import CRUDAccount
 from app.crud.transaction import CRUDTransaction
@@ -43,15 +52,17 @@ def preview(
     me: CurrentUser,
     account_id: int,
     file: Annotated[UploadFile, File(...)],
+    limit: Annotated[int | None, Query(ge=1)] = None,
 ) -> Iterable[TransactionApiIn]:
     deserialiser = CRUDTransactionDeserialiser.read(
         db, user_id=me.id, account_id=account_id
     )
     account_out = CRUDAccount.read(db, user_id=me.id, id=account_id)
     try:
-        yield from get_transactions_from_csv(
+        transactions = get_transactions_from_csv(
             deserialiser, file.file, account_out.id, account_out.default_bucket_id
         )
+        yield from islice(transactions, limit)
     except Exception as e:
         raise UnknownError(e)
 
@@ -17,19 +17,20 @@ import mimetypes
 from typing import Annotated, Iterable
 
 from fastapi import APIRouter, File as _File, UploadFile
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 
 from app.crud.file import CRUDFile
 from app.crud.transaction import CRUDTransaction
 from app.database.deps import DBSession
 from app.deps.user import CurrentUser
 from app.schemas.file import FileApiIn, FileApiOut
+from app.utils.storage import iter_chunks
 
 router = APIRouter()
 
 
 @router.post("/")
-async def create(
+def create(
     db: DBSession,
     me: CurrentUser,
     account_id: int,
@@ -41,9 +42,10 @@ async def create(
         id=transaction_id,
         user_id=me.id,
     )
-    data = await file.read()
-    file_in = FileApiIn(data=data, name=file.filename)
-    return CRUDFile.create(db, file_in, transaction_id=transaction_id)
+    file_in = FileApiIn(name=file.filename)
+    return CRUDFile.upload(
+        db, file_in, iter_chunks(file.file), transaction_id=transaction_id
+    )
 
 
 @router.get("/")
@@ -61,7 +63,7 @@ def read_many(
     responses={
         200: {"content": {"application/octet-stream": {}}},
     },
-    response_class=Response,
+    response_class=StreamingResponse,
 )
 def read(
     db: DBSession,
@@ -69,15 +71,18 @@ def read(
     account_id: int,
     transaction_id: int,
     file_id: int,
-) -> Response:
+) -> StreamingResponse:
     CRUDTransaction.read(db, id=transaction_id, user_id=me.id)
     file_out = CRUDFile.read(db, id=file_id)
     headers = {"Content-Disposition": f"attachment; filename={file_out.name}"}
     mime_type, _ = mimetypes.guess_type(file_out.name)
     if mime_type:
         headers.update({"Content-Type": mime_type})
+    headers.update({"Content-Length": str(file_out.size)})
     data = CRUDFile.read_data(db, file_id)
-    return Response(data, headers=headers, media_type="application/octet-stream")
+    return StreamingResponse(
+        data, headers=headers, media_type="application/octet-stream"
+    )
 
 
 @router.delete("/{file_id}")
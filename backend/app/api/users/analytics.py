@@ -19,7 +19,7 @@ from typing import Iterable, Literal
 from fastapi import APIRouter
 
 from app.crud.plstatement import CRUDPLStatement
-from app.database.deps import DBSession
+from app.database.deps import AsyncDBSession
 from app.deps.user import CurrentUser
 from app.schemas.transactiongroup import DetailedPLStatementApiOut, PLStatementApiOut
 
@@ -27,15 +27,15 @@ router = APIRouter()
 
 
 @router.get("/detailed/{timestamp__ge}/{timestamp__lt}")
-def get_detailed_pl_statement(
-    db: DBSession,
+async def get_detailed_pl_statement(
+    db: AsyncDBSession,
     me: CurrentUser,
     timestamp__ge: date,
     timestamp__lt: date,
     bucket_id: int | None = None,
 ) -> DetailedPLStatementApiOut:
-    return CRUDPLStatement.get_detailed_pl_statement(
-        db,
+    return await db.run_sync(
+        CRUDPLStatement.get_detailed_pl_statement,
         user_id=me.id,
         timestamp__ge=timestamp__ge,
         timestamp__lt=timestamp__lt,
@@ -43,20 +43,47 @@ def get_detailed_pl_statement(
     )
 
 
+@router.get("/detailed/")
+async def get_many_detailed_pl_statements(
+    db: AsyncDBSession,
+    me: CurrentUser,
+    aggregate_by: Literal["yearly", "quarterly", "monthly", "weekly", "daily"],
+    timestamp__ge: date,
+    timestamp__lt: date,
+    bucket_id: int | None = None,
+) -> Iterable[DetailedPLStatementApiOut]:
+    return await db.run_sync(
+        lambda session: list(
+            CRUDPLStatement.get_many_detailed_pl_statements(
+                session,
+                user_id=me.id,
+                aggregate_by=aggregate_by,
+                timestamp__ge=timestamp__ge,
+                timestamp__lt=timestamp__lt,
+                bucket_id=bucket_id,
+            )
+        )
+    )
+
+
 @router.get("/")
-def get_many_pl_statements(
-    db: DBSession,
+async def get_many_pl_statements(
+    db: AsyncDBSession,
     me: CurrentUser,
     aggregate_by: Literal["yearly", "quarterly", "monthly", "weekly", "daily"],
     bucket_id: int | None = None,
     page: int = 0,
     per_page: int = 12,
 ) -> Iterable[PLStatementApiOut]:
-    return CRUDPLStatement.get_many_pl_statements(
-        db,
-        user_id=me.id,
-        bucket_id=bucket_id,
-        aggregate_by=aggregate_by,
-        page=page,
-        per_page=per_page,
+    return await db.run_sync(
+        lambda session: list(
+            CRUDPLStatement.get_many_pl_statements(
+                session,
+                user_id=me.id,
+                bucket_id=bucket_id,
+                aggregate_by=aggregate_by,
+                page=page,
+                per_page=per_page,
+            )
+        )
     )
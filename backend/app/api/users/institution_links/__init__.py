@@ -20,6 +20,7 @@ from sqlalchemy.exc import NoResultFound
 
 from app.crud.account import CRUDSyncableAccount
 from app.crud.institution import CRUDSyncableInstitution
+from app.crud.job import CRUDJob
 from app.crud.userinstitutionlink import (
     CRUDSyncableUserInstitutionLink,
     CRUDUserInstitutionLink,
@@ -30,6 +31,7 @@ from app.plaid.account import fetch_accounts
 from app.plaid.common import create_link_token, exchange_public_token
 from app.plaid.institution import fetch_institution
 from app.plaid.userinstitutionlink import fetch_user_institution_link
+from app.schemas.job import JobApiOut
 from app.schemas.userinstitutionlink import (
     UserInstitutionLinkApiIn,
     UserInstitutionLinkApiOut,
@@ -113,6 +115,16 @@ def read_many(db: DBSession, me: CurrentUser) -> Iterable[UserInstitutionLinkApi
     return CRUDUserInstitutionLink.read_many(db, user_id=me.id)
 
 
+@router.put("/sync")
+def sync_all(db: DBSession, me: CurrentUser) -> JobApiOut:
+    return CRUDJob.enqueue(
+        db,
+        "sync_user_institution_links",
+        user_id=me.id,
+        dedup_key=f"sync_user_institution_links:{me.id}",
+    )
+
+
 @router.put("/{user_institution_link_id}")
 def update(
     db: DBSession,
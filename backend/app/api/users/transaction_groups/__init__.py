@@ -17,9 +17,11 @@ from typing import Iterable
 
 from fastapi import APIRouter
 
+from app.crud.job import CRUDJob
 from app.crud.transactiongroup import CRUDTransactionGroup
 from app.database.deps import DBSession
 from app.deps.user import CurrentUser
+from app.schemas.job import JobApiOut
 from app.schemas.transactiongroup import (
     TransactionGroupApiIn,
     TransactionGroupApiOut,
@@ -35,7 +37,7 @@ def merge(
 ) -> TransactionGroupApiOut:
     for transaction_group_id in transaction_group_ids:
         CRUDTransactionGroup.read(db, id=transaction_group_id, user_id=me.id)
-    return CRUDTransactionGroup.merge(db, transaction_group_ids)
+    return CRUDTransactionGroup.merge(db, transaction_group_ids, me.id)
 
 
 @router.get("/")
@@ -57,8 +59,13 @@ def read(
 
 
 @router.put("/")
-def update_all(db: DBSession, me: CurrentUser) -> None:
-    CRUDTransactionGroup.update_all(db, user_id=me.id)
+def update_all(db: DBSession, me: CurrentUser) -> JobApiOut:
+    return CRUDJob.enqueue(
+        db,
+        "update_transaction_groups",
+        user_id=me.id,
+        dedup_key=f"update_transaction_groups:{me.id}",
+    )
 
 
 @router.put("/{transaction_group_id}")
@@ -69,7 +76,9 @@ def update(
     transaction_group_in: TransactionGroupApiIn,
 ) -> TransactionGroupApiOut:
     CRUDTransactionGroup.read(db, id=transaction_group_id, user_id=me.id)
-    return CRUDTransactionGroup.update(db, transaction_group_id, transaction_group_in)
+    return CRUDTransactionGroup.update(
+        db, transaction_group_id, transaction_group_in, user_id=me.id
+    )
 
 
 @router.delete("/{transaction_group_id}")
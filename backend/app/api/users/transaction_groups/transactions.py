@@ -47,7 +47,7 @@ def add(
     for transaction_id in transaction_ids:
         CRUDTransaction.read(db, id=transaction_id, user_id=me.id)
     return CRUDTransactionGroup.add_transactions(
-        db, transaction_group_id, transaction_ids
+        db, transaction_group_id, transaction_ids, me.id
     )
 
 
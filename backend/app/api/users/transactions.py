@@ -17,14 +17,17 @@ import logging
 from decimal import Decimal
 from typing import Iterable
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
 from app.crud.consolidatedtransaction import CRUDConsolidatedTransaction
 from app.crud.transaction import CRUDTransaction
 from app.crud.transactiongroup import CRUDTransactionGroup
-from app.database.deps import DBSession
+from app.database.deps import AsyncDBSession, DBSession
 from app.deps.user import CurrentUser
-from app.schemas.transaction import TransactionApiOut, TransactionQueryArg
+from app.schemas.transaction import (
+    ConsolidatedTransactionQueryArg,
+    TransactionApiOut,
+)
 from app.schemas.transactiongroup import TransactionGroupApiIn, TransactionGroupApiOut
 
 logger = logging.getLogger(__name__)
@@ -32,18 +35,22 @@ router = APIRouter()
 
 
 @router.get("/")
-def read_many(
-    db: DBSession,
+async def read_many(
+    db: AsyncDBSession,
     me: CurrentUser,
+    response: Response,
     consolidate: bool = False,
-    arg: TransactionQueryArg = Depends(),
+    arg: ConsolidatedTransactionQueryArg = Depends(),
 ) -> Iterable[TransactionApiOut | TransactionGroupApiOut]:
-    return CRUDConsolidatedTransaction.read_many(
-        db,
+    transactions_out, next_cursor = await db.run_sync(
+        CRUDConsolidatedTransaction.read_page,
         user_id=me.id,
         consolidate=consolidate,
         **arg.model_dump(exclude_none=True),
     )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return transactions_out
 
 
 @router.post("/")
@@ -59,6 +66,6 @@ def consolidate(
             name = transaction_out.name
     transaction_group_in = TransactionGroupApiIn(name=name)
     transaction_group_out = CRUDTransactionGroup.create(
-        db, transaction_group_in, transaction_ids=transaction_ids
+        db, transaction_group_in, transaction_ids=transaction_ids, user_id=me.id
     )
     return TransactionGroupApiOut.model_validate(transaction_group_out)
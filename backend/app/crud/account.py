@@ -17,7 +17,7 @@ from datetime import date
 from decimal import Decimal
 from typing import Any, Generic, Iterable, Type
 
-from sqlalchemy import Select
+from sqlalchemy import Select, func, insert, select
 from sqlalchemy.orm import Session
 
 from app.crud.common import (
@@ -25,6 +25,7 @@ from app.crud.common import (
     InSchemaT,
     OutSchemaT,
 )
+from app.crud.plstatement import CRUDPLStatement
 from app.crud.transaction import CRUDSyncableTransaction, CRUDTransaction
 from app.models.account import (
     Account,
@@ -33,13 +34,14 @@ from app.models.account import (
     Depository,
     InstitutionalAccount,
     Loan,
-    NonInstitutionalAccount,
     PersonalLedger,
     Property,
 )
+from app.models.transaction import Transaction
 from app.models.userinstitutionlink import UserInstitutionLink
 from app.schemas.account import (
     AccountApiOut,
+    AccountBalanceCheckApiOut,
     AccountApiIn,
     AccountPlaidIn,
     AccountPlaidOut,
@@ -70,7 +72,7 @@ from app.schemas.transaction import (
     TransactionApiOut,
     TransactionPlaidIn,
 )
-from app.utils.exchangerate import get_exchange_rate
+from app.utils.exchangerate import get_exchange_rate, get_exchange_rates
 
 logger = logging.getLogger(__name__)
 
@@ -92,11 +94,7 @@ class __CRUDAccountBase(
     ) -> Select[tuple[Account]]:
         statement = super().select(**kwargs)
         if user_id:
-            statement = statement.outerjoin(UserInstitutionLink)
-            statement = statement.where(
-                (NonInstitutionalAccount.user_id == user_id)
-                | (UserInstitutionLink.user_id == user_id)
-            )
+            statement = statement.where(Account.user_id == user_id)
         if user_institution_link_id:
             statement = statement.where(
                 InstitutionalAccount.user_institution_link_id
@@ -109,10 +107,20 @@ class __CRUDAccountBase(
     def model_validate(cls, account: Account) -> OutSchemaT:
         return cls.__out_schemas__[type(account)].model_validate(account)
 
+    @classmethod
+    def __set_user_id(cls, db: Session, kwargs: dict[str, Any]) -> None:
+        # Institutional accounts are owned by the owner of their link
+        if user_institution_link_id := kwargs.get("user_institution_link_id"):
+            kwargs["user_id"] = UserInstitutionLink.read(
+                db, id__eq=user_institution_link_id
+            ).user_id
+
     @classmethod
     def create(cls, db: Session, obj_in: InSchemaT, **kwargs: Any) -> OutSchemaT:
+        cls.__set_user_id(db, kwargs)
+        values = obj_in.model_dump()
         obj = cls.__in_schemas__[type(obj_in)].create(
-            db, **obj_in.model_dump(), **kwargs
+            db, **values, balance=values["initial_balance"], **kwargs
         )
         return cls.model_validate(obj)
 
@@ -120,6 +128,7 @@ class __CRUDAccountBase(
     def update(
         cls, db: Session, id: int, obj_in: InSchemaT, **kwargs: Any
     ) -> OutSchemaT:
+        cls.__set_user_id(db, kwargs)
         account_out = super().update(db, id, obj_in, **kwargs)
         cls.update_balance(db, id)
         return account_out
@@ -134,6 +143,24 @@ class __CRUDAccountBase(
         CRUDTransaction.update_account_balances(db, id, timestamp)
         return cls.read(db, id__eq=id)
 
+    @classmethod
+    def check_balances(cls, db: Session) -> Iterable[AccountBalanceCheckApiOut]:
+        expected_balance = Account.initial_balance + func.coalesce(
+            func.sum(Transaction.amount), 0
+        )
+        statement = (
+            select(
+                Account.id,
+                Account.balance,
+                expected_balance.label("expected_balance"),
+            )
+            .outerjoin(Transaction, Transaction.account_id == Account.id)
+            .group_by(Account.id)
+            .having(Account.balance != expected_balance)
+        )
+        for row in db.execute(statement):
+            yield AccountBalanceCheckApiOut.model_validate(row, from_attributes=True)
+
     @classmethod
     def create_many_transactions(
         cls,
@@ -142,25 +169,67 @@ class __CRUDAccountBase(
         transactions: list[TransactionApiIn],
         default_currency_code: CurrencyCode,
     ) -> Iterable[TransactionApiOut]:
-        min_timestamp = None
-        account_out = CRUDAccount.read(db, id=account_id)
+        if not transactions:
+            return []
+        account = Account.read(db, id__eq=account_id)
+
+        # Resolve everything needed before writing anything
+        currency_pair = (account.currency_code, default_currency_code)
+        exchange_rates = get_exchange_rates(
+            db, {t.timestamp: {currency_pair} for t in transactions}
+        )
+        transactions = sorted(transactions, key=lambda t: t.timestamp)
+        min_timestamp = transactions[0].timestamp
+
+        statement = Transaction.select(
+            account_id__eq=account_id,
+            timestamp__le=min_timestamp,
+            order_by="timestamp__desc",
+        )
+        prev_transaction = db.scalars(statement).first()
+        if prev_transaction:
+            account_balance = prev_transaction.account_balance
+        else:
+            account_balance = account.initial_balance
+        statement = Transaction.select(
+            account_id__eq=account_id, timestamp__gt=min_timestamp
+        )
+        has_later_transactions = db.scalars(statement).first() is not None
+
+        # Running balances, in the order they are inserted (timestamp, id)
+        values = []
         for transaction_in in transactions:
-            if min_timestamp:
-                min_timestamp = min(transaction_in.timestamp, min_timestamp)
-            else:
-                min_timestamp = transaction_in.timestamp
-            yield CRUDTransaction.create(
-                db,
-                transaction_in,
-                account_id=account_id,
-                account_balance=Decimal(0),
-                exchange_rate=get_exchange_rate(
-                    account_out.currency_code,
-                    default_currency_code,
-                    transaction_in.timestamp,
-                ),
+            account_balance += transaction_in.amount
+            exchange_rate = exchange_rates[(transaction_in.timestamp, *currency_pair)]
+            values.append(
+                {
+                    **transaction_in.model_dump(),
+                    "account_id": account_id,
+                    "user_id": account.user_id,
+                    "account_balance": account_balance,
+                    "amount_default_currency": Transaction.get_amount_default_currency(
+                        transaction_in.amount, exchange_rate
+                    ),
+                }
             )
-        CRUDAccount.update_balance(db, account_id, min_timestamp)
+        insert_statement = insert(Transaction).returning(
+            Transaction, sort_by_parameter_order=True
+        )
+        transactions_out = [
+            CRUDTransaction.model_validate(transaction)
+            for transaction in db.scalars(insert_statement, values)
+        ]
+
+        # Bulk inserts bypass the flush events
+        CRUDPLStatement.mark_rollup_dirty(
+            db, account.user_id, (t.timestamp for t in transactions)
+        )
+
+        if has_later_transactions:
+            CRUDTransaction.defer_account_balances_update(db, account_id, min_timestamp)
+        else:
+            account.balance = account_balance
+        return transactions_out
 
     @classmethod
     def create_transaction_plaid(
@@ -177,12 +246,15 @@ class __CRUDAccountBase(
             account_id=account_id,
             account_balance=Decimal(0),
             exchange_rate=get_exchange_rate(
+                db,
                 account_out.currency_code,
                 default_currency_code,
                 transaction_in.timestamp,
             ),
         )
-        CRUDAccount.update_balance(db, account_id, transaction_in.timestamp)
+        CRUDTransaction.defer_account_balances_update(
+            db, account_id, transaction_in.timestamp
+        )
         return transaction_out
 
     @classmethod
@@ -202,12 +274,15 @@ class __CRUDAccountBase(
             account_id=account_id,
             account_balance=Decimal(0),
             exchange_rate=get_exchange_rate(
+                db,
                 account_out.currency_code,
                 default_currency_code,
                 transaction_in.timestamp,
             ),
         )
-        cls.update_balance(db, account_id, transaction_in.timestamp)
+        CRUDTransaction.defer_account_balances_update(
+            db, account_id, transaction_in.timestamp
+        )
         return transaction_out
 
     @classmethod
@@ -221,6 +296,7 @@ class __CRUDAccountBase(
         transaction_group_id: int | None = None,
     ) -> TransactionApiOut:
         account_out = CRUDAccount.read(db, id=account_id)
+        prev_timestamp = Transaction.read(db, id__eq=transaction_id).timestamp
         transaction_out = CRUDTransaction.update(
             db,
             transaction_id,
@@ -228,13 +304,16 @@ class __CRUDAccountBase(
             account_id=account_id,
             account_balance=Decimal(0),
             exchange_rate=get_exchange_rate(
+                db,
                 account_out.currency_code,
                 default_currency_code,
                 transaction_in.timestamp,
             ),
             transaction_group_id=transaction_group_id,
         )
-        CRUDAccount.update_balance(db, account_id, transaction_in.timestamp)
+        CRUDTransaction.defer_account_balances_update(
+            db, account_id, min(prev_timestamp, transaction_in.timestamp)
+        )
         return transaction_out
 
     @classmethod
@@ -242,10 +321,19 @@ class __CRUDAccountBase(
         cls, db: Session, account_id: int, default_currency_code: CurrencyCode
     ) -> None:
         account = Account.read(db, id__eq=account_id)
+        currency_pair = (account.currency_code, default_currency_code)
+        timestamps = db.scalars(
+            select(Transaction.timestamp)
+            .where(Transaction.account_id == account_id)
+            .distinct()
+        )
+        exchange_rates = get_exchange_rates(
+            db, {timestamp: {currency_pair} for timestamp in timestamps}
+        )
         for transaction in db.scalars(account.transactions.select()).yield_per(50):
-            transaction.exchange_rate = get_exchange_rate(
-                account.currency_code, default_currency_code, transaction.timestamp
-            )
+            transaction.exchange_rate = exchange_rates[
+                (transaction.timestamp, *currency_pair)
+            ]
 
 
 class CRUDAccount(__CRUDAccountBase[AccountApiOut, AccountApiIn]):
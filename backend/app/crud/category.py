@@ -15,6 +15,8 @@
 
 from typing import Generic
 
+from sqlalchemy.orm import Session
+
 from app.crud.common import CRUDBase, InSchemaT, OutSchemaT
 from app.models.category import Category
 from app.schemas.category import (
@@ -23,6 +25,7 @@ from app.schemas.category import (
     CategoryPlaidIn,
     CategoryPlaidOut,
 )
+from app.utils.cache import get_cache
 
 
 class __CRUDCategoryBase(
@@ -30,6 +33,15 @@ class __CRUDCategoryBase(
     CRUDBase[Category, OutSchemaT, InSchemaT],
 ):
     __model__ = Category
+    __cache__ = get_cache(Category.__tablename__)
+
+    @classmethod
+    def read_icon_hash(cls, db: Session, id: int) -> str:
+        return Category.read(db, id__eq=id).icon_hash
+
+    @classmethod
+    def read_icon(cls, db: Session, id: int) -> bytes:
+        return Category.read(db, id__eq=id).icon
 
 
 class CRUDCategory(
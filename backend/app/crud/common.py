@@ -14,15 +14,17 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import Generic, Type, TypeVar, Iterable, Any
+from typing import Generic, Hashable, Type, TypeVar, Iterable, Any
 
 from fastapi import HTTPException, status
-from sqlalchemy import Select
+from sqlalchemy import Select, event
 from sqlalchemy.exc import NoResultFound, IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, SessionTransaction
 
+from app.models.cachegeneration import CacheGeneration
 from app.models.common import Base
 from app.schemas.common import ApiOutMixin, ApiInMixin
+from app.utils.cache import TTLCache, get_cache
 
 ModelT = TypeVar("ModelT", bound=Base)
 InSchemaT = TypeVar("InSchemaT", bound=ApiInMixin)
@@ -32,9 +34,61 @@ OutSchemaT = TypeVar("OutSchemaT", bound=ApiOutMixin)
 logger = logging.getLogger(__name__)
 
 
+def get_current_cache(db: Session, cache: TTLCache) -> TTLCache | None:
+    # The cache, emptied first if another process has written since. None
+    # while this session has uncommitted writes, which must not be cached
+    if cache.name in db.info.get("invalidated_caches", ()):
+        return None
+    if cache.is_generation_stale():
+        cache.set_generation(CacheGeneration.get(db, cache.name))
+    return cache
+
+
+def invalidate_cache(db: Session, cache: TTLCache) -> None:
+    # Bumping the generation makes the other processes drop their copies,
+    # this one drops its copy once the write is committed
+    CacheGeneration.bump(db, cache.name)
+    db.info.setdefault("invalidated_caches", set()).add(cache.name)
+
+
+@event.listens_for(Session, "after_commit")
+def clear_invalidated_caches(db: Session) -> None:
+    for name in db.info.pop("invalidated_caches", ()):
+        get_cache(name).clear()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def discard_invalidated_caches(db: Session, transaction: SessionTransaction) -> None:
+    # Rolled back, the caches are still up to date
+    if transaction.parent is None:
+        db.info.pop("invalidated_caches", None)
+
+
 class CRUDBase(Generic[ModelT, OutSchemaT, InSchemaT]):
     __model__: Type[ModelT]
     __out_schema__: Type[OutSchemaT]
+    # Opt-in read-through cache, for rarely written data
+    __cache__: TTLCache | None = None
+
+    @classmethod
+    def get_current_cache(cls, db: Session) -> TTLCache | None:
+        if cls.__cache__ is None:
+            return None
+        return get_current_cache(db, cls.__cache__)
+
+    @classmethod
+    def __get_cache_key(cls, method: str, kwargs: dict[str, Any]) -> Hashable | None:
+        key = (cls, method, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    @classmethod
+    def invalidate_cache(cls, db: Session) -> None:
+        if cls.__cache__ is not None:
+            invalidate_cache(db, cls.__cache__)
 
     @classmethod
     def select(cls, **kwargs: Any) -> Select[tuple[ModelT]]:
@@ -52,11 +106,19 @@ class CRUDBase(Generic[ModelT, OutSchemaT, InSchemaT]):
         **kwargs: Any,
     ) -> OutSchemaT:
         obj = cls.__model__.create(db, **obj_in.model_dump(), **kwargs)
+        cls.invalidate_cache(db)
         obj_out: OutSchemaT = cls.model_validate(obj)
         return obj_out
 
     @classmethod
     def read(cls, db: Session, **kwargs: Any) -> OutSchemaT:
+        cache = cls.get_current_cache(db)
+        key = cls.__get_cache_key("read", kwargs) if cache is not None else None
+        if cache is not None and key is not None:
+            obj_out: OutSchemaT | None = cache.get(key)
+            if obj_out is not None:
+                return obj_out
+            epoch = cache.epoch
         statement = cls.select(**kwargs)
         try:
             obj = db.scalars(statement).one()
@@ -65,10 +127,24 @@ class CRUDBase(Generic[ModelT, OutSchemaT, InSchemaT]):
                 status.HTTP_404_NOT_FOUND,
                 detail=f"{cls.__model__.__tablename__} not found for args {kwargs}",
             )
-        return cls.model_validate(obj)
+        obj_out = cls.model_validate(obj)
+        if cache is not None and key is not None:
+            cache.set(key, obj_out, epoch)
+        return obj_out
 
     @classmethod
     def read_many(cls, db: Session, **kwargs: Any) -> Iterable[OutSchemaT]:
+        cache = cls.get_current_cache(db)
+        key = cls.__get_cache_key("read_many", kwargs) if cache is not None else None
+        if cache is not None and key is not None:
+            objs_out: list[OutSchemaT] | None = cache.get(key)
+            if objs_out is None:
+                epoch = cache.epoch
+                statement = cls.select(**kwargs)
+                objs_out = [cls.model_validate(s) for s in db.scalars(statement)]
+                cache.set(key, objs_out, epoch)
+            yield from objs_out
+            return
         statement = cls.select(**kwargs)
         for s in db.scalars(statement).all():
             yield cls.model_validate(s)
@@ -84,10 +160,12 @@ class CRUDBase(Generic[ModelT, OutSchemaT, InSchemaT]):
                 status.HTTP_404_NOT_FOUND,
                 detail=f"{cls.__model__.__tablename__} foreign key(s) {kwargs} not found",
             )
+        cls.invalidate_cache(db)
         obj_out: OutSchemaT = cls.model_validate(obj)
         return obj_out
 
     @classmethod
     def delete(cls, db: Session, id: int) -> int:
         cls.__model__.delete(db, id)
+        cls.invalidate_cache(db)
         return id
@@ -16,12 +16,25 @@
 
 import itertools
 import logging
-from typing import Any, Iterable
+from typing import Any, Iterable, get_args
 
-from sqlalchemy import Row, Select, func, select, case
+from fastapi import HTTPException, status
+from sqlalchemy import (
+    ColumnExpressionArgument,
+    Row,
+    Select,
+    and_,
+    case,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+    union,
+)
 from sqlalchemy.orm import Session
 
-from app.models.account import Account, NonInstitutionalAccount
+from app.models.account import Account
 from app.models.common import (
     CalculatedColumnsMeta,
     get_order_by_expressions,
@@ -29,10 +42,15 @@ from app.models.common import (
 )
 from app.models.transaction import Transaction
 from app.models.transactiongroup import TransactionGroup
-from app.models.userinstitutionlink import UserInstitutionLink
-from app.schemas.transaction import TransactionApiOut
+from app.schemas.transaction import TransactionApiOut, TransactionOrderBy
 from app.schemas.transactiongroup import TransactionGroupApiOut
-from app.utils.common import get_search_expressions
+from app.utils.common import (
+    decode_cursor,
+    encode_cursor,
+    get_search_expressions,
+    get_search_tokens,
+    parse_cursor_value,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -66,13 +84,18 @@ class CRUDConsolidatedTransaction:
         page: int = 0,
         order_by: str | None = None,
         bucket_id: int | None = None,
+        cursor: str | None = None,
         **kwargs: Any,
     ) -> Select[tuple[Any, ...]]:
         model = ConsolidatedTransaction if consolidate else Transaction
 
         exprs = get_where_expressions(model, **kwargs)
         if search:
-            exprs = itertools.chain(get_search_expressions(search, model.name))
+            exprs = itertools.chain(exprs, get_search_expressions(search, model.name))
+        if cursor:
+            order_by, value, id = cls.__decode_cursor(cursor, order_by)
+            cursor_expr = cls.__get_cursor_expression(model, order_by, value, id)
+            exprs = itertools.chain(exprs, [cursor_expr])
 
         # SELECT
         statement = select(
@@ -97,13 +120,9 @@ class CRUDConsolidatedTransaction:
         if consolidate:
             statement = statement.outerjoin(TransactionGroup)
         statement = statement.join(Account)
-        statement = statement.outerjoin(UserInstitutionLink)
 
         # WHERE
-        statement = statement.where(
-            (NonInstitutionalAccount.user_id == user_id)
-            | (UserInstitutionLink.user_id == user_id)
-        )
+        statement = statement.where(Transaction.user_id == user_id)
 
         if bucket_id:
             # the bucket id is used to "slice" transaction groups
@@ -112,6 +131,9 @@ class CRUDConsolidatedTransaction:
         if not consolidate:
             for exp in exprs:
                 statement = statement.where(exp)
+        elif search and (prefilter := cls.__get_search_prefilter(search)) is not None:
+            # Narrow the rows before grouping, HAVING still filters exactly
+            statement = statement.where(prefilter)
 
         # GROUP BY
         if consolidate:
@@ -129,11 +151,77 @@ class CRUDConsolidatedTransaction:
 
         # OFFSET and LIMIT
         if per_page:
-            offset = page * per_page
-            statement = statement.offset(offset).limit(per_page)
+            if not cursor:
+                statement = statement.offset(page * per_page)
+            statement = statement.limit(per_page)
 
         return statement
 
+    @classmethod
+    def __get_search_prefilter(
+        cls, search: str
+    ) -> ColumnExpressionArgument[bool] | None:
+        # A group is named after the group, a lone transaction after itself.
+        # Each branch can use the trigram index on its own name column.
+        positive_tokens, _ = get_search_tokens(search)
+        if not positive_tokens:
+            return None
+        transaction_ids = union(
+            select(Transaction.id).where(
+                Transaction.transaction_group_id.is_(None),
+                or_(*(Transaction.name.ilike(f"%{t}%") for t in positive_tokens)),
+            ),
+            select(Transaction.id)
+            .join(TransactionGroup)
+            .where(
+                or_(*(TransactionGroup.name.ilike(f"%{t}%") for t in positive_tokens))
+            ),
+        )
+        return Transaction.id.in_(transaction_ids)
+
+    @classmethod
+    def __decode_cursor(
+        cls, cursor: str, order_by: str | None
+    ) -> tuple[str, str | None, int]:
+        try:
+            cursor_order_by, value, id = decode_cursor(
+                cursor, get_args(TransactionOrderBy)
+            )
+        except ValueError:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        if order_by and order_by != cursor_order_by:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST, detail="Cursor is for another order"
+            )
+        return cursor_order_by, value, id
+
+    @classmethod
+    def __get_cursor_expression(
+        cls, model: Any, order_by: str, value: str | None, id: int
+    ) -> ColumnExpressionArgument[bool]:
+        # Keyset pagination: rows strictly after the last (value, id) returned.
+        # NULLs sort as the largest value, see get_order_by_expressions.
+        attr, op = order_by.split("__")
+        column = getattr(model, attr)
+        if value is None:
+            if op == "desc":
+                return or_(and_(column.is_(None), model.id < id), column.is_not(None))
+            return and_(column.is_(None), model.id > id)
+        try:
+            last_value = parse_cursor_value(value, column.type.python_type)
+        except ValueError:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        keyset = tuple_(column, model.id)
+        last_keyset = tuple_(literal(last_value, column.type), literal(id))
+        if op == "desc":
+            return keyset < last_keyset
+        return or_(keyset > last_keyset, column.is_(None))
+
+    @classmethod
+    def get_cursor(cls, transaction: Row[tuple[Any, ...]], order_by: str) -> str:
+        attr, _ = order_by.split("__")
+        return encode_cursor(order_by, getattr(transaction, attr), transaction.id)
+
     @classmethod
     def model_validate(
         cls, transaction: Row[tuple[Any, ...]]
@@ -174,6 +262,27 @@ class CRUDConsolidatedTransaction:
         for transaction in db.execute(cls.select(**kwargs)):
             yield cls.model_validate(transaction)
 
+    @classmethod
+    def read_page(
+        cls,
+        db: Session,
+        *,
+        per_page: int = 0,
+        order_by: str | None = None,
+        cursor: str | None = None,
+        **kwargs: Any,
+    ) -> tuple[list[TransactionApiOut | TransactionGroupApiOut], str | None]:
+        if cursor:
+            order_by, _, _ = cls.__decode_cursor(cursor, order_by)
+        statement = cls.select(
+            per_page=per_page, order_by=order_by, cursor=cursor, **kwargs
+        )
+        transactions = db.execute(statement).all()
+        next_cursor = None
+        if order_by and per_page and len(transactions) == per_page:
+            next_cursor = cls.get_cursor(transactions[-1], order_by)
+        return [cls.model_validate(t) for t in transactions], next_cursor
+
     @classmethod
     def read(
         cls, db: Session, **kwargs: Any
@@ -13,17 +13,22 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from typing import Any
+import logging
+from typing import Any, Iterable, Iterator
 
-from sqlalchemy import Select
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from sqlalchemy import Select, event, func, select
+from sqlalchemy.orm import Session, UOWTransaction
 
 from app.crud.common import CRUDBase
-from app.models.account import Account, NonInstitutionalAccount
 from app.models.file import File
 from app.models.transaction import Transaction
-from app.models.userinstitutionlink import UserInstitutionLink
 from app.schemas.file import FileApiIn, FileApiOut
+from app.utils.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+STORAGE_LOCK_NAMESPACE = 0x626C62
 
 
 class CRUDFile(CRUDBase[File, FileApiOut, FileApiIn]):
@@ -35,14 +40,66 @@ class CRUDFile(CRUDBase[File, FileApiOut, FileApiIn]):
         statement = super().select(**kwargs)
         if user_id:
             statement = statement.join(Transaction)
-            statement = statement.join(Account)
-            statement = statement.outerjoin(UserInstitutionLink)
-            statement = statement.where(
-                (NonInstitutionalAccount.user_id == user_id)
-                | (UserInstitutionLink.user_id == user_id)
-            )
+            statement = statement.where(Transaction.user_id == user_id)
         return statement
 
     @classmethod
-    def read_data(cls, db: Session, file_id: int) -> bytes:
-        return File.read(db, id__eq=file_id).data
+    def __lock_data(cls, db: Session, storage_key: str) -> None:
+        # Held until commit, so that a blob is never deleted while an upload of
+        # the same content is still uncommitted
+        if db.get_bind().dialect.name == "postgresql":
+            lock_id = int(storage_key[:7], 16)
+            statement = select(
+                func.pg_advisory_xact_lock(STORAGE_LOCK_NAMESPACE, lock_id)
+            )
+            db.execute(statement)
+
+    @classmethod
+    def upload(
+        cls, db: Session, obj_in: FileApiIn, data: Iterable[bytes], **kwargs: Any
+    ) -> FileApiOut:
+        storage_key, size = get_storage().put(
+            data, lambda storage_key: cls.__lock_data(db, storage_key)
+        )
+        return cls.create(db, obj_in, storage_key=storage_key, size=size, **kwargs)
+
+    @classmethod
+    def read_data(cls, db: Session, file_id: int) -> Iterator[bytes]:
+        # Opened here, so that a missing blob is a 404 rather than a
+        # response that is cut short once it has started streaming
+        statement = select(File.storage_key).where(File.id == file_id)
+        try:
+            return get_storage().open(db.scalars(statement).one())
+        except FileNotFoundError:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, detail=f"data not found for file {file_id}"
+            )
+
+    @classmethod
+    def mark_data_unreferenced(cls, db: Session, storage_keys: Iterable[str]) -> None:
+        db.info.setdefault("unreferenced_storage_keys", set()).update(storage_keys)
+
+    @classmethod
+    def delete_unreferenced_data(cls, db: Session) -> None:
+        # Runs after commit, blobs shared with other files are kept. Each key
+        # is checked under the lock that uploads hold until they commit
+        storage_keys = db.info.pop("unreferenced_storage_keys", set())
+        if not storage_keys:
+            return
+        for storage_key in sorted(storage_keys):
+            cls.__lock_data(db, storage_key)
+            statement = select(File.id).where(File.storage_key == storage_key)
+            if db.scalars(statement.limit(1)).first() is not None:
+                continue
+            try:
+                get_storage().delete(storage_key)
+            except Exception as e:
+                logger.error("Could not delete blob %s: %s", storage_key, e)
+        db.commit()
+
+
+@event.listens_for(Session, "after_flush")
+def mark_data_unreferenced(db: Session, flush_context: UOWTransaction) -> None:
+    storage_keys = [obj.storage_key for obj in db.deleted if isinstance(obj, File)]
+    if storage_keys:
+        CRUDFile.mark_data_unreferenced(db, storage_keys)
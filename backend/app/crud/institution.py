@@ -15,6 +15,8 @@
 
 from typing import Generic
 
+from sqlalchemy.orm import Session
+
 from app.crud.common import CRUDBase, InSchemaT, OutSchemaT
 from app.models.institution import Institution
 from app.schemas.institution import (
@@ -23,12 +25,22 @@ from app.schemas.institution import (
     InstitutionPlaidIn,
     InstitutionPlaidOut,
 )
+from app.utils.cache import get_cache
 
 
 class __CRUDInstitutionBase(
     Generic[OutSchemaT, InSchemaT], CRUDBase[Institution, OutSchemaT, InSchemaT]
 ):
     __model__ = Institution
+    __cache__ = get_cache(Institution.__tablename__)
+
+    @classmethod
+    def read_logo_hash(cls, db: Session, id: int) -> str | None:
+        return Institution.read(db, id__eq=id).logo_hash
+
+    @classmethod
+    def read_logo(cls, db: Session, id: int) -> bytes | None:
+        return Institution.read(db, id__eq=id).logo
 
 
 class CRUDInstitution(
@@ -0,0 +1,55 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Any
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.crud.common import CRUDBase
+from app.models.job import Job
+from app.schemas.job import JobApiIn, JobApiOut
+
+
+class CRUDJob(
+    CRUDBase[Job, JobApiOut, JobApiIn],
+):
+    __model__ = Job
+    __out_schema__ = JobApiOut
+
+    @classmethod
+    def enqueue(
+        cls,
+        db: Session,
+        name: str,
+        user_id: int,
+        dedup_key: str | None = None,
+        **args: Any,
+    ) -> JobApiOut:
+        statement = Job.select(dedup_key__eq=dedup_key, status__eq=Job.QUEUED)
+        if dedup_key and (job := db.scalars(statement).first()):
+            return cls.model_validate(job)
+        try:
+            with db.begin_nested():
+                return cls.create(
+                    db,
+                    JobApiIn(name=name),
+                    user_id=user_id,
+                    dedup_key=dedup_key,
+                    args=args,
+                )
+        except IntegrityError:
+            # Enqueued concurrently by another request
+            return cls.model_validate(db.scalars(statement).one())
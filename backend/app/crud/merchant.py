@@ -12,10 +12,13 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from sqlalchemy.orm import Session
 
 from app.crud.common import CRUDBase
 from app.models.merchant import Merchant
 from app.schemas.merchant import MerchantApiOut, MerchantApiIn
+from app.utils.cache import get_cache
+from app.utils.merchant import MerchantMatcher
 
 
 class CRUDMerchant(
@@ -23,3 +26,18 @@ class CRUDMerchant(
 ):
     __model__ = Merchant
     __out_schema__ = MerchantApiOut
+    # Also holds the compiled matchers, dropped with the rest on any write
+    __cache__ = get_cache(Merchant.__tablename__)
+
+    @classmethod
+    def get_matcher(cls, db: Session, user_id: int) -> MerchantMatcher:
+        cache = cls.get_current_cache(db)
+        key = ("matcher", user_id)
+        matcher: MerchantMatcher | None = None if cache is None else cache.get(key)
+        if matcher is None:
+            epoch = 0 if cache is None else cache.epoch
+            statement = Merchant.select(user_id__eq=user_id)
+            matcher = MerchantMatcher((m.id, m.pattern) for m in db.scalars(statement))
+            if cache is not None:
+                cache.set(key, matcher, epoch)
+        return matcher
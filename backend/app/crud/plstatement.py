@@ -13,24 +13,52 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import itertools
 import logging
 from collections import defaultdict
 from datetime import date
 from decimal import Decimal
 from functools import wraps
-from typing import Any, Callable, Iterable, Literal, TypeVar, cast
+from typing import Any, Callable, Iterable, Literal, TypeVar, cast, get_args
 
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import ColumnElement, Select, Subquery, asc, desc, func, select, case
-from sqlalchemy.orm import Session
-
-from app.crud.consolidatedtransaction import CRUDConsolidatedTransaction
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    Row,
+    Select,
+    Subquery,
+    UnaryExpression,
+    asc,
+    case,
+    delete,
+    desc,
+    event,
+    func,
+    insert,
+    inspect,
+    literal,
+    or_,
+    select,
+)
+from sqlalchemy.orm import Session, UOWTransaction, aliased
+
+from app.crud.consolidatedtransaction import (
+    ConsolidatedTransaction,
+    CRUDConsolidatedTransaction,
+)
+from app.models.plstatementrollup import PLStatementRollup
+from app.models.transaction import Transaction
+from app.models.transactiongroup import TransactionGroup
+from app.models.user import User
 from app.schemas.transactiongroup import DetailedPLStatementApiOut, PLStatementApiOut
 
 logger = logging.getLogger(__name__)
 
 FuncT = TypeVar("FuncT", bound=Callable[..., ColumnElement[Any]])
 
+AggregateBy = Literal["yearly", "quarterly", "monthly", "weekly", "daily"]
+
 
 def labeled(func: FuncT) -> FuncT:
     @wraps(func)
@@ -150,77 +178,162 @@ class CRUDPLStatement:
         return detailed_pl_statement_query
 
     @classmethod
-    def get_many_pl_statements(
+    def select_rollup(
+        cls, *, user_id: int, bucket_id: int | None = None, **kwargs: Any
+    ) -> Select[tuple[PLStatementRollup]]:
+        return PLStatementRollup.select(
+            user_id__eq=user_id, bucket_id__eq=bucket_id or 0, **kwargs
+        )
+
+    @classmethod
+    def select_rollup_pl_statements(
         cls,
-        db: Session,
-        aggregate_by: Literal["yearly", "quarterly", "monthly", "weekly", "daily"],
+        *,
+        group_by: list[str],
+        order_by: list[str],
+        page: int,
+        per_page: int,
         **kwargs: Any,
-    ) -> Iterable[PLStatementApiOut]:
+    ) -> Select[tuple[int, int, Decimal, Decimal]]:
+        rollup_subquery = cls.select_rollup(**kwargs).subquery()
+
+        order_by_clauses: list[UnaryExpression[Any]] = []
+        for clause in order_by:
+            attr, op = clause.split("__")
+            order_by_clauses.append({"asc": asc, "desc": desc}[op](attr))
 
+        pl_statements_query = (
+            select(
+                *(func.extract(f, rollup_subquery.c.day).label(f) for f in group_by),
+                func.sum(rollup_subquery.c.expenses).label("expenses"),
+                func.sum(rollup_subquery.c.income).label("income"),
+            )
+            .group_by(*group_by)
+            .order_by(*order_by_clauses)
+        )
+
+        if per_page:
+            offset = page * per_page
+            pl_statements_query = pl_statements_query.offset(offset).limit(per_page)
+
+        return pl_statements_query
+
+    @classmethod
+    def select_rollup_detailed_pl_statement(
+        cls,
+        *,
+        timestamp__ge: date,
+        timestamp__lt: date,
+        group_by: list[str] | None = None,
+        **kwargs: Any,
+    ) -> Select[tuple[int, int, Decimal]]:
+        group_by = group_by or []
+        rollup_subquery = cls.select_rollup(
+            day__ge=timestamp__ge, day__lt=timestamp__lt, **kwargs
+        ).subquery()
+        return (
+            select(
+                *(func.extract(f, rollup_subquery.c.day).label(f) for f in group_by),
+                rollup_subquery.c.sign,
+                rollup_subquery.c.category_id,
+                func.sum(rollup_subquery.c.amount_default_currency).label(
+                    "amount_default_currency"
+                ),
+            )
+            .group_by(*group_by, "sign", "category_id")
+            .order_by(*(desc(f) for f in group_by), asc("category_id"), asc("sign"))
+        )
+
+    @classmethod
+    def __get_group_by(cls, aggregate_by: AggregateBy) -> list[str]:
+        # ISO weeks belong to the ISO year, which differs around new year
+        if aggregate_by == "weekly":
+            return ["isoyear", "week"]
         group_by = ["year"]
         match aggregate_by:
             case "quarterly":
                 group_by += ["quarter"]
             case "monthly":
                 group_by += ["month"]
+            case "daily":
+                group_by += ["month", "day"]
+        return group_by
+
+    @classmethod
+    def __get_period_length(cls, aggregate_by: AggregateBy) -> relativedelta:
+        match aggregate_by:
+            case "quarterly":
+                return relativedelta(months=3)
+            case "monthly":
+                return relativedelta(months=1)
             case "weekly":
-                group_by += ["week"]
+                return relativedelta(weeks=1)
             case "daily":
-                group_by += ["week", "day"]
-        order_by = [f"{c}__desc" for c in group_by]
+                return relativedelta(days=1)
+            case _:
+                return relativedelta(years=1)
 
-        statement = cls.select_pl_statements(
-            group_by=group_by, order_by=order_by, **kwargs
-        )
+    @classmethod
+    def __get_period_start(cls, aggregate_by: AggregateBy, day: date) -> date:
+        match aggregate_by:
+            case "quarterly":
+                return date(day.year, 1 + 3 * ((day.month - 1) // 3), 1)
+            case "monthly":
+                return date(day.year, day.month, 1)
+            case "weekly":
+                return day - relativedelta(days=day.weekday())
+            case "daily":
+                return day
+            case _:
+                return date(day.year, 1, 1)
 
-        for result in db.execute(statement):
-            expenses = result.expenses
-            income = result.income
-
-            year = int(result.year)
-
-            match aggregate_by:
-                case "quarterly":
-                    quarter = int(result.quarter)
-                    timestamp__ge = date(year, 1 + 3 * (quarter - 1), 1)
-                    timestamp__lt = timestamp__ge + relativedelta(months=3)
-                case "monthly":
-                    month = int(result.month)
-                    timestamp__ge = date(year, month, 1)
-                    timestamp__lt = timestamp__ge + relativedelta(months=1)
-                case "weekly":
-                    week = int(result.week)
-                    timestamp__ge = date.fromisocalendar(year, week, 1)
-                    timestamp__lt = timestamp__ge + relativedelta(weeks=1)
-                case "daily":
-                    month = int(result.month)
-                    day = int(result.day)
-                    timestamp__ge = date(year, month, day)
-                    timestamp__lt = timestamp__ge + relativedelta(days=1)
-                case _:
-                    timestamp__ge = date(year, 1, 1)
-                    timestamp__lt = timestamp__ge + relativedelta(years=1)
-
-            yield PLStatementApiOut(
-                timestamp__ge=timestamp__ge,
-                timestamp__lt=timestamp__lt,
-                expenses=expenses,
-                income=income,
-            )
+    @classmethod
+    def __get_period(
+        cls, aggregate_by: AggregateBy, result: Row[Any]
+    ) -> tuple[date, date]:
+        year = int(result.isoyear if aggregate_by == "weekly" else result.year)
+
+        match aggregate_by:
+            case "quarterly":
+                quarter = int(result.quarter)
+                timestamp__ge = date(year, 1 + 3 * (quarter - 1), 1)
+            case "monthly":
+                month = int(result.month)
+                timestamp__ge = date(year, month, 1)
+            case "weekly":
+                week = int(result.week)
+                timestamp__ge = date.fromisocalendar(year, week, 1)
+            case "daily":
+                month = int(result.month)
+                day = int(result.day)
+                timestamp__ge = date(year, month, day)
+            case _:
+                timestamp__ge = date(year, 1, 1)
+
+        return timestamp__ge, timestamp__ge + cls.__get_period_length(aggregate_by)
 
     @classmethod
-    def get_detailed_pl_statement(
-        cls, db: Session, timestamp__ge: date, timestamp__lt: date, **kwargs: Any
-    ) -> DetailedPLStatementApiOut:
-        statement = cls.select_detailed_pl_statement(
-            timestamp__ge=timestamp__ge, timestamp__lt=timestamp__lt, **kwargs
+    def __get_pl_statement(
+        cls, aggregate_by: AggregateBy, result: Row[Any]
+    ) -> PLStatementApiOut:
+        timestamp__ge, timestamp__lt = cls.__get_period(aggregate_by, result)
+        return PLStatementApiOut(
+            timestamp__ge=timestamp__ge,
+            timestamp__lt=timestamp__lt,
+            expenses=result.expenses,
+            income=result.income,
         )
+
+    @classmethod
+    def __get_detailed_pl_statement(
+        cls, timestamp__ge: date, timestamp__lt: date, results: Iterable[Row[Any]]
+    ) -> DetailedPLStatementApiOut:
         by_category: dict[int, dict[int, Decimal]] = defaultdict(
             lambda: defaultdict(Decimal)
         )
         totals: dict[int, Decimal] = defaultdict(Decimal)
 
-        for transaction in db.execute(statement).all():
+        for transaction in results:
             by_category[transaction.sign][
                 transaction.category_id or 0
             ] += transaction.amount_default_currency
@@ -234,3 +347,288 @@ class CRUDPLStatement:
             income=totals[1],
             expenses=totals[-1],
         )
+
+    @classmethod
+    def get_many_pl_statements(
+        cls,
+        db: Session,
+        aggregate_by: AggregateBy,
+        **kwargs: Any,
+    ) -> Iterable[PLStatementApiOut]:
+        group_by = cls.__get_group_by(aggregate_by)
+        order_by = [f"{c}__desc" for c in group_by]
+        statement = cls.select_rollup_pl_statements(
+            group_by=group_by, order_by=order_by, **kwargs
+        )
+        for result in db.execute(statement):
+            yield cls.__get_pl_statement(aggregate_by, result)
+
+    @classmethod
+    def get_detailed_pl_statement(
+        cls, db: Session, timestamp__ge: date, timestamp__lt: date, **kwargs: Any
+    ) -> DetailedPLStatementApiOut:
+        statement = cls.select_rollup_detailed_pl_statement(
+            timestamp__ge=timestamp__ge, timestamp__lt=timestamp__lt, **kwargs
+        )
+        return cls.__get_detailed_pl_statement(
+            timestamp__ge, timestamp__lt, db.execute(statement).all()
+        )
+
+    @classmethod
+    def get_many_detailed_pl_statements(
+        cls,
+        db: Session,
+        aggregate_by: AggregateBy,
+        timestamp__ge: date,
+        timestamp__lt: date,
+        **kwargs: Any,
+    ) -> Iterable[DetailedPLStatementApiOut]:
+        group_by = cls.__get_group_by(aggregate_by)
+        statement = cls.select_rollup_detailed_pl_statement(
+            timestamp__ge=timestamp__ge,
+            timestamp__lt=timestamp__lt,
+            group_by=group_by,
+            **kwargs,
+        )
+        # Rows come ordered by period, so each period is a contiguous run
+        results = db.execute(statement)
+        results_by_period: dict[date, list[Row[Any]]] = {}
+        for _, period_group in itertools.groupby(
+            results, key=lambda r: tuple(getattr(r, f) for f in group_by)
+        ):
+            period_results = list(period_group)
+            period__ge, _ = cls.__get_period(aggregate_by, period_results[0])
+            results_by_period[period__ge] = period_results
+
+        # Every period in the range, the ones without rows too, from the most
+        # recent, the first and last clipped to the range
+        if timestamp__ge >= timestamp__lt:
+            return
+        period_length = cls.__get_period_length(aggregate_by)
+        period__ge = cls.__get_period_start(
+            aggregate_by, timestamp__lt - relativedelta(days=1)
+        )
+        while period__ge + period_length > timestamp__ge:
+            yield cls.__get_detailed_pl_statement(
+                max(period__ge, timestamp__ge),
+                min(period__ge + period_length, timestamp__lt),
+                results_by_period.get(period__ge, []),
+            )
+            period__ge -= period_length
+
+    @classmethod
+    def mark_rollup_dirty(cls, db: Session, user_id: int, days: Iterable[date]) -> None:
+        dirty_days = db.info.setdefault("dirty_pl_statement_days", {})
+        dirty_days.setdefault(user_id, set()).update(days)
+
+    @classmethod
+    def mark_rollup_transactions_dirty(
+        cls,
+        db: Session,
+        transaction_ids: Iterable[int] = (),
+        transaction_group_ids: Iterable[int] = (),
+    ) -> None:
+        # The days these rows are on now, before they change, and again once
+        # the rollups are updated
+        transaction_ids = set(transaction_ids)
+        transaction_group_ids = set(transaction_group_ids)
+        db.info.setdefault("dirty_pl_statement_transactions", set()).update(
+            transaction_ids
+        )
+        db.info.setdefault("dirty_pl_statement_groups", set()).update(
+            transaction_group_ids
+        )
+        cls.__mark_days_dirty(db, transaction_ids, transaction_group_ids)
+
+    @classmethod
+    def __mark_days_dirty(
+        cls, db: Session, transaction_ids: set[int], transaction_group_ids: set[int]
+    ) -> None:
+        # A consolidated transaction is on the day of one of its transactions,
+        # whichever bucket it is sliced by
+        if not transaction_ids and not transaction_group_ids:
+            return
+        group_ids = select(Transaction.transaction_group_id).where(
+            Transaction.id.in_(transaction_ids)
+        )
+        statement = (
+            select(Transaction.user_id, Transaction.timestamp)
+            .where(
+                or_(
+                    Transaction.id.in_(transaction_ids),
+                    Transaction.transaction_group_id.in_(group_ids),
+                    Transaction.transaction_group_id.in_(transaction_group_ids),
+                )
+            )
+            .distinct()
+        )
+        days: dict[int, set[date]] = defaultdict(set)
+        with db.no_autoflush:
+            for user_id, day in db.execute(statement):
+                days[user_id].add(day)
+        for user_id, user_days in days.items():
+            cls.mark_rollup_dirty(db, user_id, user_days)
+
+    @classmethod
+    def update_dirty_rollups(cls, db: Session) -> None:
+        db.flush()
+        cls.__mark_days_dirty(
+            db,
+            db.info.pop("dirty_pl_statement_transactions", set()),
+            db.info.pop("dirty_pl_statement_groups", set()),
+        )
+        for user_id, days in db.info.pop("dirty_pl_statement_days", {}).items():
+            cls.update_rollup(db, user_id, days)
+
+    @classmethod
+    def update_rollup(cls, db: Session, user_id: int, days: Iterable[date]) -> None:
+        # Only the given days are recomputed, from the transactions that can
+        # be consolidated on them
+        days = sorted(days)
+        delete_statement = delete(PLStatementRollup).where(
+            PLStatementRollup.user_id == user_id, PLStatementRollup.day.in_(days)
+        )
+        db.execute(delete_statement)
+        bucket_ids = db.scalars(
+            select(Transaction.bucket_id)
+            .where(Transaction.user_id == user_id, Transaction.timestamp.in_(days))
+            .distinct()
+        ).all()
+        day_transaction = aliased(Transaction)
+        group_ids = select(day_transaction.transaction_group_id).where(
+            day_transaction.user_id == user_id, day_transaction.timestamp.in_(days)
+        )
+        for bucket_id in [0, *bucket_ids]:
+            transactions_query = (
+                CRUDConsolidatedTransaction.select(
+                    user_id=user_id, consolidate=True, bucket_id=bucket_id
+                )
+                .where(
+                    or_(
+                        Transaction.timestamp.in_(days),
+                        Transaction.transaction_group_id.in_(group_ids),
+                    )
+                )
+                .having(ConsolidatedTransaction.timestamp.in_(days))
+            )
+            cls.__insert_rollup(db, user_id, bucket_id, transactions_query)
+
+    @classmethod
+    def rebuild_rollup(cls, db: Session, user_id: int) -> None:
+        delete_statement = delete(PLStatementRollup).where(
+            PLStatementRollup.user_id == user_id
+        )
+        db.execute(delete_statement)
+        bucket_ids = db.scalars(
+            select(Transaction.bucket_id)
+            .where(Transaction.user_id == user_id)
+            .distinct()
+        ).all()
+        # All buckets are stored as bucket 0, then each bucket slice
+        for bucket_id in [0, *bucket_ids]:
+            transactions_query = CRUDConsolidatedTransaction.select(
+                user_id=user_id, consolidate=True, bucket_id=bucket_id
+            )
+            cls.__insert_rollup(db, user_id, bucket_id, transactions_query)
+
+    @classmethod
+    def __insert_rollup(
+        cls,
+        db: Session,
+        user_id: int,
+        bucket_id: int,
+        transactions_query: Select[tuple[Any, ...]],
+    ) -> None:
+        transactions_subquery = TransactionsSubquery(transactions_query.subquery())
+        day = transactions_subquery.timestamp
+        category_id = func.coalesce(transactions_subquery.category_id, 0)
+        sign = func.coalesce(func.sign(transactions_subquery.amount).cast(Integer), 0)
+        rollup_query = select(
+            literal(user_id),
+            literal(bucket_id),
+            day,
+            category_id,
+            sign,
+            transactions_subquery.amount_default_currency,
+            transactions_subquery.income,
+            transactions_subquery.expenses,
+        ).group_by(day, category_id, sign)
+        insert_statement = insert(PLStatementRollup).from_select(
+            [
+                "user_id",
+                "bucket_id",
+                "day",
+                "category_id",
+                "sign",
+                "amount_default_currency",
+                "income",
+                "expenses",
+            ],
+            rollup_query,
+        )
+        db.execute(insert_statement)
+
+    @classmethod
+    def rebuild_rollups(cls, db: Session) -> None:
+        for user_id in db.scalars(select(User.id)):
+            cls.rebuild_rollup(db, user_id)
+
+    @classmethod
+    def check_rollups(cls, db: Session) -> Iterable[int]:
+        for user_id in db.scalars(select(User.id)):
+            if not cls.check_rollup(db, user_id):
+                yield user_id
+
+    @classmethod
+    def check_rollup(cls, db: Session, user_id: int) -> bool:
+        # Compare every statement served from the rollup with the same
+        # statement computed from the consolidated transactions
+        bucket_ids = db.scalars(
+            select(Transaction.bucket_id)
+            .where(Transaction.user_id == user_id)
+            .distinct()
+        ).all()
+        for bucket_id in [None, *bucket_ids]:
+            for aggregate_by in get_args(AggregateBy):
+                group_by = cls.__get_group_by(aggregate_by)
+                order_by = [f"{c}__desc" for c in group_by]
+                kwargs: dict[str, Any] = dict(
+                    user_id=user_id,
+                    bucket_id=bucket_id,
+                    group_by=group_by,
+                    order_by=order_by,
+                    page=0,
+                    per_page=0,
+                )
+                expected = db.execute(cls.select_pl_statements(**kwargs)).all()
+                actual = db.execute(cls.select_rollup_pl_statements(**kwargs)).all()
+                if [tuple(r) for r in expected] != [tuple(r) for r in actual]:
+                    return False
+        return True
+
+
+@event.listens_for(Session, "before_flush")
+def mark_rollups_dirty(
+    db: Session, flush_context: UOWTransaction, instances: Any
+) -> None:
+    # Dirty rows are still as they were in the database
+    transaction_ids, transaction_group_ids = set(), set()
+    for obj in itertools.chain(db.dirty, db.deleted):
+        identity = inspect(obj).identity
+        if isinstance(obj, Transaction) and identity:
+            transaction_ids.add(identity[0])
+        elif isinstance(obj, TransactionGroup) and identity:
+            transaction_group_ids.add(identity[0])
+    CRUDPLStatement.mark_rollup_transactions_dirty(
+        db, transaction_ids, transaction_group_ids
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def mark_new_rollups_dirty(db: Session, flush_context: UOWTransaction) -> None:
+    # New rows have ids now, their days are read when the rollups are updated
+    for obj in db.new:
+        if isinstance(obj, Transaction):
+            db.info.setdefault("dirty_pl_statement_transactions", set()).add(obj.id)
+        elif isinstance(obj, TransactionGroup):
+            db.info.setdefault("dirty_pl_statement_groups", set()).add(obj.id)
@@ -25,6 +25,7 @@ from app.schemas.replacementpattern import (
     ReplacementPatternApiIn,
     ReplacementPatternApiOut,
 )
+from app.utils.cache import get_cache
 
 
 class CRUDReplacementPattern(
@@ -32,6 +33,7 @@ class CRUDReplacementPattern(
 ):
     __model__ = ReplacementPattern
     __out_schema__ = ReplacementPatternApiOut
+    __cache__ = get_cache(ReplacementPattern.__tablename__)
 
     @classmethod
     def select(
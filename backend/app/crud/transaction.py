@@ -15,17 +15,21 @@
 
 import logging
 from datetime import date
+from decimal import Decimal
 from typing import Any, Generic
 
 from fastapi import HTTPException, status
-from sqlalchemy import Select
+from sqlalchemy import Select, delete, func, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from app.crud.common import CRUDBase, InSchemaT, OutSchemaT
-from app.models.account import Account, NonInstitutionalAccount
+from app.crud.file import CRUDFile
+from app.models.account import Account
+from app.models.file import File
 from app.models.transaction import Transaction
-from app.models.userinstitutionlink import UserInstitutionLink
+from app.models.transactiongroup import TransactionGroup
 from app.schemas.transaction import (
     TransactionApiOut,
     TransactionApiIn,
@@ -45,14 +49,15 @@ class __CRUDTransactionBase(
     def select(cls, user_id: int = 0, **kwargs: Any) -> Select[tuple[Transaction]]:
         statement = super().select(**kwargs)
         if user_id:
-            statement = statement.join(Account)
-            statement = statement.outerjoin(UserInstitutionLink)
-            statement = statement.where(
-                (NonInstitutionalAccount.user_id == user_id)
-                | (UserInstitutionLink.user_id == user_id)
-            )
+            statement = statement.where(Transaction.user_id == user_id)
         return statement
 
+    @classmethod
+    def create(cls, db: Session, obj_in: InSchemaT, **kwargs: Any) -> OutSchemaT:
+        # Denormalised owner, so that ownership checks need no joins
+        account = Account.read(db, id__eq=kwargs["account_id"])
+        return super().create(db, obj_in, user_id=account.user_id, **kwargs)
+
     @classmethod
     def orphan_only_children(cls, db: Session) -> None:
         for t in db.scalars(cls.select()).yield_per(50):
@@ -77,13 +82,41 @@ class __CRUDTransactionBase(
         except IntegrityError:
             raise HTTPException(status.HTTP_404_NOT_FOUND)
         if transaction_group := transaction.transaction_group:
-            transaction_group.update(db, transaction_group.id)
+            transaction_group.update(db, transaction_group.id, transaction.user_id)
         return cls.__out_schema__.model_validate(transaction)
 
+    @classmethod
+    def defer_account_balances_update(
+        cls, db: Session, id: int, timestamp: date | None = None
+    ) -> None:
+        # Coalesce recomputations per account, keeping the earliest timestamp
+        dirty_accounts: dict[int, date | None] = db.info.setdefault(
+            "dirty_accounts", {}
+        )
+        if id in dirty_accounts:
+            dirty_timestamp = dirty_accounts[id]
+            if timestamp and dirty_timestamp:
+                timestamp = min(timestamp, dirty_timestamp)
+            else:
+                timestamp = None
+        dirty_accounts[id] = timestamp
+
+    @classmethod
+    def update_dirty_account_balances(cls, db: Session) -> None:
+        dirty_accounts: dict[int, date | None] = db.info.pop("dirty_accounts", {})
+        for id, timestamp in dirty_accounts.items():
+            if not db.get(Account, id):
+                continue
+            cls.update_account_balances(db, id, timestamp)
+
     @classmethod
     def update_account_balances(
         cls, db: Session, id: int, timestamp: date | None = None
     ) -> None:
+        # Absorb any deferred recomputation of this account
+        cls.defer_account_balances_update(db, id, timestamp)
+        timestamp = db.info["dirty_accounts"].pop(id)
+
         account = Account.read(db, id__eq=id)
 
         if timestamp:
@@ -95,17 +128,71 @@ class __CRUDTransactionBase(
                 prev_balance = prev_transaction.account_balance
             else:
                 prev_balance = account.initial_balance
+        else:
+            prev_balance = account.initial_balance
+
+        if db.get_bind().dialect.name == "postgresql":
+            cls.__update_account_balances_sql(db, id, prev_balance, timestamp)
+        else:
+            cls.__update_account_balances_python(db, id, prev_balance, timestamp)
+
+        balance_statement = (
+            select(Transaction.account_balance)
+            .where(Transaction.account_id == id)
+            .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+            .limit(1)
+        )
+        balance = db.scalar(balance_statement)
+        account.balance = account.initial_balance if balance is None else balance
+        db.flush()
+
+    @classmethod
+    def __update_account_balances_sql(
+        cls, db: Session, id: int, prev_balance: Decimal, timestamp: date | None
+    ) -> None:
+        # Rewrite the whole suffix in one UPDATE ... FROM (SELECT sum() OVER ...)
+        db.flush()
+        running_balance = prev_balance + func.sum(Transaction.amount).over(
+            order_by=(Transaction.timestamp, Transaction.id)
+        )
+        balances = select(
+            Transaction.id, running_balance.label("account_balance")
+        ).where(Transaction.account_id == id)
+        if timestamp:
+            balances = balances.where(Transaction.timestamp >= timestamp)
+        balances_subquery = balances.subquery()
+        statement = (
+            update(Transaction)
+            .where(Transaction.id == balances_subquery.c.id)
+            .values(account_balance=balances_subquery.c.account_balance)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(statement)
+
+        # Expire the balances already loaded in the session, reading account_id
+        # from the instance state so that expired rows aren't refreshed one by one
+        for obj in db.identity_map.values():
+            if (
+                isinstance(obj, Transaction)
+                and inspect(obj).dict.get("account_id") == id
+            ):
+                db.expire(obj, ["account_balance"])
+
+    @classmethod
+    def __update_account_balances_python(
+        cls, db: Session, id: int, prev_balance: Decimal, timestamp: date | None
+    ) -> None:
+        if timestamp:
             statement = Transaction.select(
                 account_id__eq=id, timestamp__ge=timestamp, order_by="timestamp__asc"
             )
         else:
             statement = Transaction.select(account_id__eq=id, order_by="timestamp__asc")
-            prev_balance = account.initial_balance
 
         for transaction in db.scalars(statement).yield_per(50):
-            account_balance = prev_balance + transaction.amount
-            Transaction.update(db, transaction.id, account_balance=account_balance)
-            prev_balance = transaction.account_balance
+            prev_balance += transaction.amount
+            transaction.account_balance = prev_balance
+        db.flush()
 
     @classmethod
     def delete(cls, db: Session, id: int) -> int:
@@ -125,7 +212,7 @@ class __CRUDTransactionBase(
         super().delete(db, id)
 
         # Update account balances in account's transactions from that point
-        cls.update_account_balances(db, account.id, timestamp)
+        cls.defer_account_balances_update(db, account.id, timestamp)
 
         return id
 
@@ -138,3 +225,74 @@ class CRUDSyncableTransaction(
     __CRUDTransactionBase[TransactionPlaidOut, TransactionPlaidIn],
 ):
     __out_schema__ = TransactionPlaidOut
+
+    @classmethod
+    def upsert_many(
+        cls,
+        db: Session,
+        values: list[dict[str, Any]],
+        existing_ids: dict[str, int],
+        update_existing: bool,
+    ) -> None:
+        # Rows are matched by plaid_id, existing ones are kept or overwritten
+        if not values:
+            return
+        if db.get_bind().dialect.name == "postgresql":
+            insert_statement = postgresql.insert(Transaction)
+            if update_existing:
+                columns = set(values[0]) - {"plaid_id"}
+                upsert_statement = insert_statement.on_conflict_do_update(
+                    index_elements=[Transaction.plaid_id],
+                    set_={c: insert_statement.excluded[c] for c in columns},
+                )
+            else:
+                upsert_statement = insert_statement.on_conflict_do_nothing(
+                    index_elements=[Transaction.plaid_id]
+                )
+            db.execute(upsert_statement, values)
+            return
+        new_values = [v for v in values if v["plaid_id"] not in existing_ids]
+        if new_values:
+            db.execute(insert(Transaction), new_values)
+        if update_existing:
+            existing_values = [
+                {**v, "id": existing_ids[v["plaid_id"]]}
+                for v in values
+                if v["plaid_id"] in existing_ids
+            ]
+            if existing_values:
+                db.execute(update(Transaction), existing_values)
+
+    @classmethod
+    def delete_many(cls, db: Session, ids: list[int]) -> None:
+        if not ids:
+            return
+        statement = select(Transaction.transaction_group_id).where(
+            Transaction.id.in_(ids), Transaction.transaction_group_id.is_not(None)
+        )
+        transaction_group_ids = set(db.scalars(statement))
+        delete_statement = (
+            delete(File).where(File.transaction_id.in_(ids)).returning(File.storage_key)
+        )
+        CRUDFile.mark_data_unreferenced(db, db.scalars(delete_statement))
+        db.execute(delete(Transaction).where(Transaction.id.in_(ids)))
+
+        # Delete groups that are left with a single transaction or none
+        statement = (
+            select(Transaction.transaction_group_id)
+            .where(Transaction.transaction_group_id.in_(transaction_group_ids))
+            .group_by(Transaction.transaction_group_id)
+            .having(func.count() > 1)
+        )
+        transaction_group_ids -= set(db.scalars(statement))
+        if transaction_group_ids:
+            db.execute(
+                update(Transaction)
+                .where(Transaction.transaction_group_id.in_(transaction_group_ids))
+                .values(transaction_group_id=None)
+            )
+            db.execute(
+                delete(TransactionGroup).where(
+                    TransactionGroup.id.in_(transaction_group_ids)
+                )
+            )
@@ -17,6 +17,7 @@ import logging
 from typing import Any
 
 from sqlalchemy import Select
+from sqlalchemy.orm import Session
 
 from app.crud.common import CRUDBase
 from app.models.account import InstitutionalAccount
@@ -27,6 +28,8 @@ from app.schemas.transactiondeserialiser import (
     TransactionDeserialiserApiOut,
     TransactionDeserialiserApiIn,
 )
+from app.utils.cache import get_cache
+from app.utils.transaction import invalidate_deserialisers
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +43,7 @@ class CRUDTransactionDeserialiser(
 ):
     __model__ = TransactionDeserialiser
     __out_schema__ = TransactionDeserialiserApiOut
+    __cache__ = get_cache(TransactionDeserialiser.__tablename__)
 
     @classmethod
     def select(
@@ -55,3 +59,15 @@ class CRUDTransactionDeserialiser(
         if account_id:
             statement = statement.where(InstitutionalAccount.id == account_id)
         return statement
+
+    @classmethod
+    def update(
+        cls, db: Session, id: int, obj_in: TransactionDeserialiserApiIn, **kwargs: Any
+    ) -> TransactionDeserialiserApiOut:
+        invalidate_deserialisers(id)
+        return super().update(db, id, obj_in, **kwargs)
+
+    @classmethod
+    def delete(cls, db: Session, id: int) -> int:
+        invalidate_deserialisers(id)
+        return super().delete(db, id)
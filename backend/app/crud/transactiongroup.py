@@ -13,20 +13,23 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import logging
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable
 
-from sqlalchemy import Select
+from sqlalchemy import Select, func, select, update
 from sqlalchemy.orm import Session
 
 from app.crud.common import CRUDBase
-from app.models.account import Account, NonInstitutionalAccount
+from app.crud.merchant import CRUDMerchant
+from app.crud.plstatement import CRUDPLStatement
+from app.models.merchant import Merchant
 from app.models.transaction import Transaction
 from app.models.transactiongroup import TransactionGroup
-from app.models.userinstitutionlink import UserInstitutionLink
 from app.schemas.transactiongroup import TransactionGroupApiIn, TransactionGroupApiOut
 
 logger = logging.getLogger(__name__)
 
+BATCH_SIZE = 1000
+
 
 class CRUDTransactionGroup(
     CRUDBase[TransactionGroup, TransactionGroupApiOut, TransactionGroupApiIn]
@@ -40,15 +43,19 @@ class CRUDTransactionGroup(
         db: Session,
         obj_in: TransactionGroupApiIn,
         transaction_ids: list[int] | None = None,
+        user_id: int | None = None,
         **kwargs: Any
     ) -> TransactionGroupApiOut:
+        # The group's owner, to match merchants before it has any transaction
         transaction_ids = transaction_ids or []
-        transaction_group = TransactionGroup.create(db, **obj_in.model_dump(), **kwargs)
-        return cls.add_transactions(db, transaction_group.id, transaction_ids)
+        transaction_group = TransactionGroup.create(
+            db, user_id=user_id, **obj_in.model_dump(), **kwargs
+        )
+        return cls.add_transactions(db, transaction_group.id, transaction_ids, user_id)
 
     @classmethod
     def merge(
-        cls, db: Session, transaction_group_ids: list[int]
+        cls, db: Session, transaction_group_ids: list[int], user_id: int
     ) -> TransactionGroupApiOut:
         transaction_ids = [
             transaction.id
@@ -58,7 +65,7 @@ class CRUDTransactionGroup(
             ).transactions
         ]
         transaction_group_in = TransactionGroupApiIn(name="")
-        return cls.create(db, transaction_group_in, transaction_ids)
+        return cls.create(db, transaction_group_in, transaction_ids, user_id)
 
     @classmethod
     def update_categories(cls, db: Session) -> Iterable[TransactionGroupApiOut]:
@@ -74,22 +81,106 @@ class CRUDTransactionGroup(
         statement = super().select(**kwargs)
         if user_id:
             statement = statement.join(Transaction)
-            statement = statement.join(Account)
-            statement = statement.outerjoin(UserInstitutionLink)
-            statement = statement.where(
-                (NonInstitutionalAccount.user_id == user_id)
-                | (UserInstitutionLink.user_id == user_id)
-            )
+            statement = statement.where(Transaction.user_id == user_id)
         return statement
 
     @classmethod
-    def update_all(cls, db: Session, user_id: int) -> None:
-        for m in db.scalars(cls.select(user_id=user_id)).all():
-            TransactionGroup.update(db, m.id)
+    def update_all(
+        cls,
+        db: Session,
+        user_id: int,
+        report_progress: Callable[[int, int], None] | None = None,
+    ) -> None:
+        transaction_group_ids = cls.select(user_id=user_id).with_only_columns(
+            TransactionGroup.id
+        )
+
+        # Merchants, matched in memory and written in batches
+        statement = select(TransactionGroup.id, TransactionGroup.name).where(
+            TransactionGroup.merchant_id.is_(None),
+            TransactionGroup.id.in_(transaction_group_ids),
+        )
+        rows = db.execute(statement).all()
+        total = len(rows) + 2
+        merchant_ids = CRUDMerchant.get_matcher(db, user_id).match_many(
+            name for _, name in rows
+        )
+        for i in range(0, len(rows), BATCH_SIZE):
+            batch = rows[i : i + BATCH_SIZE]
+            values = [
+                {"id": id, "merchant_id": merchant_ids[name]}
+                for id, name in batch
+                if merchant_ids[name]
+            ]
+            if values:
+                db.execute(update(TransactionGroup), values)
+            if report_progress:
+                report_progress(i + len(batch), total)
+
+        # Bulk updates bypass the flush events
+        uncategorised_ids = select(TransactionGroup.id).where(
+            TransactionGroup.category_id.is_(None),
+            TransactionGroup.id.in_(transaction_group_ids),
+        )
+        CRUDPLStatement.mark_rollup_transactions_dirty(
+            db, transaction_group_ids=db.scalars(uncategorised_ids)
+        )
+
+        # Categories, first from the merchant
+        update_statement = (
+            update(TransactionGroup)
+            .where(
+                TransactionGroup.category_id.is_(None),
+                TransactionGroup.merchant_id == Merchant.id,
+                TransactionGroup.id.in_(transaction_group_ids),
+            )
+            .values(category_id=Merchant.default_category_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(update_statement)
+        if report_progress:
+            report_progress(len(rows) + 1, total)
+
+        # then from the category with the largest absolute amount
+        amounts = (
+            select(
+                Transaction.transaction_group_id,
+                Transaction.category_id,
+                func.sum(Transaction.amount).label("amount"),
+            )
+            .where(
+                Transaction.category_id.is_not(None),
+                Transaction.transaction_group_id.in_(transaction_group_ids),
+            )
+            .group_by(Transaction.transaction_group_id, Transaction.category_id)
+            .subquery()
+        )
+        rank = func.row_number().over(
+            partition_by=amounts.c.transaction_group_id,
+            order_by=(func.abs(amounts.c.amount).desc(), amounts.c.category_id),
+        )
+        ranked = select(
+            amounts.c.transaction_group_id,
+            amounts.c.category_id,
+            rank.label("rank"),
+        ).subquery()
+        update_statement = (
+            update(TransactionGroup)
+            .where(
+                TransactionGroup.category_id.is_(None),
+                TransactionGroup.id == ranked.c.transaction_group_id,
+                ranked.c.rank == 1,
+            )
+            .values(category_id=ranked.c.category_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(update_statement)
+        if report_progress:
+            report_progress(total, total)
 
     @classmethod
     def __add_transaction(
-        cls, db: Session, id: int, transaction_id: int
+        cls, db: Session, id: int, transaction_id: int, user_id: int | None
     ) -> TransactionGroup:
         transaction_group = TransactionGroup.read(db, id__eq=id)
         transaction = Transaction.read(db, id__eq=transaction_id)
@@ -103,19 +194,23 @@ class CRUDTransactionGroup(
             old_transaction_group = TransactionGroup.read(
                 db, id__eq=old_transaction_group_id
             )
-            TransactionGroup.update(db, old_transaction_group.id)
+            TransactionGroup.update(db, old_transaction_group.id, user_id)
             if not old_transaction_group.transactions:
                 cls.delete(db, old_transaction_group_id)
         return transaction_group
 
     @classmethod
     def add_transactions(
-        cls, db: Session, transaction_group_id: int, transaction_ids: list[int]
+        cls,
+        db: Session,
+        transaction_group_id: int,
+        transaction_ids: list[int],
+        user_id: int | None,
     ) -> TransactionGroupApiOut:
         transaction_group = TransactionGroup.read(db, id__eq=transaction_group_id)
         for transaction_id in transaction_ids:
-            cls.__add_transaction(db, transaction_group.id, transaction_id)
-        TransactionGroup.update(db, transaction_group_id)
+            cls.__add_transaction(db, transaction_group.id, transaction_id, user_id)
+        TransactionGroup.update(db, transaction_group_id, user_id)
         db.refresh(transaction_group)
         return CRUDTransactionGroup.read(db, id=transaction_group_id)
 
@@ -19,9 +19,13 @@ from app.models.common import Base  # noqa
 # 2. Import inheritors of the base model
 from app.models.account import Account
 from app.models.bucket import Bucket
+from app.models.cachegeneration import CacheGeneration
 from app.models.category import Category
+from app.models.exchangerate import ExchangeRate
 from app.models.institution import Institution
+from app.models.job import Job
 from app.models.merchant import Merchant
+from app.models.plstatementrollup import PLStatementRollup
 from app.models.replacementpattern import ReplacementPattern
 from app.models.transaction import Transaction
 from app.models.transactiondeserialiser import TransactionDeserialiser
@@ -43,4 +47,8 @@ __all__ = [
     "Transaction",
     "Merchant",
     "Category",
+    "ExchangeRate",
+    "Job",
+    "PLStatementRollup",
+    "CacheGeneration",
 ]
@@ -14,36 +14,169 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import Generator, Annotated
+from typing import (
+    Annotated,
+    Any,
+    AsyncGenerator,
+    Callable,
+    Concatenate,
+    Generator,
+    ParamSpec,
+    TypeVar,
+)
 
 from fastapi import Depends
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Connection, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.pool import QueuePool
 
+from app.crud.file import CRUDFile
+from app.crud.plstatement import CRUDPLStatement
+from app.crud.transaction import CRUDTransaction
 from app.settings import settings
 
+POOL_OPTIONS: dict[str, Any] = {
+    "pool_pre_ping": True,
+    "pool_size": settings.DATABASE_POOL_SIZE,
+    "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+    "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS,
+    "pool_recycle": settings.DATABASE_POOL_RECYCLE_SECONDS,
+}
+
 engine = create_engine(
     str(settings.DATABASE_URL),
-    pool_pre_ping=True,
+    **POOL_OPTIONS,
     # echo="debug",
     # echo=True,
     # query_cache_size=0,
 )
 
+# Other databases have no async driver here, their async routes query on the
+# threadpool instead
+async_engine: AsyncEngine | None = None
+if engine.dialect.name == "postgresql":
+    async_engine = create_async_engine(
+        make_url(str(settings.DATABASE_URL)).set(drivername="postgresql+asyncpg"),
+        **POOL_OPTIONS,
+    )
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
 # Avoid double echo
 logging.getLogger("sqlalchemy.engine").propagate = False
 logger = logging.getLogger(__name__)
 
+# Requests are interactive, the worker switches its whole process to background
+__session_info: dict[str, Any] = {
+    "statement_timeout": settings.INTERACTIVE_STATEMENT_TIMEOUT_SECONDS
+}
+
+__peak_checked_out: dict[str, int] = {}
+
+
+def use_background_statement_timeout() -> None:
+    __session_info["statement_timeout"] = settings.BACKGROUND_STATEMENT_TIMEOUT_SECONDS
+
+
+@event.listens_for(Session, "after_begin")
+def set_statement_timeout(
+    session: Session, transaction: SessionTransaction, connection: Connection
+) -> None:
+    statement_timeout = session.info.get("statement_timeout")
+    if statement_timeout and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {int(statement_timeout * 1000)}"
+        )
+
+
+def get_pools() -> dict[str, QueuePool]:
+    pools = {"sync": engine.pool}
+    if async_engine:
+        pools["async"] = async_engine.pool
+    return {name: pool for name, pool in pools.items() if isinstance(pool, QueuePool)}
+
+
+def get_peak_checked_out(name: str) -> int:
+    return __peak_checked_out.get(name, 0)
+
+
+def __track_peak_checked_out(name: str, pool: QueuePool) -> None:
+    @event.listens_for(pool, "checkout")
+    def checkout(*args: Any) -> None:
+        checked_out = pool.checkedout()
+        if checked_out > __peak_checked_out.get(name, 0):
+            __peak_checked_out[name] = checked_out
+
+
+for pool_name, queue_pool in get_pools().items():
+    __track_peak_checked_out(pool_name, queue_pool)
+
 
 def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    with Session(engine, info=dict(__session_info)) as session:
         try:
             yield session
+            CRUDTransaction.update_dirty_account_balances(session)
+            CRUDPLStatement.update_dirty_rollups(session)
             session.commit()
         except Exception as e:
             logger.error("An error occurred: %s, rolling back...", e)
             session.rollback()
             raise
+        CRUDFile.delete_unreferenced_data(session)
 
 
 DBSession = Annotated[Session, Depends(get_db)]
+
+
+class ThreadpoolSession:
+    # AsyncSession.run_sync on a sync session, for when there is no async engine
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    async def run_sync(
+        self,
+        fn: Callable[Concatenate[Session, P], T],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession | ThreadpoolSession, None]:
+    # Read only, nothing is committed
+    if async_engine:
+        async with AsyncSession(
+            async_engine, info=dict(__session_info)
+        ) as async_session:
+            yield async_session
+        return
+    session = Session(engine, info=dict(__session_info))
+    try:
+        yield ThreadpoolSession(session)
+    finally:
+        await run_in_threadpool(session.close)
+
+
+AsyncDBSession = Annotated[AsyncSession | ThreadpoolSession, Depends(get_async_db)]
+
+
+async def run_in_session(
+    fn: Callable[Concatenate[Session, P], T], *args: P.args, **kwargs: P.kwargs
+) -> T:
+    # Read only, in a session of its own that is closed before returning, so
+    # that its connection is never held alongside the request's
+    if async_engine:
+        async with AsyncSession(
+            async_engine, info=dict(__session_info)
+        ) as async_session:
+            return await async_session.run_sync(fn, *args, **kwargs)
+
+    def run() -> T:
+        with Session(engine, info=dict(__session_info)) as session:
+            return fn(session, *args, **kwargs)
+
+    return await run_in_threadpool(run)
@@ -22,7 +22,7 @@ from pydantic import ValidationError
 from sqlalchemy.exc import NoResultFound
 
 from app.crud.user import CRUDUser
-from app.database.deps import DBSession
+from app.database.deps import run_in_session
 from app.schemas.auth import TokenPayload
 from app.schemas.user import UserApiOut
 from app.settings import settings
@@ -31,16 +31,14 @@ from app.utils import ALGORITHM
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
-def get_current_user(
-    db: DBSession, token: str = Depends(reusable_oauth2)
-) -> UserApiOut:
+async def get_current_user(token: str = Depends(reusable_oauth2)) -> UserApiOut:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[ALGORITHM])
         token_data = TokenPayload(**payload)
     except (jwt.JWTError, ValidationError):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
     try:
-        user = CRUDUser.read(db, id=token_data.sub)
+        user = await run_in_session(CRUDUser.read_current, token_data.sub, token)
     except NoResultFound:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     return user
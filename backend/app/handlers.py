@@ -18,15 +18,12 @@ from functools import wraps
 from logging import getLogger
 from typing import Any, Callable, TypeVar
 
-from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import NoResultFound
 
-from app.crud.replacementpattern import CRUDReplacementPattern
-from app.crud.user import CRUDUser
+from app.crud.job import CRUDJob
 from app.crud.userinstitutionlink import CRUDSyncableUserInstitutionLink
 from app.database.deps import get_db
-from app.plaid.userinstitutionlink import sync_transactions
 from app.schemas.webhook import (
     ItemErrorWebhookReq,
     SyncUpdatesAvailableWebhookReq,
@@ -63,20 +60,15 @@ def handle_transactions_sync_updates_available(
     user_institution_link_out = CRUDSyncableUserInstitutionLink.read(
         db, plaid_id=req.item_id
     )
-    user_out = CRUDUser.read(db, id=user_institution_link_out.user_id)
-    try:
-        replacement_pattern_out = CRUDReplacementPattern.read(
-            db, user_institution_link_id=user_institution_link_out.id
-        )
-    except HTTPException:  # FIXME: should not throw http exceptions
-        replacement_pattern_out = None
-    sync_transactions(
+    # Webhooks arriving while a sync is queued join it
+    CRUDJob.enqueue(
         db,
-        user_institution_link_out=user_institution_link_out,
-        replacement_pattern_out=replacement_pattern_out,
-        default_currency_code=user_out.default_currency_code,
+        "sync_user_institution_link",
+        user_id=user_institution_link_out.user_id,
+        dedup_key=f"sync_user_institution_link:{user_institution_link_out.id}",
+        user_institution_link_id=user_institution_link_out.id,
     )
-    logger.info("Finished syncing %s.", req.item_id)
+    logger.info("Queued sync of %s.", req.item_id)
 
 
 @handle_exceptions
@@ -0,0 +1,109 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from logging import getLogger
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from app.crud.account import CRUDAccount
+from app.crud.transactiongroup import CRUDTransactionGroup
+from app.crud.user import CRUDUser
+from app.crud.userinstitutionlink import CRUDSyncableUserInstitutionLink
+from app.plaid import userinstitutionlink
+from app.plaid.category import get_all_plaid_categories
+
+ProgressCallback = Callable[[int, int], None]
+JobFunction = Callable[..., None]
+
+logger = getLogger(__name__)
+
+
+class Task:
+    def __init__(
+        self, function: JobFunction, max_attempts: int, concurrency: int
+    ) -> None:
+        self.function = function
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+
+tasks: dict[str, Task] = {}
+
+
+def task(
+    max_attempts: int = 3, concurrency: int = 1
+) -> Callable[[JobFunction], JobFunction]:
+    # Registers the function as a task the worker can run by name
+    def decorator(function: JobFunction) -> JobFunction:
+        tasks[function.__name__] = Task(function, max_attempts, concurrency)
+        return function
+
+    return decorator
+
+
+@task()
+def update_transaction_groups(
+    db: Session, report_progress: ProgressCallback, user_id: int
+) -> None:
+    CRUDTransactionGroup.update_all(db, user_id, report_progress)
+
+
+@task(max_attempts=5, concurrency=4)
+def sync_user_institution_link(
+    db: Session, report_progress: ProgressCallback, user_institution_link_id: int
+) -> None:
+    userinstitutionlink.sync_user_institution_link(db, user_institution_link_id)
+
+
+@task()
+def sync_user_institution_links(
+    db: Session, report_progress: ProgressCallback, user_id: int
+) -> None:
+    user_institution_link_ids = [
+        user_institution_link.id
+        for user_institution_link in CRUDSyncableUserInstitutionLink.read_many(
+            db, user_id=user_id, plaid_id__is_null=False
+        )
+    ]
+    userinstitutionlink.sync_user_institution_links(
+        user_institution_link_ids, report_progress
+    )
+
+
+@task(max_attempts=1)
+def update_account_balances(db: Session, report_progress: ProgressCallback) -> None:
+    accounts = list(CRUDAccount.read_many(db))
+    for i, account in enumerate(accounts):
+        CRUDAccount.update_balance(db, account.id)
+        report_progress(i + 1, len(accounts))
+
+
+@task(max_attempts=1)
+def update_transactions_amount_default_currency(
+    db: Session, report_progress: ProgressCallback
+) -> None:
+    users = list(CRUDUser.read_many(db))
+    for i, u in enumerate(users):
+        for a in CRUDAccount.read_many(db, user_id=u.id):
+            CRUDAccount.update_transactions_amount_default_currency(
+                db, a.id, u.default_currency_code
+            )
+        report_progress(i + 1, len(users))
+
+
+@task()
+def sync_categories(db: Session, report_progress: ProgressCallback) -> None:
+    get_all_plaid_categories(db)
@@ -17,13 +17,11 @@ from decimal import Decimal
 from typing import TYPE_CHECKING, TypeVar
 
 from sqlalchemy import ForeignKey, desc
-from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import (
     Mapped,
     relationship,
     mapped_column,
     WriteOnlyMapped,
-    object_session,
 )
 
 from app.models.common import Base, SyncableBase
@@ -41,6 +39,8 @@ class Account(SyncableBase):
 
     currency_code: Mapped[str]
     initial_balance: Mapped[Decimal]
+    # Balance after the latest transaction, maintained on balance recomputation
+    balance: Mapped[Decimal]
     name: Mapped[str]
     type: Mapped[str]
 
@@ -50,27 +50,19 @@ class Account(SyncableBase):
         order_by=(desc(Transaction.timestamp), desc(Transaction.id)),
     )
     default_bucket_id: Mapped[int] = mapped_column(ForeignKey("bucket.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True)
 
     __mapper_args__ = {
         "polymorphic_on": "type",
         "polymorphic_identity": "account",
     }
 
-    @hybrid_property
-    def balance(self) -> Decimal:
-        session = object_session(self)
-        assert session
-        transaction = session.scalars(self.transactions.select()).first()
-        if transaction:
-            return transaction.account_balance
-        return self.initial_balance
-
 
 class InstitutionalAccount(Account):
     is_institutional = True
     mask: Mapped[str | None]
     user_institution_link_id: Mapped[int] = mapped_column(
-        ForeignKey("user_institution_link.id")
+        ForeignKey("user_institution_link.id"), index=True
     )
 
     user_institution_link: Mapped["UserInstitutionLink"] = relationship(
@@ -114,7 +106,6 @@ class Other(InstitutionalAccount):
 
 class NonInstitutionalAccount(Account):
     is_institutional = False
-    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
 
     __mapper_args__ = {"polymorphic_abstract": True}
 
@@ -0,0 +1,47 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Mapped, mapped_column, Session
+
+from app.models.common import Base
+
+
+class CacheGeneration(Base):
+    __tablename__ = "cache_generation"
+    name: Mapped[str] = mapped_column(unique=True)
+    generation: Mapped[int]
+
+    @classmethod
+    def get(cls, db: Session, name: str) -> int:
+        statement = select(cls.generation).where(cls.name == name)
+        return db.scalar(statement) or 0
+
+    @classmethod
+    def bump(cls, db: Session, name: str) -> None:
+        statement = (
+            update(cls)
+            .where(cls.name == name)
+            .values(generation=cls.generation + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(statement).rowcount:
+            return
+        try:
+            with db.begin_nested():
+                cls.create(db, name=name, generation=1)
+        except IntegrityError:
+            # Created concurrently by another process
+            db.execute(statement)
@@ -13,8 +13,9 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import base64
+import hashlib
 
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, validates
 
 from app.models.common import SyncableBase
 
@@ -22,7 +23,17 @@ from app.models.common import SyncableBase
 class Category(SyncableBase):
     __tablename__ = "category"
     name: Mapped[str] = mapped_column(unique=True)
-    icon: Mapped[bytes]
+    icon: Mapped[bytes] = mapped_column(deferred=True)
+    icon_hash: Mapped[str]
+
+    @validates("icon")
+    def validate_icon(self, key: str, icon: bytes) -> bytes:
+        self.icon_hash = hashlib.sha256(icon).hexdigest()
+        return icon
+
+    @property
+    def icon_url(self) -> str:
+        return f"categories/{self.id}/icon?v={self.icon_hash}"
 
     @property
     def icon_base64(self) -> str:
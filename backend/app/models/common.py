@@ -66,9 +66,11 @@ def get_where_expressions(
 def get_order_by_expressions(
     model: Any, order_by: str
 ) -> tuple[ColumnExpressionArgument[Any], ColumnExpressionArgument[int]]:
+    # NULLs sort as the largest value on every backend, as PostgreSQL does
     attr, op = order_by.split("__")
-    f = {"asc": asc, "desc": desc}[op]
-    return f(getattr(model, attr)), f(model.id)
+    if op == "desc":
+        return desc(getattr(model, attr)).nulls_first(), desc(model.id)
+    return asc(getattr(model, attr)).nulls_last(), asc(model.id)
 
 
 class Base(DeclarativeBase):
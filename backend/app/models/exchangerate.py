@@ -0,0 +1,31 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.orm import Mapped
+
+from app.models.common import Base
+
+
+class ExchangeRate(Base):
+    __tablename__ = "exchange_rate"
+    __table_args__ = (UniqueConstraint("timestamp", "currency_code"),)
+    timestamp: Mapped[date]
+    currency_code: Mapped[str]
+    # Rate against USD, the base currency of Open Exchange Rates
+    rate: Mapped[Decimal]
@@ -28,9 +28,12 @@ if TYPE_CHECKING:
 class File(Base):
     __tablename__ = "file"
     name: Mapped[str]
-    data: Mapped[bytes]
+    storage_key: Mapped[str] = mapped_column(index=True)
+    size: Mapped[int]
     uploaded: Mapped[datetime]
-    transaction_id: Mapped[int] = mapped_column(ForeignKey("transaction.id"))
+    transaction_id: Mapped[int] = mapped_column(
+        ForeignKey("transaction.id"), index=True
+    )
 
     transaction: Mapped["Transaction"] = relationship(back_populates="files")
 
@@ -14,13 +14,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import base64
+import hashlib
 import logging
 from typing import TYPE_CHECKING
 
 from pydantic import HttpUrl
 from pydantic_extra_types.color import Color
 from sqlalchemy import ForeignKey
-from sqlalchemy.orm import mapped_column, Mapped, relationship
+from sqlalchemy.orm import mapped_column, Mapped, relationship, validates
 
 from app.models.common import SyncableBase, UrlType, ColorType
 from app.models.replacementpattern import ReplacementPattern
@@ -38,7 +39,8 @@ class Institution(SyncableBase):
     country_code: Mapped[str]
     url: Mapped[HttpUrl | None] = mapped_column(type_=UrlType)
     colour: Mapped[Color | None] = mapped_column(type_=ColorType)
-    logo: Mapped[bytes | None]
+    logo: Mapped[bytes | None] = mapped_column(deferred=True)
+    logo_hash: Mapped[str | None]
     transaction_deserialiser_id: Mapped[int | None] = mapped_column(
         ForeignKey("transaction_deserialiser.id")
     )
@@ -55,6 +57,17 @@ class Institution(SyncableBase):
     )
     replacement_pattern: Mapped[ReplacementPattern | None] = relationship()
 
+    @validates("logo")
+    def validate_logo(self, key: str, logo: bytes | None) -> bytes | None:
+        self.logo_hash = hashlib.sha256(logo).hexdigest() if logo else None
+        return logo
+
+    @property
+    def logo_url(self) -> str | None:
+        if not self.logo_hash:
+            return None
+        return f"institutions/{self.id}/logo?v={self.logo_hash}"
+
     @property
     def logo_base64(self) -> str | None:
         return base64.b64encode(self.logo).decode() if self.logo else None
@@ -0,0 +1,75 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import JSON, ForeignKey, Index, text
+from sqlalchemy.orm import Mapped, mapped_column, Session
+
+from app.models.common import Base
+
+
+class Job(Base):
+    __tablename__ = "job"
+    __table_args__ = (
+        Index("ix_job_status_run_after", "status", "run_after"),
+        # At most one queued job per key, later requests join it
+        Index(
+            "ix_job_dedup_key",
+            "dedup_key",
+            unique=True,
+            postgresql_where=text("status = 'queued'"),
+            sqlite_where=text("status = 'queued'"),
+        ),
+    )
+    name: Mapped[str]
+    status: Mapped[str]
+    progress: Mapped[int]
+    total: Mapped[int | None]
+    error: Mapped[str | None]
+    created: Mapped[datetime]
+    updated: Mapped[datetime]
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
+    args: Mapped[dict[str, Any]] = mapped_column(JSON)
+    dedup_key: Mapped[str | None]
+    attempts: Mapped[int]
+    run_after: Mapped[datetime]
+    # Refreshed by the worker while the job runs, stale jobs are requeued
+    heartbeat: Mapped[datetime]
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+    @classmethod
+    def create(cls, db: Session, **kwargs: Any) -> "Job":
+        now = datetime.now(timezone.utc)
+        return super().create(
+            db,
+            status=cls.QUEUED,
+            progress=0,
+            attempts=0,
+            created=now,
+            updated=now,
+            run_after=now,
+            heartbeat=now,
+            **{"args": {}, **kwargs},
+        )
+
+    @classmethod
+    def update(cls, db: Session, id: int, **kwargs: Any) -> "Job":
+        return super().update(db, id, updated=datetime.now(timezone.utc), **kwargs)
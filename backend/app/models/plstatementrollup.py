@@ -0,0 +1,44 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.common import Base
+
+
+class PLStatementRollup(Base):
+    # Consolidated transactions aggregated per day, category and sign of the
+    # amount, for all buckets (bucket_id 0) and for each bucket
+    __tablename__ = "pl_statement_rollup"
+    __table_args__ = (
+        Index(
+            "ix_pl_statement_rollup_user_id_bucket_id_day",
+            "user_id",
+            "bucket_id",
+            "day",
+        ),
+    )
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
+    bucket_id: Mapped[int]
+    day: Mapped[date]
+    category_id: Mapped[int]
+    sign: Mapped[int]
+    amount_default_currency: Mapped[Decimal]
+    income: Mapped[Decimal]
+    expenses: Mapped[Decimal]
@@ -18,7 +18,7 @@ from datetime import date
 from decimal import Decimal
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.category import Category
@@ -35,13 +35,26 @@ logger = logging.getLogger(__name__)
 
 class Transaction(SyncableBase):
     __tablename__ = "transaction"
+    __table_args__ = (
+        Index(
+            "ix_transaction_account_id_timestamp_id", "account_id", "timestamp", "id"
+        ),
+        Index("ix_transaction_user_id_timestamp_id", "user_id", "timestamp", "id"),
+        Index(
+            "ix_transaction_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
     amount: Mapped[Decimal]
     timestamp: Mapped[date]
     name: Mapped[str]
     account_id: Mapped[int] = mapped_column(ForeignKey("account.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
     bucket_id: Mapped[int] = mapped_column(ForeignKey("bucket.id"))
     transaction_group_id: Mapped[int | None] = mapped_column(
-        ForeignKey("transaction_group.id"), nullable=True
+        ForeignKey("transaction_group.id"), nullable=True, index=True
     )
     category_id: Mapped[int | None] = mapped_column(ForeignKey("category.id"))
     amount_default_currency: Mapped[Decimal]
@@ -66,6 +79,12 @@ class Transaction(SyncableBase):
 
     @exchange_rate.setter
     def exchange_rate(self, value: Decimal) -> None:
+        self.amount_default_currency = self.get_amount_default_currency(
+            self.amount, value
+        )
+
+    @staticmethod
+    def get_amount_default_currency(amount: Decimal, exchange_rate: Decimal) -> Decimal:
         TWO_PACES = Decimal(10) ** -2
-        amount_default_currency = self.amount * value
-        self.amount_default_currency = amount_default_currency.quantize(TWO_PACES)
+        amount_default_currency = amount * exchange_rate
+        return amount_default_currency.quantize(TWO_PACES)
@@ -14,13 +14,12 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-import re
 from collections import defaultdict
 from datetime import date
 from decimal import Decimal
 from typing import Any
 
-from sqlalchemy import ColumnElement, ForeignKey, distinct, func, case
+from sqlalchemy import ColumnElement, ForeignKey, Index, distinct, func, case
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
 
@@ -34,6 +33,14 @@ from app.models.transaction import Transaction
 
 class TransactionGroup(Base):
     __tablename__ = "transaction_group"
+    __table_args__ = (
+        Index(
+            "ix_transaction_group_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
     name: Mapped[str]
     transactions: Mapped[list["Transaction"]] = relationship(
         back_populates="transaction_group", lazy="selectin"
@@ -182,27 +189,29 @@ class TransactionGroup(Base):
         )
 
     @classmethod
-    def update(cls, db: Session, id: int, **kwargs: Any) -> "TransactionGroup":
+    def update(
+        cls, db: Session, id: int, user_id: int | None = None, **kwargs: Any
+    ) -> "TransactionGroup":
         m = super().update(db, id, **kwargs)
-        if not m.merchant_id:
-            m.merchant_id = m.get_merchant_id(db)
-        if not m.category_id:
-            m.category_id = m.default_category_id
+        m.__set_defaults(db, user_id)
         return m
 
     @classmethod
-    def create(cls, db: Session, **kwargs: Any) -> "TransactionGroup":
+    def create(
+        cls, db: Session, user_id: int | None = None, **kwargs: Any
+    ) -> "TransactionGroup":
         m = super().create(db, **kwargs)
-        if not m.merchant_id:
-            m.merchant_id = m.get_merchant_id(db)
-        if not m.category_id:
-            m.category_id = m.default_category_id
+        m.__set_defaults(db, user_id)
         return m
 
-    def get_merchant_id(self, db: Session) -> int | None:
-        # TODO: limit to user-defined merchants
-        for merchant in CRUDMerchant.read_many(db):
-            if re.compile(merchant.pattern).search(self.name):
-                return merchant.id
-        else:
-            return None
+    def __set_defaults(self, db: Session, user_id: int | None) -> None:
+        if not self.merchant_id and user_id:
+            merchant_id = self.get_merchant_id(db, user_id)
+            if merchant_id:
+                self.merchant = db.get(Merchant, merchant_id)
+        if not self.category_id:
+            self.category_id = self.default_category_id
+        db.flush()
+
+    def get_merchant_id(self, db: Session, user_id: int) -> int | None:
+        return CRUDMerchant.get_matcher(db, user_id).match(self.name)
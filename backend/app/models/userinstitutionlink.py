@@ -29,7 +29,7 @@ if TYPE_CHECKING:
 class UserInstitutionLink(SyncableBase):
     __tablename__ = "user_institution_link"
 
-    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True)
     institution_id: Mapped[int] = mapped_column(ForeignKey("institution.id"))
     access_token: Mapped[str | None]
     cursor: Mapped[str | None]
@@ -14,29 +14,45 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import csv
+import logging
+import threading
 from io import BytesIO
+from typing import Iterable
 
 import requests
 import sqlalchemy
 from fastapi import HTTPException, status
 from plaid.model.personal_finance_category import PersonalFinanceCategory
+from plaid.model.transaction import Transaction
 from requests import HTTPError
 from requests_cache import CachedSession
+from sqlalchemy import event, select
 from sqlalchemy.orm import Session
 
 from app.crud.category import CRUDSyncableCategory
+from app.models.category import Category
 from app.schemas.category import CategoryPlaidIn
 
+logger = logging.getLogger(__name__)
+
+# Process-wide plaid_id -> category id, ids never change once created
+__category_ids: dict[str, int] = {}
+__category_ids_lock = threading.Lock()
+
 
 def create_category_plaid_in(
     personal_finance_category: PersonalFinanceCategory,
     personal_finance_category_icon_url: str,
+    session: requests.Session | None = None,
 ) -> CategoryPlaidIn:
     plaid_id: str = personal_finance_category.primary
     category_name = plaid_id.replace("_", " ").capitalize()
     plaid_metadata = personal_finance_category.to_str()
-    with CachedSession(expire_after=None) as session:
+    if session:
         response = session.get(personal_finance_category_icon_url)
+    else:
+        with CachedSession(expire_after=None) as session:
+            response = session.get(personal_finance_category_icon_url)
     response.raise_for_status()
     icon = response.content
     return CategoryPlaidIn(
@@ -47,6 +63,87 @@ def create_category_plaid_in(
     )
 
 
+def invalidate_category_ids() -> None:
+    with __category_ids_lock:
+        __category_ids.clear()
+
+
+def __load_category_ids(
+    db: Session, plaid_ids: Iterable[str] | None = None
+) -> dict[str, int]:
+    statement = select(Category.plaid_id, Category.id)
+    if plaid_ids is not None:
+        statement = statement.where(Category.plaid_id.in_(plaid_ids))
+    return {plaid_id: id for plaid_id, id in db.execute(statement) if plaid_id}
+
+
+def get_category_ids(
+    db: Session, transactions: Iterable[Transaction]
+) -> dict[str, int | None]:
+    personal_finance_categories: dict[str, tuple[PersonalFinanceCategory, str]] = {}
+    for transaction in transactions:
+        try:
+            personal_finance_category = transaction.personal_finance_category
+            plaid_id = personal_finance_category.primary
+        except AttributeError:
+            continue
+        personal_finance_categories[plaid_id] = (
+            personal_finance_category,
+            transaction.personal_finance_category_icon_url,
+        )
+
+    new_category_ids: dict[str, int] = db.info.get("new_category_ids", {})
+    with __category_ids_lock:
+        if not __category_ids:
+            __category_ids.update(__load_category_ids(db))
+        category_ids: dict[str, int | None] = {
+            plaid_id: __category_ids.get(plaid_id) or new_category_ids.get(plaid_id)
+            for plaid_id in personal_finance_categories
+        }
+
+    # Each unknown category is looked up, and its icon fetched, only once
+    missing_plaid_ids = [p for p, id in category_ids.items() if id is None]
+    if not missing_plaid_ids:
+        return category_ids
+    found_category_ids = __load_category_ids(db, missing_plaid_ids)
+    with CachedSession(expire_after=None) as session:
+        for plaid_id in missing_plaid_ids:
+            if plaid_id in found_category_ids:
+                continue
+            try:
+                category_in = create_category_plaid_in(
+                    *personal_finance_categories[plaid_id], session=session
+                )
+            except HTTPError as e:
+                logger.warning("Could not fetch category %s: %s", plaid_id, e)
+                continue
+            try:
+                with db.begin_nested():
+                    category_out = CRUDSyncableCategory.create(db, category_in)
+                found_category_ids[plaid_id] = category_out.id
+            except sqlalchemy.exc.IntegrityError:
+                # Created concurrently by another sync
+                found_category_ids.update(__load_category_ids(db, [plaid_id]))
+
+    # Shared with other sessions only once committed, see publish_category_ids
+    db.info.setdefault("new_category_ids", {}).update(found_category_ids)
+    category_ids.update(found_category_ids)
+    return category_ids
+
+
+@event.listens_for(Session, "after_commit")
+def publish_category_ids(db: Session) -> None:
+    new_category_ids = db.info.pop("new_category_ids", {})
+    with __category_ids_lock:
+        __category_ids.update(new_category_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_category_ids(db: Session) -> None:
+    # The categories may not exist anymore, they are looked up again
+    db.info.pop("new_category_ids", None)
+
+
 def get_all_plaid_categories(db: Session) -> None:
     with requests.session() as session:
         response = session.get(
@@ -78,5 +175,6 @@ def get_all_plaid_categories(db: Session) -> None:
                     db, plaid_id=category_in.plaid_id
                 )
                 CRUDSyncableCategory.update(db, category_out.id, category_in)
-            except sqlalchemy.exc.NoResultFound:
+            except HTTPException:  # FIXME: should not throw http exceptions
                 CRUDSyncableCategory.create(db, category_in)
+    invalidate_category_ids()
@@ -18,15 +18,11 @@ import re
 from decimal import Decimal
 
 from plaid.model.counterparty_type import CounterpartyType
-from plaid.model.personal_finance_category import PersonalFinanceCategory
 from plaid.model.transaction import Transaction
-from requests import HTTPError
-from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import Session
 
-from app.crud.category import CRUDSyncableCategory
 from app.crud.transaction import CRUDSyncableTransaction
-from app.plaid.category import create_category_plaid_in
+from app.plaid.category import get_category_ids
 from app.schemas.replacementpattern import ReplacementPatternApiOut
 from app.schemas.transaction import TransactionPlaidIn, TransactionPlaidOut
 
@@ -36,6 +32,7 @@ def create_transaction_plaid_in(
     transaction: Transaction,
     replacement_pattern: ReplacementPatternApiOut | None,
     bucket_id: int,
+    category_ids: dict[str, int | None] | None = None,
 ) -> TransactionPlaidIn:
     if replacement_pattern:
         name = re.sub(
@@ -46,22 +43,12 @@ def create_transaction_plaid_in(
     else:
         name = transaction.name
 
+    if category_ids is None:
+        category_ids = get_category_ids(db, [transaction])
     try:
-        plaid_category: PersonalFinanceCategory = transaction.personal_finance_category
-        try:
-            category_out = CRUDSyncableCategory.read(
-                db, plaid_id=plaid_category.primary
-            )
-        except NoResultFound:
-            try:
-                category_in = create_category_plaid_in(
-                    plaid_category, transaction.personal_finance_category_icon_url
-                )
-                category_out = CRUDSyncableCategory.create(db, category_in)
-            except HTTPError:
-                category_out = None
+        category_id = category_ids.get(transaction.personal_finance_category.primary)
     except AttributeError:
-        category_out = None
+        category_id = None
 
     return TransactionPlaidIn(
         amount=-transaction.amount,
@@ -69,7 +56,7 @@ def create_transaction_plaid_in(
         plaid_id=transaction.transaction_id,
         timestamp=getattr(transaction, "authorized_date") or transaction.date,
         plaid_metadata=transaction.to_str(),
-        category_id=category_out.id if category_out else None,
+        category_id=category_id,
         bucket_id=bucket_id,
     )
 
@@ -14,10 +14,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date
-from typing import Iterable
+from decimal import Decimal
+from typing import Any, Callable, Iterable
 
-import sqlalchemy
+from fastapi import HTTPException
 from plaid.models import (
     ItemWebhookUpdateRequest,
     Item,
@@ -32,11 +35,19 @@ from plaid.models import (
     TransactionsSyncResponse,
 )
 from pydantic import BaseModel
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from app.crud.account import CRUDAccount, CRUDSyncableAccount
-from app.crud.transaction import CRUDSyncableTransaction
+from app.crud.account import CRUDSyncableAccount
+from app.crud.plstatement import CRUDPLStatement
+from app.crud.replacementpattern import CRUDReplacementPattern
+from app.crud.transaction import CRUDSyncableTransaction, CRUDTransaction
+from app.crud.user import CRUDUser
 from app.crud.userinstitutionlink import CRUDSyncableUserInstitutionLink
+from app.database.deps import get_db
+from app.models.account import InstitutionalAccount
+from app.models.transaction import Transaction as TransactionModel
+from app.plaid.category import get_category_ids
 from app.plaid.common import client
 from app.plaid.transaction import create_transaction_plaid_in
 from app.schemas.account import AccountPlaidOut
@@ -46,9 +57,13 @@ from app.schemas.userinstitutionlink import (
     UserInstitutionLinkPlaidIn,
     UserInstitutionLinkPlaidOut,
 )
+from app.utils.exchangerate import get_exchange_rates
 
 logger = logging.getLogger(__name__)
 
+SYNC_LOCK_NAMESPACE = 0x706C64
+SYNC_MAX_WORKERS = 4
+
 
 class __TransactionsSyncResult(BaseModel):
     added: list[tuple[int, TransactionPlaidIn]]
@@ -91,6 +106,7 @@ def __fetch_transaction_changes(
         )
     response: TransactionsSyncResponse = client.transactions_sync(request)
     accounts = __get_accounts_map(db, user_institution_link.id)
+    category_ids = get_category_ids(db, response.added + response.modified)
     return __TransactionsSyncResult(
         added=[
             (
@@ -100,6 +116,7 @@ def __fetch_transaction_changes(
                     transaction,
                     replacement_pattern,
                     accounts[transaction.account_id].default_bucket_id,
+                    category_ids,
                 ),
             )
             for transaction in response.added
@@ -112,6 +129,7 @@ def __fetch_transaction_changes(
                     transaction,
                     replacement_pattern,
                     accounts[transaction.account_id].default_bucket_id,
+                    category_ids,
                 ),
             )
             for transaction in response.modified
@@ -125,6 +143,95 @@ def __fetch_transaction_changes(
     )
 
 
+def __apply_transaction_changes(
+    db: Session,
+    user_institution_link: UserInstitutionLinkPlaidOut,
+    sync_result: __TransactionsSyncResult,
+    default_currency_code: str,
+) -> None:
+    changes = sync_result.added + sync_result.modified
+    if not changes and not sync_result.removed:
+        return
+
+    # Resolve every plaid_id of the page at once
+    plaid_ids = [t.plaid_id for _, t in changes] + sync_result.removed
+    statement = select(
+        TransactionModel.plaid_id,
+        TransactionModel.id,
+        TransactionModel.account_id,
+        TransactionModel.timestamp,
+    ).where(TransactionModel.plaid_id.in_(plaid_ids))
+    existing = {row.plaid_id: row for row in db.execute(statement)}
+
+    # Earliest affected date per account, before and after the changes
+    dirty_timestamps: dict[int, date] = {}
+    for account_id, transaction_in in changes:
+        dirty_timestamps[account_id] = min(
+            transaction_in.timestamp,
+            dirty_timestamps.get(account_id, transaction_in.timestamp),
+        )
+    for plaid_id in [t.plaid_id for _, t in changes] + sync_result.removed:
+        if row := existing.get(plaid_id):
+            dirty_timestamps[row.account_id] = min(
+                row.timestamp, dirty_timestamps.get(row.account_id, row.timestamp)
+            )
+
+    accounts_statement = select(
+        InstitutionalAccount.id, InstitutionalAccount.currency_code
+    ).where(InstitutionalAccount.user_institution_link_id == user_institution_link.id)
+    currency_codes = dict(db.execute(accounts_statement).tuples().all())
+    pairs_by_date: dict[date, set[tuple[str, str]]] = defaultdict(set)
+    for account_id, transaction_in in changes:
+        currency_pair = (currency_codes[account_id], default_currency_code)
+        pairs_by_date[transaction_in.timestamp].add(currency_pair)
+    exchange_rates = get_exchange_rates(db, pairs_by_date)
+
+    def get_values(
+        account_id: int, transaction_in: TransactionPlaidIn
+    ) -> dict[str, Any]:
+        exchange_rate = exchange_rates[
+            (
+                transaction_in.timestamp,
+                currency_codes[account_id],
+                default_currency_code,
+            )
+        ]
+        return {
+            **transaction_in.model_dump(),
+            "account_id": account_id,
+            "user_id": user_institution_link.user_id,
+            "account_balance": Decimal(0),
+            "amount_default_currency": TransactionModel.get_amount_default_currency(
+                transaction_in.amount, exchange_rate
+            ),
+        }
+
+    existing_ids = {plaid_id: row.id for plaid_id, row in existing.items()}
+    # Bulk statements bypass the flush events
+    CRUDPLStatement.mark_rollup_transactions_dirty(db, existing_ids.values())
+    CRUDSyncableTransaction.upsert_many(
+        db,
+        [get_values(*change) for change in sync_result.added],
+        existing_ids,
+        update_existing=False,
+    )
+    CRUDSyncableTransaction.upsert_many(
+        db,
+        [get_values(*change) for change in sync_result.modified],
+        existing_ids,
+        update_existing=True,
+    )
+    CRUDSyncableTransaction.delete_many(
+        db, [existing[p].id for p in sync_result.removed if p in existing]
+    )
+
+    for account_id, timestamp in dirty_timestamps.items():
+        CRUDTransaction.defer_account_balances_update(db, account_id, timestamp)
+    CRUDPLStatement.mark_rollup_dirty(
+        db, user_institution_link.user_id, (t.timestamp for _, t in changes)
+    )
+
+
 def fetch_user_institution_link(access_token: str) -> UserInstitutionLinkPlaidIn:
     request = ItemGetRequest(access_token=access_token)
     response: ItemGetResponse = client.item_get(request)
@@ -181,30 +288,9 @@ def sync_transactions(
         sync_result = __fetch_transaction_changes(
             db, user_institution_link_out, replacement_pattern_out
         )
-        for account_id, transaction_in in sync_result.added:
-            try:
-                CRUDAccount.create_transaction(
-                    db,
-                    account_id,
-                    transaction_in,
-                    default_currency_code=default_currency_code,
-                )
-            except sqlalchemy.exc.IntegrityError:
-                logger.warning("Repeated transaction: %s", str(transaction_in))
-        for account_id, transaction_in in sync_result.modified:
-            transaction_out = CRUDSyncableTransaction.read(
-                db, plaid_id=transaction_in.plaid_id
-            )
-            CRUDAccount.update_transaction(
-                db,
-                account_id,
-                transaction_out.id,
-                transaction_in,
-                default_currency_code=default_currency_code,
-            )
-        for plaid_id in sync_result.removed:
-            transaction_out = CRUDSyncableTransaction.read(db, plaid_id=plaid_id)
-            CRUDSyncableTransaction.delete(db, transaction_out.id)
+        __apply_transaction_changes(
+            db, user_institution_link_out, sync_result, default_currency_code
+        )
         user_institution_link_out.cursor = sync_result.new_cursor
         user_institution_link_new = UserInstitutionLinkPlaidIn(
             **user_institution_link_out.model_dump()
@@ -213,3 +299,62 @@ def sync_transactions(
             db, user_institution_link_out.id, user_institution_link_new
         )
         has_more = sync_result.has_more
+
+
+def __lock_user_institution_link(db: Session, user_institution_link_id: int) -> None:
+    # Held until commit, so concurrent syncs of an item run one after the other
+    if db.get_bind().dialect.name == "postgresql":
+        statement = select(
+            func.pg_advisory_xact_lock(SYNC_LOCK_NAMESPACE, user_institution_link_id)
+        )
+        db.execute(statement)
+
+
+def sync_user_institution_link(db: Session, user_institution_link_id: int) -> None:
+    __lock_user_institution_link(db, user_institution_link_id)
+    # Read the cursor only once the lock is held, so that it never regresses
+    user_institution_link_out = CRUDSyncableUserInstitutionLink.read(
+        db, id=user_institution_link_id
+    )
+    user_out = CRUDUser.read(db, id=user_institution_link_out.user_id)
+    try:
+        replacement_pattern_out = CRUDReplacementPattern.read(
+            db, user_institution_link_id=user_institution_link_out.id
+        )
+    except HTTPException:  # FIXME: should not throw http exceptions
+        replacement_pattern_out = None
+    sync_transactions(
+        db,
+        user_institution_link_out=user_institution_link_out,
+        replacement_pattern_out=replacement_pattern_out,
+        default_currency_code=user_out.default_currency_code,
+    )
+    logger.info("Finished syncing %s.", user_institution_link_out.plaid_id)
+
+
+def __sync_user_institution_link(user_institution_link_id: int) -> None:
+    for db in get_db():
+        sync_user_institution_link(db, user_institution_link_id)
+
+
+def sync_user_institution_links(
+    user_institution_link_ids: list[int],
+    report_progress: Callable[[int, int], None] | None = None,
+) -> None:
+    # Each item is synced and committed in its own session
+    failed_ids = []
+    with ThreadPoolExecutor(max_workers=SYNC_MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(__sync_user_institution_link, id): id
+            for id in user_institution_link_ids
+        }
+        for i, future in enumerate(as_completed(futures)):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Could not sync %s: %s", futures[future], e)
+                failed_ids.append(futures[future])
+            if report_progress:
+                report_progress(i + 1, len(futures))
+    if failed_ids:
+        raise RuntimeError(f"Could not sync user institution links {failed_ids}")
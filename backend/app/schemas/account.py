@@ -103,6 +103,12 @@ class __Property(__NonInstitutionalAccount):
     # address: str
 
 
+class AccountBalanceCheckApiOut(BaseModel):
+    id: int
+    balance: Decimal
+    expected_balance: Decimal
+
+
 class __AccountOut(BaseModel):
     balance: Decimal
     is_synced: bool
@@ -33,7 +33,7 @@ class CategoryApiIn(__Category, ApiInMixin):
 
 
 class CategoryApiOut(__Category, SyncableApiOutMixin):
-    icon_base64: bytes
+    icon_url: str
 
 
 class CategoryPlaidOut(__Category, PlaidOutMixin):
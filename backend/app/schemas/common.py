@@ -14,6 +14,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import logging
 import re
+from functools import lru_cache
+from types import CodeType
 from typing import (
     TypeVar,
     Annotated,
@@ -57,8 +59,13 @@ def validate_currency_code(v: str) -> str:
 CurrencyCode = Annotated[str, AfterValidator(validate_currency_code)]
 
 
+@lru_cache(maxsize=1024)
+def compile_code_snippet(v: str) -> CodeType:
+    return compile(f"def deserialize_field(row): return {v}", "<snippet>", "exec")
+
+
 def validate_code_snippet(v: str) -> str:
-    exec(f"def deserialize_field(row): return {v}")
+    compile_code_snippet(v)
     return v
 
 
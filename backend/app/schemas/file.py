@@ -30,8 +30,8 @@ class __FileBase(BaseModel):
 
 class FileApiOut(__FileBase, ApiOutMixin):
     uploaded: datetime
+    size: int
     transaction_id: int
 
 
-class FileApiIn(__FileBase, ApiInMixin):
-    data: bytes
+class FileApiIn(__FileBase, ApiInMixin): ...
@@ -41,7 +41,7 @@ class __InstitutionBase(BaseModel):
 
 
 class InstitutionApiOut(__InstitutionBase, SyncableApiOutMixin):
-    logo_base64: str | None = None
+    logo_url: str | None = None
     is_synced: bool
     transaction_deserialiser_id: int | None
     replacement_pattern_id: int | None
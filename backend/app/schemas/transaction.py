@@ -58,25 +58,27 @@ class TransactionPlaidIn(TransactionApiIn, PlaidInMixin): ...
 class TransactionPlaidOut(TransactionApiOut, PlaidOutMixin): ...
 
 
+TransactionOrderBy = Literal[
+    "id__asc",
+    "id__desc",
+    "timestamp__asc",
+    "timestamp__desc",
+    "amount_default_currency__asc",
+    "amount_default_currency__desc",
+    "amount__asc",
+    "amount__desc",
+    "account_balance__asc",
+    "account_balance__desc",
+    "account_id__asc",
+    "account_id__desc",
+]
+
+
 class TransactionQueryArg(BaseModel):
     search: str | None = None
     per_page: int = 0
     page: int = 0
-    order_by: Literal[
-        "id__asc",
-        "id__desc",
-        "timestamp__asc",
-        "timestamp__desc",
-        "amount_default_currency__asc",
-        "amount_default_currency__desc",
-        "amount__asc",
-        "amount__desc",
-        "account_balance__asc",
-        "account_balance__desc",
-        "account_id__asc",
-        "account_id__desc",
-        None,
-    ] = None
+    order_by: TransactionOrderBy | None = None
     id__eq: int | None = None
     timestamp__eq: date | None = None
     timestamp__gt: date | None = None
@@ -119,3 +121,7 @@ class TransactionQueryArg(BaseModel):
     account_balance__lt__abs: Decimal | None = None
     account_id__eq: int | None = None
     bucket_id: int | None = None
+
+
+class ConsolidatedTransactionQueryArg(TransactionQueryArg):
+    cursor: str | None = None
@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import secrets
+from typing import Literal
 
 from pydantic import EmailStr
 from pydantic import Field, PostgresDsn
@@ -29,6 +30,13 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "QuartOS"
 
     DATABASE_URL: PostgresDsn = Field(default=...)
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT_SECONDS: int = 30
+    DATABASE_POOL_RECYCLE_SECONDS: int = 30 * 60
+    # Zero disables the timeout
+    INTERACTIVE_STATEMENT_TIMEOUT_SECONDS: int = 30
+    BACKGROUND_STATEMENT_TIMEOUT_SECONDS: int = 10 * 60
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
     FIRST_SUPERUSER: EmailStr = Field(default=...)
@@ -39,6 +47,17 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str = Field(default=...)
     GOOGLE_SITE_KEY: str = Field(default=...)
 
+    WORKER_THREADS: int = 4
+
+    CACHE_EXPIRE_SECONDS: int = 300
+    CACHE_GENERATION_SECONDS: int = 5
+    CURRENT_USER_CACHE_EXPIRE_SECONDS: int = 30
+
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    STORAGE_PATH: str = "storage"
+    S3_BUCKET: str = "quartos"
+    S3_ENDPOINT_URL: str | None = None
+
     class Config:
         case_sensitive = True
 
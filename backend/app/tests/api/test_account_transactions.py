@@ -0,0 +1,32 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.schemas.account import CashApiOut
+
+
+@pytest.mark.parametrize("limit", [-1, 0])
+def test_preview_rejects_limit(
+    client: TestClient, headers: dict[str, str], account: CashApiOut, limit: int
+) -> None:
+    response = client.post(
+        f"/users/me/accounts/{account.id}/transactions/preview",
+        params={"limit": limit},
+        files={"file": ("transactions.csv", b"")},
+        headers=headers,
+    )
+    assert response.status_code == 422
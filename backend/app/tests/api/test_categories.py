@@ -0,0 +1,56 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.utils.common import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+
+
+def test_read_icon(db: Session, client: TestClient, category: Category) -> None:
+    db.commit()
+    etag = f'"{category.icon_hash}"'
+
+    response = client.get(f"/{category.icon_url}")
+    assert response.status_code == 200
+    assert response.content == b"icon"
+    assert response.headers["ETag"] == etag
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+
+    # Unversioned or stale URLs, the icon may have changed since
+    url = f"/categories/{category.id}/icon"
+    for unversioned_url in [url, f"{url}?v=stale"]:
+        response = client.get(unversioned_url)
+        assert response.status_code == 200
+        assert response.headers["ETag"] == etag
+        assert response.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+
+
+def test_read_icon_changed(db: Session, client: TestClient, category: Category) -> None:
+    stale_url = category.icon_url
+    category.icon = b"new icon"
+    db.commit()
+
+    response = client.get(f"/{stale_url}")
+    assert response.content == b"new icon"
+    assert response.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    response = client.get(f"/{category.icon_url}")
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
@@ -0,0 +1,58 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.institution import Institution
+from app.utils.common import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+
+
+@pytest.fixture
+def institution(db: Session) -> Institution:
+    institution = Institution.create(db, name="Bank", country_code="US", logo=b"logo")
+    db.commit()
+    return institution
+
+
+def test_read_logo(client: TestClient, institution: Institution) -> None:
+    assert institution.logo_url
+    etag = f'"{institution.logo_hash}"'
+
+    response = client.get(f"/{institution.logo_url}")
+    assert response.status_code == 200
+    assert response.content == b"logo"
+    assert response.headers["ETag"] == etag
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+
+    response = client.get(
+        f"/institutions/{institution.id}/logo",
+        params={"v": "stale"},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+
+
+def test_read_logo_missing(
+    db: Session, client: TestClient, institution: Institution
+) -> None:
+    institution.logo = None
+    db.commit()
+    response = client.get(f"/institutions/{institution.id}/logo")
+    assert response.status_code == 404
@@ -0,0 +1,80 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction
+from app.schemas.account import CashApiOut
+from app.tests.utils import get_transaction_values
+from app.utils import storage as storage_module
+from app.utils.storage import LocalStorage
+
+DATA = bytes(range(256)) * 40
+
+
+def test_upload_download_delete(
+    monkeypatch: pytest.MonkeyPatch,
+    db: Session,
+    client: TestClient,
+    headers: dict[str, str],
+    account: CashApiOut,
+    storage: LocalStorage,
+) -> None:
+    # Several chunks each way, nothing is read whole
+    monkeypatch.setattr(storage_module, "CHUNK_SIZE", 1024)
+    transaction = Transaction.create(db, **next(get_transaction_values(account, 1)))
+    db.commit()
+    url = f"/users/me/accounts/{account.id}/transactions/{transaction.id}/files/"
+    key = hashlib.sha256(DATA).hexdigest()
+
+    response = client.post(url, files={"file": ("receipt.pdf", DATA)}, headers=headers)
+    assert response.status_code == 200
+    file_id = response.json()["id"]
+    assert response.json()["size"] == len(DATA)
+    assert b"".join(storage.open(key)) == DATA
+
+    with client.stream("GET", f"{url}{file_id}", headers=headers) as response:
+        assert response.status_code == 200
+        assert response.headers["Content-Length"] == str(len(DATA))
+        assert response.headers["Content-Type"] == "application/pdf"
+        assert b"".join(response.iter_bytes()) == DATA
+
+    response = client.delete(f"{url}{file_id}", headers=headers)
+    assert response.status_code == 200
+    with pytest.raises(FileNotFoundError):
+        storage.open(key)
+
+
+def test_download_missing_data(
+    db: Session,
+    client: TestClient,
+    headers: dict[str, str],
+    account: CashApiOut,
+    storage: LocalStorage,
+) -> None:
+    transaction = Transaction.create(db, **next(get_transaction_values(account, 1)))
+    db.commit()
+    url = f"/users/me/accounts/{account.id}/transactions/{transaction.id}/files/"
+    response = client.post(url, files={"file": ("receipt.pdf", DATA)}, headers=headers)
+    file_id = response.json()["id"]
+    storage.delete(hashlib.sha256(DATA).hexdigest())
+
+    response = client.get(f"{url}{file_id}", headers=headers)
+    assert response.status_code == 404
@@ -0,0 +1,76 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud.account import CRUDAccount
+from app.crud.transaction import CRUDTransaction
+from app.models.account import Account
+from app.models.transaction import Transaction
+from app.schemas.account import CashApiOut, CashApiIn
+from app.tests.utils import seed_transactions, timed
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.postgresql]
+
+N_TRANSACTIONS = 100_000
+
+
+def update_account_balances_per_row(db: Session, id: int) -> None:
+    # The recomputation as it was before the window function UPDATE
+    prev_balance = Account.read(db, id__eq=id).initial_balance
+    statement = Transaction.select(account_id__eq=id, order_by="timestamp__asc")
+    for transaction in db.scalars(statement).yield_per(50):
+        account_balance = prev_balance + transaction.amount
+        Transaction.update(db, transaction.id, account_balance=account_balance)
+        prev_balance = transaction.account_balance
+
+
+def get_balances(db: Session, id: int) -> list[Decimal]:
+    statement = (
+        select(Transaction.account_balance)
+        .where(Transaction.account_id == id)
+        .order_by(Transaction.timestamp, Transaction.id)
+    )
+    return list(db.scalars(statement))
+
+
+def test_update_account_balances(
+    db: Session, account: CashApiOut, report: list[str]
+) -> None:
+    # Two identical accounts, so that neither run sees the other's dead rows
+    account_in = CashApiIn.model_validate(account, from_attributes=True)
+    other_account = CRUDAccount.create(db, account_in, user_id=account.user_id)
+    assert isinstance(other_account, CashApiOut)
+    seed_transactions(db, account, N_TRANSACTIONS)
+    seed_transactions(db, other_account, N_TRANSACTIONS)
+    db.commit()
+
+    per_row = timed(lambda: update_account_balances_per_row(db, account.id))
+    db.expunge_all()
+    window = timed(
+        lambda: CRUDTransaction.update_account_balances(db, other_account.id)
+    )
+    assert get_balances(db, other_account.id) == get_balances(db, account.id)
+
+    report.append(
+        f"account balances, {N_TRANSACTIONS} transactions: "
+        f"per row {per_row:.2f}s, window function {window:.2f}s "
+        f"({per_row / window:.0f}x)"
+    )
+    assert window < per_row
@@ -0,0 +1,180 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Annotated, Iterable
+
+import httpx
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from jose import jwt
+from sqlalchemy.orm import Session
+
+import app
+from app.api import router
+from app.crud.consolidatedtransaction import CRUDConsolidatedTransaction
+from app.crud.user import CRUDUser
+from app.database.deps import DBSession
+from app.deps.user import reusable_oauth2
+from app.schemas.transaction import TransactionApiOut
+from app.schemas.transactiongroup import TransactionGroupApiOut
+from app.schemas.user import UserApiOut
+from app.settings import settings
+from app.tests.utils import create_user_account, seed_transactions
+from app.utils import ALGORITHM, create_access_token
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.postgresql]
+
+N_TRANSACTIONS = 10_000
+CLIENTS = 200
+DURATION_SECONDS = 10
+PATH = "/users/me/transactions/?consolidate=true&per_page=20"
+
+before_router = APIRouter()
+
+
+def get_current_user_before(
+    db: DBSession, token: str = Depends(reusable_oauth2)
+) -> UserApiOut:
+    # Authentication as it was before, on the request's sync session
+    payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[ALGORITHM])
+    return CRUDUser.read_current(db, int(payload["sub"]), token)
+
+
+@before_router.get("/users/me/transactions/")
+def read_transactions_before(
+    db: DBSession,
+    me: Annotated[UserApiOut, Depends(get_current_user_before)],
+    consolidate: bool = False,
+    per_page: int = 0,
+) -> Iterable[TransactionApiOut | TransactionGroupApiOut]:
+    # The listing as it was before, a sync endpoint on the threadpool
+    transactions_out, _ = CRUDConsolidatedTransaction.read_page(
+        db, user_id=me.id, consolidate=consolidate, per_page=per_page
+    )
+    return transactions_out
+
+
+def create_app() -> FastAPI:
+    # Served by uvicorn in its own process, see start_server
+    api = FastAPI()
+    api.include_router(router)
+    api.include_router(before_router, prefix="/before")
+    return api
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def start_server(port: int) -> subprocess.Popen[bytes]:
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "--factory",
+        f"{__name__}:create_app",
+        "--port",
+        str(port),
+        "--log-level",
+        "warning",
+    ]
+    # The settings need a host in the URL, even for a socket in ?host=, and the
+    # secret must be shared for the server to accept this process' tokens
+    env = {
+        **os.environ,
+        "DATABASE_URL": os.environ["TEST_DATABASE_URL"],
+        "JWT_SECRET_KEY": settings.JWT_SECRET_KEY,
+    }
+    cwd = Path(app.__file__).parent.parent
+    server = subprocess.Popen(command, cwd=cwd, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/openapi.json")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("the server did not start")
+
+
+async def get_requests_per_second(
+    url: str, headers: dict[str, str]
+) -> tuple[float, int]:
+    # CLIENTS clients, each sending its next request once the last one is done,
+    # failed and timed out requests (e.g. pool timeouts) are counted apart
+    limits = httpx.Limits(max_connections=CLIENTS)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        for _ in range(10):
+            (await client.get(url, headers=headers)).raise_for_status()
+
+        async def run_client(deadline: float) -> tuple[int, int]:
+            n, failed = 0, 0
+            while time.perf_counter() < deadline:
+                try:
+                    response = await client.get(url, headers=headers)
+                except httpx.TimeoutException:
+                    failed += 1
+                    continue
+                if response.is_success:
+                    n += 1
+                else:
+                    failed += 1
+            return n, failed
+
+        start = time.perf_counter()
+        deadline = start + DURATION_SECONDS
+        counts = await asyncio.gather(*(run_client(deadline) for _ in range(CLIENTS)))
+        elapsed = time.perf_counter() - start
+        return sum(n for n, _ in counts) / elapsed, sum(f for _, f in counts)
+
+
+def test_concurrent_requests(db: Session, report: list[str]) -> None:
+    account = create_user_account(db, 0)
+    seed_transactions(db, account, N_TRANSACTIONS)
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(str(account.user_id))}"}
+
+    port = get_free_port()
+    server = start_server(port)
+    try:
+        url = f"http://127.0.0.1:{port}"
+        before, before_failed = asyncio.run(
+            get_requests_per_second(f"{url}/before{PATH}", headers)
+        )
+        after, after_failed = asyncio.run(
+            get_requests_per_second(f"{url}{PATH}", headers)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    report.append(
+        f"transactions listing, {CLIENTS} concurrent clients: "
+        f"before {before:.1f} requests/s ({before_failed} failed), "
+        f"after {after:.1f} requests/s ({after_failed} failed)"
+    )
+    # The throughput depends on the cores the server gets, only reported
+    assert after_failed == 0
@@ -0,0 +1,84 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.crud.account import CRUDAccount
+from app.crud.transaction import CRUDTransaction
+from app.schemas.account import CashApiIn, CashApiOut
+from app.schemas.transaction import TransactionApiIn
+from app.tests.utils import get_transaction_values, timed
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.postgresql]
+
+
+def create_many_transactions_per_row(
+    db: Session, account_id: int, transactions: list[TransactionApiIn]
+) -> None:
+    # The upload as it was before the single INSERT, one flush per row
+    for transaction_in in transactions:
+        CRUDTransaction.create(
+            db,
+            transaction_in,
+            account_id=account_id,
+            account_balance=Decimal(0),
+            amount_default_currency=transaction_in.amount,
+        )
+    min_timestamp = min(t.timestamp for t in transactions)
+    CRUDTransaction.update_account_balances(db, account_id, min_timestamp)
+
+
+@pytest.mark.parametrize("n", [1_000, 10_000, 100_000])
+def test_create_many_transactions(
+    db: Session, account: CashApiOut, n: int, report: list[str]
+) -> None:
+    account_in = CashApiIn.model_validate(account, from_attributes=True)
+    other_account = CRUDAccount.create(db, account_in, user_id=account.user_id)
+    transactions = [
+        TransactionApiIn.model_validate(values)
+        for values in get_transaction_values(account, n)
+    ]
+    # Otherwise autovacuum may analyze the table truncated by the previous case
+    # while this one's rows are uncommitted, and plan the balance UPDATE for an
+    # empty table, rescanning the window subquery once per row
+    db.execute(text("ANALYZE transaction"))
+    db.commit()
+
+    per_row = timed(
+        lambda: create_many_transactions_per_row(db, account.id, transactions)
+    )
+    db.commit()
+    db.expunge_all()
+
+    def create_many_transactions() -> None:
+        CRUDAccount.create_many_transactions(db, other_account.id, transactions, "EUR")
+        CRUDTransaction.update_dirty_account_balances(db)
+
+    bulk = timed(create_many_transactions)
+    db.commit()
+    assert CRUDAccount.read(db, id=other_account.id).balance == (
+        CRUDAccount.read(db, id=account.id).balance
+    )
+
+    report.append(
+        f"create many transactions, {n} transactions: "
+        f"per row {per_row:.2f}s, single insert {bulk:.2f}s "
+        f"({per_row / bulk:.0f}x)"
+    )
+    assert bulk < per_row
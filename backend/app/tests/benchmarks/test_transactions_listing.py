@@ -0,0 +1,83 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Any
+
+import pytest
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from app.crud.consolidatedtransaction import CRUDConsolidatedTransaction
+from app.models.account import Account, NonInstitutionalAccount
+from app.models.transaction import Transaction
+from app.models.userinstitutionlink import UserInstitutionLink
+from app.tests.utils import create_user_account, seed_transactions, timed
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.postgresql]
+
+N_USERS = 20
+N_TRANSACTIONS = 10_000
+PER_PAGE = 50
+
+
+def select_page_before(user_id: int) -> Select[Any]:
+    # The listing as it was before transactions stored their owner
+    return (
+        select(
+            Transaction.id,
+            Transaction.name,
+            Transaction.category_id,
+            Transaction.transaction_group_id,
+            Transaction.amount_default_currency,
+            Transaction.timestamp,
+            Transaction.amount,
+            Transaction.account_id,
+            Transaction.bucket_id,
+            Transaction.account_balance,
+            Transaction.is_synced,
+        )
+        .join(Account)
+        .outerjoin(UserInstitutionLink)
+        .where(
+            (NonInstitutionalAccount.user_id == user_id)
+            | (UserInstitutionLink.user_id == user_id)
+        )
+        .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        .limit(PER_PAGE)
+    )
+
+
+def test_transactions_listing(db: Session, report: list[str]) -> None:
+    for i in range(N_USERS):
+        account = create_user_account(db, i)
+        seed_transactions(db, account, N_TRANSACTIONS, seed=i)
+    db.commit()
+
+    before_statement = select_page_before(account.user_id)
+    after_statement = CRUDConsolidatedTransaction.select(
+        user_id=account.user_id, per_page=PER_PAGE, order_by="timestamp__desc"
+    )
+    before_rows = db.execute(before_statement).all()
+    after_rows = db.execute(after_statement).all()
+    assert [r.id for r in after_rows] == [r.id for r in before_rows]
+
+    before = timed(lambda: db.execute(before_statement).all(), repeat=20)
+    after = timed(lambda: db.execute(after_statement).all(), repeat=20)
+    report.append(
+        f"transactions listing, {N_USERS * N_TRANSACTIONS} transactions: "
+        f"before {before * 1000:.2f}ms, after {after * 1000:.2f}ms "
+        f"({before / after:.0f}x)"
+    )
+    assert after < before
@@ -0,0 +1,122 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import random
+import string
+from typing import Any
+
+import pytest
+from sqlalchemy import Select, insert, text
+from sqlalchemy.orm import Session
+
+from app.crud.consolidatedtransaction import (
+    ConsolidatedTransaction,
+    CRUDConsolidatedTransaction,
+)
+from app.models.transaction import Transaction
+from app.tests.utils import create_user_account, get_transaction_values, timed
+from app.utils.common import get_search_expressions
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.postgresql, pytest.mark.pg_trgm]
+
+N_TRANSACTIONS = 1_000_000
+N_NAMES = 1000
+N_GROUPS = 10_000
+PER_PAGE = 50
+SEARCH = "-refund"
+
+
+def get_names(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(n)]
+
+
+def seed_named_transactions(db: Session, user_id: int, account: Any) -> str:
+    # Names drawn from N_NAMES words, the first N_GROUPS pairs in a group
+    values = get_transaction_values(account, N_TRANSACTIONS)
+    while batch := list(itertools.islice(values, 10000)):
+        db.execute(insert(Transaction), batch)
+    names = get_names(N_NAMES)
+    db.execute(
+        text(
+            "UPDATE transaction SET name = (CAST(:names AS text[]))[1 + id % :n] "
+            "|| CASE WHEN id % 7 = 0 THEN ' refund' ELSE ' shop' END"
+        ),
+        {"names": names, "n": N_NAMES},
+    )
+    db.execute(
+        text(
+            "INSERT INTO transaction_group (id, name) "
+            "SELECT g, (CAST(:names AS text[]))[1 + g % :n] || ' shop' "
+            "FROM generate_series(1, :groups) AS g"
+        ),
+        {"names": names, "n": N_NAMES, "groups": N_GROUPS},
+    )
+    db.execute(
+        text(
+            "UPDATE transaction SET transaction_group_id = (id + 1) / 2 "
+            "WHERE user_id = :user_id AND id <= 2 * :groups"
+        ),
+        {"user_id": user_id, "groups": N_GROUPS},
+    )
+    db.execute(text("ANALYZE transaction"))
+    db.execute(text("ANALYZE transaction_group"))
+    return names[0]
+
+
+def select_page_before(user_id: int, search: str) -> Select[Any]:
+    # Consolidated search as it was before the prefilter, only in HAVING
+    model: Any = ConsolidatedTransaction
+    return CRUDConsolidatedTransaction.select(
+        user_id=user_id,
+        consolidate=True,
+        per_page=PER_PAGE,
+        order_by="timestamp__desc",
+    ).having(*get_search_expressions(search, model.name))
+
+
+def test_transactions_search(db: Session, report: list[str]) -> None:
+    account = create_user_account(db, 0)
+    name = seed_named_transactions(db, account.user_id, account)
+    db.commit()
+    search = f"{name} {SEARCH}"
+
+    after_statement = CRUDConsolidatedTransaction.select(
+        user_id=account.user_id,
+        consolidate=True,
+        search=search,
+        per_page=PER_PAGE,
+        order_by="timestamp__desc",
+    )
+    after_rows = db.execute(after_statement).all()
+    after = timed(lambda: db.execute(after_statement).all(), repeat=5)
+
+    # Without the trigram indexes, rolled back afterwards
+    db.execute(text("DROP INDEX ix_transaction_name_trgm"))
+    db.execute(text("DROP INDEX ix_transaction_group_name_trgm"))
+    before_statement = select_page_before(account.user_id, search)
+    before_rows = db.execute(before_statement).all()
+    before = timed(lambda: db.execute(before_statement).all(), repeat=5)
+    db.rollback()
+
+    assert after_rows
+    assert [r.id for r in after_rows] == [r.id for r in before_rows]
+    report.append(
+        f"transactions search, {N_TRANSACTIONS} transactions: "
+        f"before {before * 1000:.2f}ms, after {after * 1000:.2f}ms "
+        f"({before / after:.0f}x)"
+    )
+    assert after < before
@@ -0,0 +1,238 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from pathlib import Path
+
+# Settings are validated on import, the tests never reach these services
+for key, value in {
+    "DATABASE_URL": "postgresql://postgres@localhost/postgres",
+    "FIRST_SUPERUSER": "admin@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "password",
+    "FIRST_SUPERUSER_FULL_NAME": "Admin",
+    "GOOGLE_API_KEY": "test",
+    "GOOGLE_SITE_KEY": "test",
+    "OPEN_EXCHANGE_RATES_ID": "test",
+    "PLAID_CLIENT_ID": "test",
+    "PLAID_SECRET": "test",
+    "PLAID_ENV": "sandbox",
+    "PLAID_PRODUCTS": "transactions",
+    "PLAID_COUNTRY_CODES": "US",
+}.items():
+    os.environ.setdefault(key, value)
+
+from decimal import Decimal  # noqa: E402
+from typing import Generator  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from _pytest.terminal import TerminalReporter  # noqa: E402
+from sqlalchemy import Engine, create_engine, make_url, text  # noqa: E402
+from sqlalchemy.exc import DBAPIError  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from sqlalchemy.pool import NullPool, StaticPool  # noqa: E402
+
+import app.database.deps as deps  # noqa: E402
+from app.api import router  # noqa: E402
+from app.crud.account import CRUDAccount  # noqa: E402
+from app.database.base import Base, Bucket, Category, User  # noqa: E402
+from app.plaid.category import invalidate_category_ids  # noqa: E402
+from app.schemas.account import CashApiOut, CashApiIn  # noqa: E402
+from app.utils import create_access_token  # noqa: E402
+from app.utils.cache import get_caches  # noqa: E402
+from app.utils.storage import LocalStorage  # noqa: E402
+
+# Single table inheritance, the migrations make the subclass columns nullable
+Base.metadata.tables["account"].c.user_institution_link_id.nullable = True
+
+__benchmark_results: list[str] = []
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        help="run the benchmarks, against the TEST_DATABASE_URL PostgreSQL",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "benchmark: only run with --benchmark")
+    config.addinivalue_line("markers", "postgresql: needs a TEST_DATABASE_URL")
+    config.addinivalue_line("markers", "pg_trgm: needs the pg_trgm extension")
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: list[pytest.Item]
+) -> None:
+    skip_benchmark = pytest.mark.skip(reason="needs --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords and not config.getoption("--benchmark"):
+            item.add_marker(skip_benchmark)
+
+
+def pytest_terminal_summary(terminalreporter: TerminalReporter) -> None:
+    if __benchmark_results:
+        terminalreporter.write_sep("=", "benchmarks")
+        for line in __benchmark_results:
+            terminalreporter.write_line(line)
+
+
+@pytest.fixture
+def report() -> Generator[list[str], None, None]:
+    # Lines appended here are printed after the test session
+    lines: list[str] = []
+    yield lines
+    __benchmark_results.extend(lines)
+
+
+def __create_extensions(engine: Engine) -> None:
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError:
+        # Without pg_trgm the trigram indexes are left out of the test schema
+        for table in Base.metadata.tables.values():
+            for index in list(table.indexes):
+                if (
+                    "gin_trgm_ops"
+                    in index.dialect_options["postgresql"]["ops"].values()
+                ):
+                    table.indexes.remove(index)
+
+
+@pytest.fixture(scope="session")
+def engine() -> Generator[Engine, None, None]:
+    url = os.environ.get("TEST_DATABASE_URL")
+    test_async_engine: AsyncEngine | None = None
+    if url:
+        test_engine = create_engine(url)
+        __create_extensions(test_engine)
+        # Not pooled, each test client request runs on an event loop of its own
+        test_async_engine = create_async_engine(
+            make_url(url).set(drivername="postgresql+asyncpg"), poolclass=NullPool
+        )
+    else:
+        test_engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    Base.metadata.drop_all(test_engine)
+    Base.metadata.create_all(test_engine)
+    default_engine, deps.engine = deps.engine, test_engine
+    default_async_engine, deps.async_engine = deps.async_engine, test_async_engine
+    yield test_engine
+    deps.engine = default_engine
+    deps.async_engine = default_async_engine
+    Base.metadata.drop_all(test_engine)
+    test_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def has_pg_trgm(engine: Engine) -> bool:
+    if engine.dialect.name != "postgresql":
+        return False
+    statement = text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")
+    with engine.connect() as connection:
+        return bool(connection.scalar(statement))
+
+
+@pytest.fixture(autouse=True)
+def requirements(
+    request: pytest.FixtureRequest, engine: Engine, has_pg_trgm: bool
+) -> None:
+    is_postgresql = engine.dialect.name == "postgresql"
+    if request.node.get_closest_marker("postgresql") and not is_postgresql:
+        pytest.skip("needs a TEST_DATABASE_URL")
+    if request.node.get_closest_marker("pg_trgm") and not has_pg_trgm:
+        pytest.skip("needs the pg_trgm extension")
+
+
+@pytest.fixture
+def db(engine: Engine) -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        yield session
+    # Ids are reused across tests, so nothing cached may outlive one
+    for cache in get_caches():
+        cache.clear()
+    invalidate_category_ids()
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            tables = ", ".join(f'"{t.name}"' for t in Base.metadata.sorted_tables)
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        else:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+
+
+@pytest.fixture
+def user(db: Session) -> User:
+    return User.create(
+        db,
+        email="user@example.com",
+        full_name="User",
+        hashed_password="",
+        is_superuser=False,
+        default_currency_code="EUR",
+    )
+
+
+@pytest.fixture
+def bucket(db: Session, user: User) -> Bucket:
+    return Bucket.create(db, name="Bucket", user_id=user.id)
+
+
+@pytest.fixture
+def category(db: Session) -> Category:
+    return Category.create(db, name="Category", icon=b"icon")
+
+
+@pytest.fixture
+def account(db: Session, user: User, bucket: Bucket) -> CashApiOut:
+    account_in = CashApiIn(
+        name="Cash",
+        type="cash",
+        currency_code="EUR",
+        initial_balance=Decimal(0),
+        default_bucket_id=bucket.id,
+    )
+    account_out = CRUDAccount.create(db, account_in, user_id=user.id)
+    assert isinstance(account_out, CashApiOut)
+    return account_out
+
+
+@pytest.fixture
+def storage(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> LocalStorage:
+    local_storage = LocalStorage(str(tmp_path))
+    monkeypatch.setattr("app.crud.file.get_storage", lambda: local_storage)
+    return local_storage
+
+
+@pytest.fixture
+def client(db: Session) -> TestClient:
+    # app.main seeds the database on import, so the routes are mounted here
+    api = FastAPI()
+    api.include_router(router)
+    return TestClient(api)
+
+
+@pytest.fixture
+def headers(db: Session, user: User) -> dict[str, str]:
+    # Requests run in their own sessions, which must see the user
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
@@ -0,0 +1,88 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from app.crud.category import CRUDCategory
+from app.models.cachegeneration import CacheGeneration
+from app.models.category import Category
+from app.schemas.category import CategoryApiIn
+
+
+def read_name(engine: Engine, id: int) -> str:
+    # As another request would, in a session of its own
+    with Session(engine) as db:
+        return CRUDCategory.read(db, id=id).name
+
+
+def update_name(db: Session, id: int, name: str) -> None:
+    CRUDCategory.update(db, id, CategoryApiIn(name=name))
+
+
+def test_read_cleared_on_commit(
+    db: Session, engine: Engine, category: Category
+) -> None:
+    db.commit()
+    assert read_name(engine, category.id) == "Category"
+
+    update_name(db, category.id, "Updated")
+    # Uncommitted, other requests keep the committed category
+    assert CRUDCategory.read(db, id=category.id).name == "Updated"
+    assert read_name(engine, category.id) == "Category"
+
+    db.commit()
+    assert read_name(engine, category.id) == "Updated"
+
+
+def test_read_kept_on_rollback(db: Session, engine: Engine, category: Category) -> None:
+    db.commit()
+    assert read_name(engine, category.id) == "Category"
+    generation = CacheGeneration.get(db, Category.__tablename__)
+    cache = CRUDCategory.__cache__
+    assert cache is not None
+    hits = cache.hits
+
+    update_name(db, category.id, "Updated")
+    db.rollback()
+    assert read_name(engine, category.id) == "Category"
+    assert cache.hits == hits + 1
+    assert CacheGeneration.get(db, Category.__tablename__) == generation
+
+
+def test_read_not_cached_across_commit(
+    db: Session,
+    engine: Engine,
+    category: Category,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    db.commit()
+    model_validate = CRUDCategory.model_validate
+
+    def commit_then_validate(obj: Any) -> Any:
+        # Another request of this process commits an update between the
+        # SELECT and the caching of its result
+        monkeypatch.setattr(CRUDCategory, "model_validate", model_validate)
+        with Session(engine) as writer:
+            update_name(writer, category.id, "Updated")
+            writer.commit()
+        return model_validate(obj)
+
+    monkeypatch.setattr(CRUDCategory, "model_validate", commit_then_validate)
+    assert read_name(engine, category.id) == "Category"
+    assert read_name(engine, category.id) == "Updated"
@@ -0,0 +1,137 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.crud.account import CRUDAccount
+from app.crud.consolidatedtransaction import CRUDConsolidatedTransaction
+from app.crud.transactiongroup import CRUDTransactionGroup
+from app.models.bucket import Bucket
+from app.models.exchangerate import ExchangeRate
+from app.schemas.account import CashApiIn, CashApiOut
+from app.schemas.transaction import TransactionApiIn
+from app.schemas.transactiongroup import TransactionGroupApiIn
+from app.utils.common import encode_cursor
+
+
+def create_transactions(db: Session, account: CashApiOut, n: int) -> list[int]:
+    transactions_in = [
+        TransactionApiIn(
+            amount=Decimal(i + 1),
+            timestamp=date(2024, 1, 1),
+            name=f"Transaction {i}",
+            bucket_id=account.default_bucket_id,
+        )
+        for i in range(n)
+    ]
+    transactions_out = CRUDAccount.create_many_transactions(
+        db, account.id, transactions_in, "EUR"
+    )
+    return [t.id for t in transactions_out]
+
+
+@pytest.fixture
+def consolidated_ids(
+    db: Session, account: CashApiOut, bucket: Bucket
+) -> set[tuple[int, bool]]:
+    for currency_code, rate in {"USD": "1", "EUR": "0.5"}.items():
+        ExchangeRate.create(
+            db, timestamp=date(2024, 1, 1), currency_code=currency_code, rate=rate
+        )
+    account_in = CashApiIn(
+        name="Dollars",
+        type="cash",
+        currency_code="USD",
+        initial_balance=Decimal(0),
+        default_bucket_id=bucket.id,
+    )
+    other_account = CRUDAccount.create(db, account_in, user_id=account.user_id)
+    assert isinstance(other_account, CashApiOut)
+    ids = create_transactions(db, account, 6)
+    other_ids = create_transactions(db, other_account, 6)
+    # Groups spanning both accounts have a NULL amount and account_id
+    group_ids: set[int] = set()
+    for i in range(3):
+        group_ids.add(
+            CRUDTransactionGroup.create(
+                db,
+                TransactionGroupApiIn(name=f"Group {i}"),
+                [ids.pop(), other_ids.pop()],
+                user_id=account.user_id,
+            ).id
+        )
+    return {(id, False) for id in ids + other_ids} | {(id, True) for id in group_ids}
+
+
+@pytest.mark.parametrize(
+    "order_by", ["amount__asc", "amount__desc", "account_id__asc", "account_id__desc"]
+)
+def test_read_page_null_values(
+    db: Session,
+    account: CashApiOut,
+    consolidated_ids: set[tuple[int, bool]],
+    order_by: str,
+) -> None:
+    ids: list[tuple[int, bool]] = []
+    cursor = None
+    while True:
+        transactions_out, cursor = CRUDConsolidatedTransaction.read_page(
+            db,
+            user_id=account.user_id,
+            consolidate=True,
+            per_page=2,
+            order_by=order_by,
+            cursor=cursor,
+        )
+        ids.extend((t.id, t.is_group) for t in transactions_out)
+        if not cursor:
+            break
+    assert len(ids) == len(consolidated_ids)
+    assert set(ids) == consolidated_ids
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        encode_cursor("name__asc", "Transaction", 1),
+        encode_cursor("amount__asc", "not a number", 1),
+        encode_cursor("amount__asc", "1", "1"),  # type: ignore[arg-type]
+        "WzFd",  # [1]
+    ],
+)
+def test_read_page_invalid_cursor(
+    db: Session, account: CashApiOut, cursor: str
+) -> None:
+    with pytest.raises(HTTPException) as e:
+        CRUDConsolidatedTransaction.read_page(
+            db, user_id=account.user_id, consolidate=True, per_page=2, cursor=cursor
+        )
+    assert e.value.status_code == 400
+
+
+def test_read_many_invalid_cursor(client: TestClient, headers: dict[str, str]) -> None:
+    response = client.get(
+        "/users/me/transactions/",
+        params={"consolidate": True, "per_page": 2, "cursor": "not base64!"},
+        headers=headers,
+    )
+    assert response.status_code == 400
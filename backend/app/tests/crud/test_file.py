@@ -0,0 +1,102 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import hashlib
+import threading
+
+import pytest
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from app.crud.file import CRUDFile
+from app.crud.transaction import CRUDSyncableTransaction
+from app.models.transaction import Transaction
+from app.schemas.account import CashApiOut
+from app.schemas.file import FileApiIn
+from app.tests.utils import get_transaction_values
+from app.utils.storage import LocalStorage
+
+DATA = b"receipt"
+KEY = hashlib.sha256(DATA).hexdigest()
+
+
+@pytest.fixture
+def transaction(db: Session, account: CashApiOut) -> Transaction:
+    transaction = Transaction.create(db, **next(get_transaction_values(account, 1)))
+    db.commit()
+    return transaction
+
+
+def upload(db: Session, transaction: Transaction, name: str = "receipt.txt") -> int:
+    file_in = FileApiIn(name=name)
+    return CRUDFile.upload(db, file_in, [DATA], transaction_id=transaction.id).id
+
+
+def has_blob(storage: LocalStorage) -> bool:
+    try:
+        return b"".join(storage.open(KEY)) == DATA
+    except FileNotFoundError:
+        return False
+
+
+def test_delete_unreferenced_data(
+    db: Session, storage: LocalStorage, transaction: Transaction
+) -> None:
+    file_ids = [upload(db, transaction, "a.txt"), upload(db, transaction, "b.txt")]
+    db.commit()
+
+    CRUDFile.delete(db, file_ids[0])
+    db.commit()
+    CRUDFile.delete_unreferenced_data(db)
+    assert has_blob(storage)
+
+    CRUDFile.delete(db, file_ids[1])
+    db.commit()
+    CRUDFile.delete_unreferenced_data(db)
+    assert not has_blob(storage)
+
+
+def test_delete_unreferenced_data_of_deleted_transactions(
+    db: Session, storage: LocalStorage, transaction: Transaction
+) -> None:
+    upload(db, transaction)
+    db.commit()
+    CRUDSyncableTransaction.delete_many(db, [transaction.id])
+    db.commit()
+    CRUDFile.delete_unreferenced_data(db)
+    assert not has_blob(storage)
+
+
+@pytest.mark.postgresql
+def test_delete_unreferenced_data_waits_for_uploads(
+    db: Session, engine: Engine, storage: LocalStorage, transaction: Transaction
+) -> None:
+    file_id = upload(db, transaction)
+    db.commit()
+
+    with Session(engine) as upload_db:
+        # Same content, not yet committed
+        upload(upload_db, transaction, "copy.txt")
+        CRUDFile.delete(db, file_id)
+        db.commit()
+        thread = threading.Thread(target=CRUDFile.delete_unreferenced_data, args=(db,))
+        thread.start()
+        thread.join(0.5)
+        assert thread.is_alive()
+        upload_db.commit()
+        thread.join()
+
+    assert has_blob(storage)
@@ -0,0 +1,289 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, get_args
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud.account import CRUDAccount
+from app.crud.plstatement import AggregateBy, CRUDPLStatement
+from app.crud.transaction import CRUDTransaction
+from app.crud.transactiongroup import CRUDTransactionGroup
+from app.models.bucket import Bucket
+from app.models.category import Category
+from app.models.plstatementrollup import PLStatementRollup
+from app.models.transaction import Transaction
+from app.schemas.account import CashApiOut
+from app.schemas.transaction import TransactionApiIn
+from app.schemas.transactiongroup import TransactionGroupApiIn
+
+
+def create_transactions(db: Session, account: CashApiOut, *timestamps: date) -> None:
+    transactions_in = [
+        TransactionApiIn(
+            amount=Decimal(-10),
+            timestamp=timestamp,
+            name="Transaction",
+            bucket_id=account.default_bucket_id,
+        )
+        for timestamp in timestamps
+    ]
+    CRUDAccount.create_many_transactions(db, account.id, transactions_in, "EUR")
+    CRUDPLStatement.update_dirty_rollups(db)
+
+
+@pytest.mark.postgresql
+@pytest.mark.parametrize(
+    "timestamp, timestamp__ge",
+    [
+        # ISO week 1 of 2025
+        (date(2024, 12, 30), date(2024, 12, 30)),
+        # ISO week 53 of 2020
+        (date(2021, 1, 1), date(2020, 12, 28)),
+    ],
+)
+def test_weekly_pl_statements_iso_year(
+    db: Session, account: CashApiOut, timestamp: date, timestamp__ge: date
+) -> None:
+    create_transactions(db, account, timestamp)
+    pl_statements = list(
+        CRUDPLStatement.get_many_pl_statements(
+            db, "weekly", user_id=account.user_id, page=0, per_page=0
+        )
+    )
+    assert [(s.timestamp__ge, s.timestamp__lt, s.expenses) for s in pl_statements] == [
+        (timestamp__ge, date.fromordinal(timestamp__ge.toordinal() + 7), Decimal(-10))
+    ]
+
+
+def get_many_detailed_pl_statements(
+    db: Session,
+    account: CashApiOut,
+    aggregate_by: AggregateBy,
+    timestamp__ge: date,
+    timestamp__lt: date,
+) -> list[tuple[date, date, Decimal]]:
+    pl_statements = CRUDPLStatement.get_many_detailed_pl_statements(
+        db,
+        aggregate_by,
+        timestamp__ge=timestamp__ge,
+        timestamp__lt=timestamp__lt,
+        user_id=account.user_id,
+    )
+    return [(s.timestamp__ge, s.timestamp__lt, s.expenses) for s in pl_statements]
+
+
+@pytest.mark.postgresql
+def test_many_detailed_pl_statements_fill_gaps(
+    db: Session, account: CashApiOut
+) -> None:
+    create_transactions(db, account, date(2024, 1, 15), date(2024, 3, 10))
+    assert get_many_detailed_pl_statements(
+        db, account, "monthly", date(2024, 1, 1), date(2024, 4, 1)
+    ) == [
+        (date(2024, 3, 1), date(2024, 4, 1), Decimal(-10)),
+        (date(2024, 2, 1), date(2024, 3, 1), Decimal(0)),
+        (date(2024, 1, 1), date(2024, 2, 1), Decimal(-10)),
+    ]
+
+
+@pytest.mark.postgresql
+def test_many_detailed_pl_statements_clip_periods(
+    db: Session, account: CashApiOut
+) -> None:
+    create_transactions(
+        db, account, date(2024, 1, 5), date(2024, 1, 15), date(2024, 3, 25)
+    )
+    assert get_many_detailed_pl_statements(
+        db, account, "monthly", date(2024, 1, 10), date(2024, 3, 20)
+    ) == [
+        (date(2024, 3, 1), date(2024, 3, 20), Decimal(0)),
+        (date(2024, 2, 1), date(2024, 3, 1), Decimal(0)),
+        (date(2024, 1, 10), date(2024, 2, 1), Decimal(-10)),
+    ]
+
+
+@pytest.mark.postgresql
+def test_many_detailed_pl_statements_weekly_iso_year(
+    db: Session, account: CashApiOut
+) -> None:
+    # 2024-12-30 starts ISO week 1 of 2025, 2021-01-01 is in week 53 of 2020
+    create_transactions(
+        db, account, date(2024, 12, 27), date(2024, 12, 31), date(2025, 1, 1)
+    )
+    assert get_many_detailed_pl_statements(
+        db, account, "weekly", date(2024, 12, 25), date(2025, 1, 8)
+    ) == [
+        (date(2025, 1, 6), date(2025, 1, 8), Decimal(0)),
+        (date(2024, 12, 30), date(2025, 1, 6), Decimal(-20)),
+        (date(2024, 12, 25), date(2024, 12, 30), Decimal(-10)),
+    ]
+    create_transactions(db, account, date(2021, 1, 1))
+    assert get_many_detailed_pl_statements(
+        db, account, "weekly", date(2020, 12, 28), date(2021, 1, 4)
+    ) == [(date(2020, 12, 28), date(2021, 1, 4), Decimal(-10))]
+
+
+@pytest.mark.postgresql
+@pytest.mark.parametrize("aggregate_by", get_args(AggregateBy))
+def test_many_detailed_pl_statements_match_single(
+    db: Session, account: CashApiOut, category: Category, aggregate_by: AggregateBy
+) -> None:
+    for _ in RandomChanges(db, account, category, 0):
+        pass
+    timestamp__ge, timestamp__lt = date(2023, 12, 30), date(2024, 1, 9)
+    pl_statements = list(
+        CRUDPLStatement.get_many_detailed_pl_statements(
+            db,
+            aggregate_by,
+            timestamp__ge=timestamp__ge,
+            timestamp__lt=timestamp__lt,
+            user_id=account.user_id,
+        )
+    )
+    assert pl_statements[0].timestamp__lt == timestamp__lt
+    assert pl_statements[-1].timestamp__ge == timestamp__ge
+    for pl_statement, next_pl_statement in zip(pl_statements, pl_statements[1:]):
+        assert pl_statement.timestamp__ge == next_pl_statement.timestamp__lt
+    for pl_statement in pl_statements:
+        assert pl_statement == CRUDPLStatement.get_detailed_pl_statement(
+            db,
+            timestamp__ge=pl_statement.timestamp__ge,
+            timestamp__lt=pl_statement.timestamp__lt,
+            user_id=account.user_id,
+        )
+
+
+class RandomChanges:
+    # Random writes through the CRUD classes, as the API makes them
+    def __init__(
+        self, db: Session, account: CashApiOut, category: Category, seed: int
+    ) -> None:
+        self.db = db
+        self.account = account
+        self.random = random.Random(seed)
+        other_category = Category.create(db, name="Other", icon=b"icon")
+        other_bucket = Bucket.create(db, name="Other", user_id=account.user_id)
+        self.category_ids = [None, category.id, other_category.id]
+        self.bucket_ids = [account.default_bucket_id, other_bucket.id]
+
+    def get_transaction_in(self) -> TransactionApiIn:
+        return TransactionApiIn(
+            amount=Decimal(self.random.randint(-100, 100)),
+            timestamp=date(2024, 1, 1) + timedelta(days=self.random.randrange(10)),
+            name="Transaction",
+            category_id=self.random.choice(self.category_ids),
+            bucket_id=self.random.choice(self.bucket_ids),
+        )
+
+    def get_ids(self, model: Any) -> list[int]:
+        return sorted(self.db.scalars(select(model.id)))
+
+    def create(self) -> None:
+        transactions_in = [self.get_transaction_in() for _ in range(3)]
+        CRUDAccount.create_many_transactions(
+            self.db, self.account.id, transactions_in, "EUR"
+        )
+
+    def update(self) -> None:
+        id = self.random.choice(self.get_ids(Transaction))
+        CRUDTransaction.update(self.db, id, self.get_transaction_in())
+
+    def delete(self) -> None:
+        id = self.random.choice(self.get_ids(Transaction))
+        CRUDTransaction.delete(self.db, id)
+
+    def group(self) -> None:
+        ids = self.random.sample(self.get_ids(Transaction), 3)
+        transaction_group_in = TransactionGroupApiIn(name="Group")
+        CRUDTransactionGroup.create(
+            self.db, transaction_group_in, ids, user_id=self.account.user_id
+        )
+
+    def ungroup(self) -> None:
+        statement = select(Transaction).where(
+            Transaction.transaction_group_id.is_not(None)
+        )
+        if transactions := self.db.scalars(statement).all():
+            transaction = self.random.choice(transactions)
+            assert transaction.transaction_group_id
+            CRUDTransactionGroup.remove_transaction(
+                self.db, transaction.transaction_group_id, transaction.id
+            )
+
+    def categorise_group(self) -> None:
+        statement = select(Transaction.transaction_group_id)
+        if ids := sorted({id for id in self.db.scalars(statement) if id}):
+            transaction_group_in = TransactionGroupApiIn(
+                name="Group", category_id=self.random.choice(self.category_ids)
+            )
+            CRUDTransactionGroup.update(
+                self.db, self.random.choice(ids), transaction_group_in
+            )
+
+    def __iter__(self) -> Any:
+        for _ in range(4):
+            self.create()
+        changes = [
+            self.create,
+            self.update,
+            self.delete,
+            self.group,
+            self.ungroup,
+            self.categorise_group,
+        ]
+        for _ in range(30):
+            change = self.random.choice(changes)
+            change()
+            CRUDPLStatement.update_dirty_rollups(self.db)
+            yield change.__name__
+
+
+def get_rollup(db: Session) -> list[tuple[Any, ...]]:
+    statement = select(
+        PLStatementRollup.user_id,
+        PLStatementRollup.bucket_id,
+        PLStatementRollup.day,
+        PLStatementRollup.category_id,
+        PLStatementRollup.sign,
+        PLStatementRollup.amount_default_currency,
+        PLStatementRollup.income,
+        PLStatementRollup.expenses,
+    )
+    return sorted(tuple(row) for row in db.execute(statement))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rollup_matches_rebuild(
+    db: Session, account: CashApiOut, category: Category, seed: int
+) -> None:
+    for change in RandomChanges(db, account, category, seed):
+        rollup = get_rollup(db)
+        CRUDPLStatement.rebuild_rollup(db, account.user_id)
+        assert rollup == get_rollup(db), change
+
+
+@pytest.mark.postgresql
+@pytest.mark.parametrize("seed", range(3))
+def test_rollup_matches_statements(
+    db: Session, account: CashApiOut, category: Category, seed: int
+) -> None:
+    for change in RandomChanges(db, account, category, seed):
+        assert CRUDPLStatement.check_rollup(db, account.user_id), change
@@ -0,0 +1,119 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.crud.account import CRUDAccount
+from app.crud.merchant import CRUDMerchant
+from app.crud.transactiongroup import CRUDTransactionGroup
+from app.models.cachegeneration import CacheGeneration
+from app.models.category import Category
+from app.models.merchant import Merchant
+from app.schemas.account import CashApiOut
+from app.schemas.merchant import MerchantApiIn
+from app.schemas.transaction import TransactionApiIn
+from app.schemas.transactiongroup import TransactionGroupApiIn
+from app.settings import settings
+
+
+def create_transactions(db: Session, account: CashApiOut, *names: str) -> list[int]:
+    transactions_in = [
+        TransactionApiIn(
+            amount=Decimal(-10),
+            timestamp=date(2024, 1, 1),
+            name=name,
+            bucket_id=account.default_bucket_id,
+        )
+        for name in names
+    ]
+    transactions_out = CRUDAccount.create_many_transactions(
+        db, account.id, transactions_in, "EUR"
+    )
+    return [t.id for t in transactions_out]
+
+
+def create_merchant(
+    db: Session, account: CashApiOut, category: Category, pattern: str
+) -> int:
+    merchant_in = MerchantApiIn(
+        name=pattern, pattern=pattern, default_category_id=category.id
+    )
+    return CRUDMerchant.create(db, merchant_in, user_id=account.user_id).id
+
+
+def test_create_matches_merchant(
+    db: Session, account: CashApiOut, category: Category
+) -> None:
+    merchant_id = create_merchant(db, account, category, "Coffee")
+    transaction_ids = create_transactions(db, account, "Coffee shop", "Coffee bar")
+    transaction_group_out = CRUDTransactionGroup.create(
+        db,
+        TransactionGroupApiIn(name=""),
+        transaction_ids,
+        user_id=account.user_id,
+    )
+    transaction_group = db.get(CRUDTransactionGroup.__model__, transaction_group_out.id)
+    assert transaction_group is not None
+    assert transaction_group.merchant_id == merchant_id
+    assert transaction_group_out.category_id == category.id
+
+
+def test_merge_matches_merchant(
+    db: Session, account: CashApiOut, category: Category
+) -> None:
+    transaction_ids = create_transactions(db, account, "Coffee shop", "Coffee bar")
+    transaction_group_ids = [
+        CRUDTransactionGroup.create(
+            db, TransactionGroupApiIn(name=""), [id], user_id=account.user_id
+        ).id
+        for id in transaction_ids
+    ]
+    # Written after the matcher was cached
+    merchant_id = create_merchant(db, account, category, "Coffee")
+    transaction_group_out = CRUDTransactionGroup.merge(
+        db, transaction_group_ids, account.user_id
+    )
+    transaction_group = db.get(CRUDTransactionGroup.__model__, transaction_group_out.id)
+    assert transaction_group is not None
+    assert transaction_group.merchant_id == merchant_id
+
+
+def test_matcher_follows_other_processes(
+    db: Session,
+    account: CashApiOut,
+    category: Category,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "CACHE_GENERATION_SECONDS", 0)
+    matcher = CRUDMerchant.get_matcher(db, account.user_id)
+    assert matcher.match("Coffee shop") is None
+    assert CRUDMerchant.get_matcher(db, account.user_id) is matcher
+
+    # Another process adds a merchant, this one only sees the generation
+    merchant = Merchant.create(
+        db,
+        name="Coffee",
+        pattern="Coffee",
+        default_category_id=category.id,
+        user_id=account.user_id,
+    )
+    CacheGeneration.bump(db, Merchant.__tablename__)
+    assert CRUDMerchant.get_matcher(db, account.user_id).match("Coffee shop") == (
+        merchant.id
+    )
@@ -0,0 +1,85 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from app.crud.user import CRUDUser
+from app.models.cachegeneration import CacheGeneration
+from app.models.user import User
+from app.schemas.user import UserApiIn
+
+TOKEN = "token"
+
+
+def read_current(engine: Engine, id: int) -> str:
+    # As another request would, in a session of its own
+    with Session(engine) as db:
+        return CRUDUser.read_current(db, id, TOKEN).full_name
+
+
+def update_full_name(db: Session, user: User, full_name: str) -> None:
+    user_in = UserApiIn(
+        email=user.email,
+        full_name=full_name,
+        is_superuser=user.is_superuser,
+        default_currency_code=user.default_currency_code,
+        password="password",
+    )
+    CRUDUser.update(db, user.id, user_in)
+
+
+def test_read_current_cleared_on_commit(
+    db: Session, engine: Engine, user: User
+) -> None:
+    db.commit()
+    assert read_current(engine, user.id) == "User"
+
+    update_full_name(db, user, "Updated")
+    # Uncommitted, other requests keep the committed user
+    assert CRUDUser.read_current(db, user.id, TOKEN).full_name == "Updated"
+    assert read_current(engine, user.id) == "User"
+
+    db.commit()
+    assert read_current(engine, user.id) == "Updated"
+
+
+def test_read_current_kept_on_rollback(db: Session, engine: Engine, user: User) -> None:
+    db.commit()
+    assert read_current(engine, user.id) == "User"
+    generation = CacheGeneration.get(db, "current_user")
+
+    update_full_name(db, user, "Updated")
+    db.rollback()
+    assert read_current(engine, user.id) == "User"
+    assert CacheGeneration.get(db, "current_user") == generation
+    assert "invalidated_caches" not in db.info
+
+
+def test_read_current_cleared_by_other_processes(
+    db: Session, engine: Engine, user: User
+) -> None:
+    db.commit()
+    assert read_current(engine, user.id) == "User"
+
+    # Another process commits an update, this process only sees the generation
+    User.update(db, user.id, full_name="Updated")
+    CacheGeneration.bump(db, "current_user")
+    db.commit()
+    assert read_current(engine, user.id) == "User"
+
+    CRUDUser.__current_user_cache__.generation_checked = 0
+    assert read_current(engine, user.id) == "Updated"
@@ -0,0 +1,78 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from contextlib import nullcontext
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.plaid import category
+from app.plaid.category import get_category_ids
+from app.schemas.category import CategoryPlaidIn
+
+
+@pytest.fixture(autouse=True)
+def create_category_plaid_in(monkeypatch: pytest.MonkeyPatch) -> None:
+    def create(personal_finance_category: Any, *args: Any, **kwargs: Any) -> Any:
+        plaid_id = personal_finance_category.primary
+        return CategoryPlaidIn(
+            name=plaid_id, icon=b"icon", plaid_id=plaid_id, plaid_metadata=plaid_id
+        )
+
+    monkeypatch.setattr(category, "create_category_plaid_in", create)
+    monkeypatch.setattr(category, "CachedSession", lambda **kwargs: nullcontext())
+
+
+def create_transaction(plaid_id: str) -> Any:
+    return SimpleNamespace(
+        personal_finance_category=SimpleNamespace(primary=plaid_id),
+        personal_finance_category_icon_url="",
+    )
+
+
+def test_get_category_ids_rollback(db: Session) -> None:
+    transactions = [create_transaction("FOOD")]
+    get_category_ids(db, transactions)
+    db.rollback()
+
+    # The category created in the rolled back transaction is not reused
+    category_id = get_category_ids(db, transactions)["FOOD"]
+    assert category_id is not None
+    assert db.get(Category, category_id) is not None
+
+
+def test_get_category_ids_nested_rollback(db: Session) -> None:
+    transactions = [create_transaction("FOOD")]
+    with pytest.raises(RuntimeError):
+        with db.begin_nested():
+            get_category_ids(db, transactions)
+            raise RuntimeError
+    category_id = get_category_ids(db, transactions)["FOOD"]
+    assert category_id is not None
+    assert db.get(Category, category_id) is not None
+
+
+def test_get_category_ids_commit(db: Session) -> None:
+    transactions = [create_transaction("FOOD")]
+    category_id = get_category_ids(db, transactions)["FOOD"]
+    db.commit()
+
+    # Committed, other sessions read it from the process-wide ids
+    with Session(db.get_bind()) as other_db:
+        assert get_category_ids(other_db, transactions)["FOOD"] == category_id
+    assert getattr(category, "__category_ids")["FOOD"] == category_id
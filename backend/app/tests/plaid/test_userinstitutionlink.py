@@ -0,0 +1,199 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.account import Depository
+from app.models.bucket import Bucket
+from app.models.institution import Institution
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.models.userinstitutionlink import UserInstitutionLink
+from app.plaid import userinstitutionlink
+from app.plaid.userinstitutionlink import (
+    sync_user_institution_link,
+    sync_user_institution_links,
+)
+
+
+class FakeTransaction:
+    # The attributes of plaid's Transaction that the sync reads
+    def __init__(self, transaction_id: str, account_id: str, amount: str) -> None:
+        self.transaction_id = transaction_id
+        self.account_id = account_id
+        self.amount = Decimal(amount)
+        self.name = f"Transaction {transaction_id}"
+        self.date = date(2024, 1, 1)
+        self.authorized_date = None
+
+    def to_str(self) -> str:
+        return repr(vars(self))
+
+
+class FakeClient:
+    # Serves the pages of each item in order, the cursor is the page number
+    def __init__(self, pages: dict[str, list[dict[str, Any]]]) -> None:
+        self.pages = pages
+        self.cursors: dict[str, list[str | None]] = {token: [] for token in pages}
+        self.delay = 0.0
+
+    def transactions_sync(self, request: Any) -> SimpleNamespace:
+        cursor = getattr(request, "cursor", None)
+        self.cursors[request.access_token].append(cursor)
+        time.sleep(self.delay)
+        pages = self.pages[request.access_token]
+        i = int(cursor or 0)
+        page = pages[i] if i < len(pages) else {}
+        return SimpleNamespace(
+            added=page.get("added", []),
+            modified=page.get("modified", []),
+            removed=[
+                SimpleNamespace(transaction_id=id) for id in page.get("removed", [])
+            ],
+            next_cursor=str(min(i + 1, len(pages))),
+            has_more=i + 1 < len(pages),
+        )
+
+
+def create_user_institution_link(
+    db: Session, user: User, bucket: Bucket, i: int
+) -> int:
+    institution = Institution.create(
+        db,
+        name=f"Institution {i}",
+        country_code="US",
+        plaid_id=f"institution-{i}",
+        plaid_metadata="{}",
+    )
+    user_institution_link = UserInstitutionLink.create(
+        db,
+        user_id=user.id,
+        institution_id=institution.id,
+        access_token=f"token-{i}",
+        plaid_id=f"item-{i}",
+        plaid_metadata="{}",
+    )
+    Depository.create(
+        db,
+        name=f"Account {i}",
+        mask="0000",
+        currency_code="EUR",
+        initial_balance=Decimal(0),
+        balance=Decimal(0),
+        default_bucket_id=bucket.id,
+        user_id=user.id,
+        user_institution_link_id=user_institution_link.id,
+        plaid_id=f"account-{i}",
+        plaid_metadata="{}",
+    )
+    return user_institution_link.id
+
+
+def get_amounts(db: Session) -> dict[str | None, Decimal]:
+    return {t.plaid_id: t.amount for t in Transaction.read_many(db, 0, 0)}
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> FakeClient:
+    pages: dict[str, list[dict[str, Any]]] = {
+        f"token-{i}": [
+            {
+                "added": [
+                    FakeTransaction(f"{i}-1", f"account-{i}", "10"),
+                    FakeTransaction(f"{i}-2", f"account-{i}", "20"),
+                ]
+            },
+            {
+                "added": [FakeTransaction(f"{i}-3", f"account-{i}", "30")],
+                "modified": [FakeTransaction(f"{i}-1", f"account-{i}", "15")],
+                "removed": [f"{i}-2"],
+            },
+        ]
+        for i in range(2)
+    }
+    fake_client = FakeClient(pages)
+    monkeypatch.setattr(userinstitutionlink, "client", fake_client)
+    return fake_client
+
+
+def test_sync_user_institution_link(
+    db: Session, user: User, bucket: Bucket, client: FakeClient
+) -> None:
+    id = create_user_institution_link(db, user, bucket, 0)
+    sync_user_institution_link(db, id)
+    # Plaid amounts are positive for money leaving the account
+    assert get_amounts(db) == {"0-1": Decimal(-15), "0-3": Decimal(-30)}
+    assert client.cursors["token-0"] == [None, "1"]
+    assert UserInstitutionLink.read(db, id__eq=id).cursor == "2"
+
+    # Up to date, the next sync starts from the stored cursor
+    sync_user_institution_link(db, id)
+    assert client.cursors["token-0"] == [None, "1", "2"]
+
+
+@pytest.mark.postgresql
+def test_sync_user_institution_links(
+    db: Session, user: User, bucket: Bucket, client: FakeClient
+) -> None:
+    ids = [create_user_institution_link(db, user, bucket, i) for i in range(2)]
+    db.commit()
+    sync_user_institution_links(ids)
+    assert get_amounts(db) == {
+        "0-1": Decimal(-15),
+        "0-3": Decimal(-30),
+        "1-1": Decimal(-15),
+        "1-3": Decimal(-30),
+    }
+
+
+@pytest.mark.postgresql
+def test_sync_user_institution_links_same_item(
+    db: Session, user: User, bucket: Bucket, client: FakeClient
+) -> None:
+    # Concurrent syncs of an item wait for each other, the cursor never regresses
+    id = create_user_institution_link(db, user, bucket, 0)
+    db.commit()
+    client.delay = 0.1
+    threads = [
+        threading.Thread(target=sync_user_institution_links, args=([id],))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.cursors["token-0"] == [None, "1", "2"]
+    assert get_amounts(db) == {"0-1": Decimal(-15), "0-3": Decimal(-30)}
+
+
+@pytest.mark.postgresql
+def test_sync_user_institution_links_failure(
+    db: Session, user: User, bucket: Bucket, client: FakeClient
+) -> None:
+    # An item that fails does not stop the others
+    ids = [create_user_institution_link(db, user, bucket, i) for i in range(2)]
+    db.commit()
+    del client.pages["token-0"]
+    with pytest.raises(RuntimeError, match=str([ids[0]])):
+        sync_user_institution_links(ids)
+    assert get_amounts(db) == {"1-1": Decimal(-15), "1-3": Decimal(-30)}
@@ -0,0 +1,58 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from decimal import Decimal
+from typing import Any
+
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, event
+
+from app.models.bucket import Bucket
+
+
+def test_current_user_releases_connection(
+    engine: Engine, bucket: Bucket, client: TestClient, headers: dict[str, str]
+) -> None:
+    # Authentication is over before the request's own session connects
+    checked_out = [0]
+    peak_checked_out = [0]
+
+    def checkout(*args: Any) -> None:
+        checked_out[0] += 1
+        peak_checked_out[0] = max(peak_checked_out[0], checked_out[0])
+
+    def checkin(*args: Any) -> None:
+        checked_out[0] -= 1
+
+    event.listen(engine.pool, "checkout", checkout)
+    event.listen(engine.pool, "checkin", checkin)
+    try:
+        response = client.post(
+            "/users/me/accounts/",
+            json={
+                "name": "Cash",
+                "type": "cash",
+                "currency_code": "EUR",
+                "initial_balance": str(Decimal(0)),
+                "default_bucket_id": bucket.id,
+            },
+            headers=headers,
+        )
+    finally:
+        event.remove(engine.pool, "checkout", checkout)
+        event.remove(engine.pool, "checkin", checkin)
+    assert response.status_code == 200
+    assert peak_checked_out == [1]
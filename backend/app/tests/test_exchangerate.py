@@ -0,0 +1,75 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.exchangerate import ExchangeRate
+from app.utils import exchangerate
+from app.utils.exchangerate import get_exchange_rate
+
+
+class FakeResponse:
+    def __init__(self, rates: dict[str, str]) -> None:
+        self.rates = rates
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self, **kwargs: Any) -> dict[str, Any]:
+        return {"rates": self.rates}
+
+
+@pytest.fixture
+def requests_get(monkeypatch: pytest.MonkeyPatch) -> list[dict[str, Any]]:
+    calls: list[dict[str, Any]] = []
+
+    def get(url: str, **kwargs: Any) -> FakeResponse:
+        calls.append({"url": url, **kwargs})
+        return FakeResponse({"USD": "1", "EUR": "0.5", "GBP": "0.25"})
+
+    monkeypatch.setattr(exchangerate.requests, "get", get)
+    return calls
+
+
+def test_get_exchange_rate(db: Session, requests_get: list[dict[str, Any]]) -> None:
+    timestamp = date(2001, 1, 1)
+    assert get_exchange_rate(db, "EUR", "GBP", timestamp) == Decimal("0.5")
+    assert get_exchange_rate(db, "GBP", "USD", timestamp) == Decimal(4)
+    assert get_exchange_rate(db, "EUR", "EUR", timestamp) == Decimal(1)
+
+    # Fetched once, with a timeout, and stored
+    assert len(requests_get) == 1
+    assert requests_get[0]["timeout"] == exchangerate.REQUEST_TIMEOUT_SECONDS
+    statement = select(func.count()).select_from(ExchangeRate)
+    assert db.scalar(statement) == 3
+
+
+def test_rates_cache_evicts_least_recently_used(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(exchangerate, "CACHE_SIZE", 2)
+    first, second, third = (date(2002, 1, d) for d in (1, 2, 3))
+    exchangerate.__cache_rates(first, {"EUR": Decimal(1)})
+    exchangerate.__cache_rates(second, {"EUR": Decimal(2)})
+    assert exchangerate.__get_cached_rates(first) == {"EUR": Decimal(1)}
+    exchangerate.__cache_rates(third, {"EUR": Decimal(3)})
+    assert exchangerate.__get_cached_rates(second) is None
+    assert exchangerate.__get_cached_rates(first) is not None
@@ -0,0 +1,84 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import hashlib
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import Connection, Engine, text
+
+import app
+from app.utils.storage import LocalStorage
+
+pytestmark = pytest.mark.postgresql
+
+VERSIONS = Path(app.__file__).parent.parent / "alembic" / "versions"
+
+
+def load_migration(name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(name, VERSIONS / f"{name}.py")
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def get_columns(connection: Connection, table: str) -> set[str]:
+    statement = text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table"
+    )
+    return set(connection.scalars(statement, {"table": table}))
+
+
+def test_file_storage(
+    monkeypatch: pytest.MonkeyPatch, engine: Engine, tmp_path: Path
+) -> None:
+    migration = load_migration("c2e7b5d9a641_file_storage")
+    storage = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(migration, "get_storage", lambda: storage)
+    data = [b"receipt", b"invoice", b"receipt"]
+
+    with engine.connect() as connection:
+        # The file table as it was before, in a schema dropped on rollback
+        connection.execute(text("CREATE SCHEMA migration_test"))
+        connection.execute(text("SET LOCAL search_path TO migration_test"))
+        connection.execute(
+            text("CREATE TABLE file (id serial PRIMARY KEY, data bytea NOT NULL)")
+        )
+        for d in data:
+            connection.execute(text("INSERT INTO file (data) VALUES (:d)"), {"d": d})
+
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+        assert get_columns(connection, "file") == {"id", "storage_key", "size"}
+        rows = connection.execute(
+            text("SELECT storage_key, size FROM file ORDER BY id")
+        ).all()
+        assert rows == [(hashlib.sha256(d).hexdigest(), len(d)) for d in data]
+        for storage_key, _ in rows:
+            assert b"".join(storage.open(storage_key)) in data
+
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.downgrade()
+        assert get_columns(connection, "file") == {"id", "data"}
+        restored = connection.scalars(text("SELECT data FROM file ORDER BY id"))
+        assert [bytes(d) for d in restored] == data
+        connection.rollback()
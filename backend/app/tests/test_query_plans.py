@@ -0,0 +1,105 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date
+from typing import Any, Iterator
+
+import pytest
+from sqlalchemy import Select, select, text
+from sqlalchemy.orm import Session
+
+from app.crud.consolidatedtransaction import CRUDConsolidatedTransaction
+from app.crud.transaction import CRUDTransaction
+from app.models.transaction import Transaction
+from app.models.transactiongroup import TransactionGroup
+from app.schemas.account import CashApiOut
+from app.tests.utils import create_user_account, seed_transactions
+
+pytestmark = pytest.mark.postgresql
+
+N_USERS = 50
+N_TRANSACTIONS = 2_000
+
+
+def get_seq_scans(plan: dict[str, Any]) -> Iterator[str]:
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for subplan in plan.get("Plans", []):
+        yield from get_seq_scans(subplan)
+
+
+def seed(db: Session) -> tuple[CashApiOut, TransactionGroup]:
+    # Many small users, as in production, so that each one is selective
+    for i in range(N_USERS):
+        account = create_user_account(db, i)
+        seed_transactions(db, account, N_TRANSACTIONS, seed=i)
+    transaction_group = TransactionGroup.create(db, name="Group")
+    statement = select(Transaction).where(Transaction.account_id == account.id)
+    for transaction in db.scalars(statement.limit(3)):
+        transaction.transaction_group_id = transaction_group.id
+    db.flush()
+    db.execute(text("ANALYZE"))
+    return account, transaction_group
+
+
+def test_hot_queries_use_indexes(db: Session) -> None:
+    account, transaction_group = seed(db)
+    transaction_id = db.scalar(
+        select(Transaction.id).where(Transaction.account_id == account.id).limit(1)
+    )
+    page: dict[str, Any] = {"per_page": 50, "order_by": "timestamp__desc"}
+    listing = CRUDConsolidatedTransaction.select(user_id=account.user_id, **page)
+    _, cursor = CRUDConsolidatedTransaction.read_page(
+        db, user_id=account.user_id, **page
+    )
+    statements: dict[str, Select[Any]] = {
+        "transactions page": listing,
+        "transactions next page": CRUDConsolidatedTransaction.select(
+            user_id=account.user_id, cursor=cursor, **page
+        ),
+        "consolidated transactions page": CRUDConsolidatedTransaction.select(
+            user_id=account.user_id, consolidate=True, **page
+        ),
+        "account transactions page": CRUDTransaction.select(
+            account_id__eq=account.id, **page
+        ),
+        "previous balance": Transaction.select(
+            account_id__eq=account.id,
+            timestamp__lt=date(2022, 1, 1),
+            order_by="timestamp__desc",
+        ).limit(1),
+        "balance suffix": Transaction.select(
+            account_id__eq=account.id,
+            timestamp__ge=date(2023, 12, 1),
+            order_by="timestamp__asc",
+        ),
+        "transaction ownership": CRUDTransaction.select(
+            user_id=account.user_id, id__eq=transaction_id
+        ),
+        "group transactions": Transaction.select(
+            transaction_group_id__eq=transaction_group.id
+        ),
+    }
+
+    seq_scans = {}
+    for name, statement in statements.items():
+        compiled = statement.compile(
+            db.get_bind(), compile_kwargs={"literal_binds": True}
+        )
+        plan = db.scalar(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+        relations = set(get_seq_scans(plan[0]["Plan"]))
+        if "transaction" in relations:
+            seq_scans[name] = relations
+    assert not seq_scans, f"Sequential scans of transaction in {seq_scans}"
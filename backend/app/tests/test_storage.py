@@ -0,0 +1,170 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import hashlib
+import io
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import IO, Any, Generator, Iterator
+
+import pytest
+
+from app.utils import storage as storage_module
+from app.utils.storage import LocalStorage, S3Storage, Storage
+
+DATA = b"0123456789" * 10
+KEY = hashlib.sha256(DATA).hexdigest()
+
+
+class FakeBody:
+    def __init__(self, data: bytes) -> None:
+        self.data = io.BytesIO(data)
+        self.closed = False
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[bytes]:
+        while chunk := self.data.read(chunk_size):
+            yield chunk
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class NoSuchKey(Exception):
+    pass
+
+
+class FakeS3Client:
+    # The calls S3Storage makes, against a dict instead of a bucket
+    exceptions = SimpleNamespace(NoSuchKey=NoSuchKey)
+
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.bodies: list[FakeBody] = []
+
+    def upload_fileobj(self, file: IO[bytes], bucket: str, key: str) -> None:
+        self.objects[bucket, key] = file.read()
+
+    def get_object(self, Bucket: str, Key: str) -> dict[str, Any]:
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKey(Key)
+        body = FakeBody(self.objects[Bucket, Key])
+        self.bodies.append(body)
+        return {"Body": body}
+
+    def delete_object(self, Bucket: str, Key: str) -> None:
+        self.objects.pop((Bucket, Key), None)
+
+
+@pytest.fixture(autouse=True)
+def chunk_size(monkeypatch: pytest.MonkeyPatch) -> int:
+    # Small chunks, so that every blob spans several of them
+    monkeypatch.setattr(storage_module, "CHUNK_SIZE", 16)
+    return 16
+
+
+@pytest.fixture
+def s3_client(monkeypatch: pytest.MonkeyPatch) -> FakeS3Client:
+    client = FakeS3Client()
+    boto3 = SimpleNamespace(client=lambda *args, **kwargs: client)
+    monkeypatch.setitem(sys.modules, "boto3", boto3)
+    return client
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request: pytest.FixtureRequest, tmp_path: Path) -> Storage:
+    if request.param == "s3":
+        request.getfixturevalue("s3_client")
+        return S3Storage("bucket")
+    return LocalStorage(str(tmp_path))
+
+
+def get_chunks(data: bytes, chunk_size: int) -> Iterator[bytes]:
+    for i in range(0, len(data), chunk_size):
+        yield data[i : i + chunk_size]
+
+
+def test_put_open_delete(storage: Storage, chunk_size: int) -> None:
+    assert storage.put(get_chunks(DATA, 7)) == (KEY, len(DATA))
+    chunks = list(storage.open(KEY))
+    assert b"".join(chunks) == DATA
+    assert len(chunks) == -(-len(DATA) // chunk_size)
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    storage.delete(KEY)
+    with pytest.raises(FileNotFoundError):
+        storage.open(KEY)
+
+
+def test_put_identical_content(storage: Storage) -> None:
+    assert storage.put([DATA]) == storage.put(get_chunks(DATA, 3))
+    assert b"".join(storage.open(KEY)) == DATA
+
+
+def test_put_calls_lock_before_writing(storage: Storage) -> None:
+    def lock(key: str) -> None:
+        assert key == KEY
+        with pytest.raises(FileNotFoundError):
+            storage.open(key)
+        raise RuntimeError("locked")
+
+    with pytest.raises(RuntimeError):
+        storage.put([DATA], lock)
+    with pytest.raises(FileNotFoundError):
+        storage.open(KEY)
+
+
+def test_local_put_leaves_no_temporary_files(tmp_path: Path) -> None:
+    local_storage = LocalStorage(str(tmp_path))
+
+    def failing_chunks() -> Iterator[bytes]:
+        yield DATA
+        raise OSError("disconnected")
+
+    def failing_lock(key: str) -> None:
+        raise RuntimeError("locked")
+
+    with pytest.raises(OSError):
+        local_storage.put(failing_chunks())
+    with pytest.raises(RuntimeError):
+        local_storage.put([DATA], failing_lock)
+    assert os.listdir(tmp_path) == []
+
+    local_storage.put([DATA])
+    assert os.listdir(tmp_path) == [KEY[:2]]
+    assert (tmp_path / KEY[:2] / KEY[2:4] / KEY).read_bytes() == DATA
+
+
+def test_storage_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        Storage()  # type: ignore[abstract]
+
+
+def test_local_delete_missing(tmp_path: Path) -> None:
+    LocalStorage(str(tmp_path)).delete(KEY)
+
+
+def test_s3_open_closes_body(s3_client: FakeS3Client) -> None:
+    s3_storage = S3Storage("bucket")
+    s3_storage.put([DATA])
+    assert s3_client.objects == {("bucket", KEY): DATA}
+    chunks = s3_storage.open(KEY)
+    assert isinstance(chunks, Generator)
+    next(chunks)
+    chunks.close()
+    assert [body.closed for body in s3_client.bodies] == [True]
+    assert b"".join(s3_storage.open(KEY)) == DATA
+    assert [body.closed for body in s3_client.bodies] == [True, True]
@@ -0,0 +1,81 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+import app.utils.transaction
+from app.schemas.transactiondeserialiser import TransactionDeserialiserApiOut
+from app.utils.transaction import get_transactions_from_csv
+
+N_ROWS = 7
+
+
+def get_deserialiser(
+    encoding: str, ascending_timestamp: bool
+) -> TransactionDeserialiserApiOut:
+    return TransactionDeserialiserApiOut(
+        id=1,
+        module_name="test",
+        amount_deserialiser="decimal.Decimal(row[2])",
+        timestamp_deserialiser="datetime.date.fromisoformat(row[0])",
+        name_deserialiser="row[1]",
+        skip_rows=1,
+        ascending_timestamp=ascending_timestamp,
+        columns=3,
+        delimiter=",",
+        encoding=encoding,
+    )
+
+
+def get_rows(ascending_timestamp: bool) -> list[tuple[date, str, Decimal]]:
+    # Non-ASCII names, and a quoted one spanning two lines
+    rows = [
+        (date(2024, 1, 1) + timedelta(days=i), f"Café {i}", Decimal(i))
+        for i in range(N_ROWS)
+    ]
+    rows[3] = (rows[3][0], "Café\n3", rows[3][2])
+    return rows if ascending_timestamp else rows[::-1]
+
+
+@pytest.mark.parametrize("ascending_timestamp", [True, False])
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "latin-1"])
+def test_get_transactions_from_csv(
+    monkeypatch: pytest.MonkeyPatch,
+    encoding: str,
+    newline: str,
+    ascending_timestamp: bool,
+) -> None:
+    # Descending files are read back in chunks, make them cross rows
+    monkeypatch.setattr(app.utils.transaction, "CHUNK_ROWS", 2)
+    rows = get_rows(ascending_timestamp)
+    lines = ["date,name,amount"]
+    lines += [f'{timestamp},"{name}",{amount}' for timestamp, name, amount in rows]
+    lines += ["end of statement"]
+    with io.BytesIO(newline.join(lines).encode(encoding)) as file:
+        deserialiser = get_deserialiser(encoding, ascending_timestamp)
+        transactions = list(get_transactions_from_csv(deserialiser, file, 1, 1))
+        assert not file.closed
+
+    expected = sorted(rows)
+    assert [t.timestamp for t in transactions] == [t for t, _, _ in expected]
+    assert [t.name for t in transactions] == [
+        n.replace("\n", " ") for _, n, _ in expected
+    ]
+    assert [t.amount for t in transactions] == [a for _, _, a in expected]
@@ -0,0 +1,94 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import worker
+from app.jobs import Task, tasks
+from app.models.job import Job
+from app.models.user import User
+from app.worker import claim_job, run_job
+
+NAME = "update_account_balances"
+
+
+def create_job(
+    db: Session,
+    user: User,
+    name: str = NAME,
+    dedup_key: str | None = None,
+    **kwargs: Any
+) -> Job:
+    job = Job.create(db, name=name, user_id=user.id, dedup_key=dedup_key)
+    for key, value in kwargs.items():
+        setattr(job, key, value)
+    db.flush()
+    return job
+
+
+def get_stale_heartbeat() -> datetime:
+    return datetime.now(timezone.utc) - worker.STALE_TIMEOUT - timedelta(minutes=1)
+
+
+def test_claim_job_requeues_stale(db: Session, user: User) -> None:
+    job = create_job(db, user, status=Job.RUNNING, heartbeat=get_stale_heartbeat())
+    assert claim_job(db) is job
+    assert job.status == Job.RUNNING
+    assert job.attempts == 1
+
+
+def test_claim_job_fails_stale_with_queued_job(db: Session, user: User) -> None:
+    stale_job = create_job(
+        db,
+        user,
+        status=Job.RUNNING,
+        heartbeat=get_stale_heartbeat(),
+        dedup_key="key",
+    )
+    queued_job = create_job(db, user, dedup_key="key")
+    assert claim_job(db) is queued_job
+    db.refresh(stale_job)
+    assert stale_job.status == Job.FAILED
+
+
+def test_claim_job_keeps_running_with_heartbeat(db: Session, user: User) -> None:
+    # No progress for a long time, but the worker is alive
+    updated = get_stale_heartbeat()
+    job = create_job(db, user, status=Job.RUNNING, updated=updated)
+    assert claim_job(db) is None
+    db.refresh(job)
+    assert job.status == Job.RUNNING
+
+
+def test_run_job_sends_heartbeats(
+    db: Session, user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def sleep(db: Session, report_progress: Any) -> None:
+        time.sleep(0.5)
+
+    monkeypatch.setitem(tasks, "sleep", Task(sleep, 1, 1))
+    monkeypatch.setattr(worker, "HEARTBEAT_INTERVAL", timedelta(seconds=0.1))
+    heartbeat = get_stale_heartbeat()
+    job = create_job(db, user, "sleep", status=Job.RUNNING, heartbeat=heartbeat)
+    db.commit()
+    run_job(job.id)
+    db.refresh(job)
+    assert job.status == Job.FINISHED
+    assert job.heartbeat > heartbeat.replace(tzinfo=None) + worker.STALE_TIMEOUT
@@ -0,0 +1,91 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.crud.account import CRUDAccount
+from app.models.bucket import Bucket
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.schemas.account import CashApiIn, CashApiOut
+
+
+def create_user_account(db: Session, i: int) -> CashApiOut:
+    # Another user, with a bucket and a cash account
+    user = User.create(
+        db,
+        email=f"user{i}@example.com",
+        full_name=f"User {i}",
+        hashed_password="",
+        is_superuser=False,
+        default_currency_code="EUR",
+    )
+    bucket = Bucket.create(db, name="Bucket", user_id=user.id)
+    account_in = CashApiIn(
+        name="Cash",
+        type="cash",
+        currency_code="EUR",
+        initial_balance=Decimal(0),
+        default_bucket_id=bucket.id,
+    )
+    account = CRUDAccount.create(db, account_in, user_id=user.id)
+    assert isinstance(account, CashApiOut)
+    return account
+
+
+def get_transaction_values(
+    account: CashApiOut, n: int, seed: int = 0
+) -> Iterator[dict[str, Any]]:
+    # Deterministic rows spread over about three years
+    rng = random.Random(seed)
+    for i in range(n):
+        amount = Decimal(rng.randint(-10000, 10000)) / 100
+        yield {
+            "amount": amount,
+            "amount_default_currency": amount,
+            "account_balance": Decimal(0),
+            "timestamp": date(2021, 1, 1) + timedelta(days=rng.randint(0, 1095)),
+            "name": f"Transaction {i}",
+            "account_id": account.id,
+            "user_id": account.user_id,
+            "bucket_id": account.default_bucket_id,
+        }
+
+
+def seed_transactions(db: Session, account: CashApiOut, n: int, seed: int = 0) -> None:
+    values = list(get_transaction_values(account, n, seed))
+    for i in range(0, n, 10000):
+        db.execute(insert(Transaction), values[i : i + 10000])
+    # As autovacuum would, so that the planner sees the real row counts
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("ANALYZE transaction"))
+
+
+def timed(fn: Callable[[], Any], repeat: int = 1) -> float:
+    # The median of the runs
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
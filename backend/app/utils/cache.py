@@ -0,0 +1,96 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import threading
+import time
+from typing import Any, Hashable
+
+from app.settings import settings
+
+__caches: dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    def __init__(
+        self,
+        name: str,
+        ttl: float = settings.CACHE_EXPIRE_SECONDS,
+        max_size: int = 1024,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Bumped by every clear, values read from the database before then are
+        # dropped by set instead of being cached
+        self.epoch = 0
+        self.generation: int | None = None
+        self.generation_checked = 0.0
+        self.__entries: dict[Hashable, tuple[float, Any]] = {}
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.__entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, epoch: int) -> None:
+        # epoch is self.epoch as it was before the value was read
+        now = time.monotonic()
+        with self.__lock:
+            if epoch != self.epoch:
+                return
+            if len(self.__entries) >= self.max_size:
+                self.__entries = {k: v for k, v in self.__entries.items() if v[0] > now}
+            if len(self.__entries) >= self.max_size:
+                self.__entries.clear()
+            self.__entries[key] = now + self.ttl, value
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.epoch += 1
+            self.invalidations += 1
+            self.generation = None
+
+    def is_generation_stale(self) -> bool:
+        elapsed = time.monotonic() - self.generation_checked
+        return self.generation is None or elapsed > settings.CACHE_GENERATION_SECONDS
+
+    def set_generation(self, generation: int) -> None:
+        # Another process wrote since this cache was filled
+        if self.generation is not None and generation != self.generation:
+            self.clear()
+        self.generation = generation
+        self.generation_checked = time.monotonic()
+
+
+def get_cache(name: str, **kwargs: Any) -> TTLCache:
+    if name not in __caches:
+        __caches[name] = TTLCache(name, **kwargs)
+    return __caches[name]
+
+
+def get_caches() -> list[TTLCache]:
+    return list(__caches.values())
@@ -13,30 +13,87 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import base64
+import json
 import re
-from typing import Iterable
+from datetime import date
+from typing import Any, Iterable
 
 from sqlalchemy import ColumnExpressionArgument, and_, or_
 from sqlalchemy.orm import Mapped
 
+# For URLs versioned by a content hash, which never change meaning
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# For any other URL, whose content may change, revalidated through its ETag
+REVALIDATE_CACHE_CONTROL = "no-cache"
 
-def get_search_expressions(
-    search: str, col: Mapped[str]
-) -> Iterable[ColumnExpressionArgument[bool]]:
+
+def get_cache_control(content_hash: str, version: str | None) -> str:
+    if version == content_hash:
+        return IMMUTABLE_CACHE_CONTROL
+    return REVALIDATE_CACHE_CONTROL
+
+
+def get_search_tokens(search: str) -> tuple[list[str], list[str]]:
     tokens: list[str] = re.findall(r"-?\"[^\"]+\"|-?'[^']+'|\S+", search)
-    positive_clauses = []
-    negative_clauses = []
+    positive_tokens = []
+    negative_tokens = []
     for token in tokens:
         negative = token.startswith("-")
         token_unquoted = token.strip("-'\"")
         if not token_unquoted:
             continue
-        clause = col.ilike(f"%{token_unquoted}%")
         if negative:
-            negative_clauses.append(~clause)
+            negative_tokens.append(token_unquoted)
         else:
-            positive_clauses.append(clause)
+            positive_tokens.append(token_unquoted)
+    return positive_tokens, negative_tokens
+
+
+def get_search_expressions(
+    search: str, col: Mapped[str]
+) -> Iterable[ColumnExpressionArgument[bool]]:
+    # ILIKE '%token%' can be served by the pg_trgm GIN indexes on names
+    positive_tokens, negative_tokens = get_search_tokens(search)
+    positive_clauses = [col.ilike(f"%{token}%") for token in positive_tokens]
+    negative_clauses = [~col.ilike(f"%{token}%") for token in negative_tokens]
     if positive_clauses:
         yield or_(*positive_clauses)
     if negative_clauses:
         yield and_(*negative_clauses)
+
+
+def encode_cursor(order_by: str, value: Any, id: int) -> str:
+    # NULL sort values are kept as null, the next page starts after them
+    data = json.dumps([order_by, None if value is None else str(value), id])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor: str, order_bys: Iterable[str]) -> tuple[str, str | None, int]:
+    # Cursors come from clients, anything unexpected is a ValueError
+    try:
+        order_by, value, id = json.loads(base64.urlsafe_b64decode(cursor))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Malformed cursor {cursor!r}") from e
+    if order_by not in order_bys:
+        raise ValueError(f"Cursor for unknown order {order_by!r}")
+    if not isinstance(value, str | None) or not isinstance(id, int):
+        raise ValueError(f"Malformed cursor {cursor!r}")
+    return order_by, value, id
+
+
+def parse_cursor_value(value: str, python_type: type) -> Any:
+    if python_type is date:
+        return date.fromisoformat(value)
+    try:
+        return python_type(value)
+    except ArithmeticError as e:
+        # Decimal signals a bad literal with InvalidOperation
+        raise ValueError(f"Invalid cursor value {value!r}") from e
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    etags = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return "*" in etags or etag in etags
@@ -14,27 +14,120 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import threading
+from collections import OrderedDict, defaultdict
 from datetime import date
 from decimal import Decimal
 
-import requests_cache
+import requests
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.exchangerate import ExchangeRate
 
 OPEN_EXCHANGE_RATES_ID = os.environ["OPEN_EXCHANGE_RATES_ID"]
 BASE_URL = "https://openexchangerates.org/api"
+REQUEST_TIMEOUT_SECONDS = 10
+CACHE_SIZE = 1024
+
+# Historical rates never change, so they are kept in-process per date
+__rates: OrderedDict[date, dict[str, Decimal]] = OrderedDict()
+__rates_lock = threading.Lock()
+
+
+def __get_cached_rates(timestamp: date) -> dict[str, Decimal] | None:
+    with __rates_lock:
+        rates = __rates.get(timestamp)
+        if rates is not None:
+            __rates.move_to_end(timestamp)
+        return rates
+
+
+def __cache_rates(timestamp: date, rates: dict[str, Decimal]) -> None:
+    with __rates_lock:
+        __rates[timestamp] = rates
+        __rates.move_to_end(timestamp)
+        while len(__rates) > CACHE_SIZE:
+            __rates.popitem(last=False)
+
+
+def __fetch_rates(timestamp: date) -> dict[str, Decimal]:
+    api_url = f"{BASE_URL}/historical/{timestamp.isoformat()}.json?app_id={OPEN_EXCHANGE_RATES_ID}"
+    response = requests.get(api_url, timeout=REQUEST_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    data = response.json(parse_float=Decimal)
+    return {currency: Decimal(rate) for currency, rate in data["rates"].items()}
+
+
+def __store_rates(db: Session, timestamp: date, rates: dict[str, Decimal]) -> None:
+    try:
+        with db.begin_nested():
+            db.execute(
+                insert(ExchangeRate),
+                [
+                    {"timestamp": timestamp, "currency_code": currency, "rate": rate}
+                    for currency, rate in rates.items()
+                ],
+            )
+    except IntegrityError:
+        # Already stored by a concurrent request
+        pass
+
+
+def __load_rates(db: Session, timestamps: set[date]) -> dict[date, dict[str, Decimal]]:
+    rates: dict[date, dict[str, Decimal]] = {}
+    missing_timestamps = set()
+    for timestamp in timestamps:
+        cached_rates = __get_cached_rates(timestamp)
+        if cached_rates is None:
+            missing_timestamps.add(timestamp)
+        else:
+            rates[timestamp] = cached_rates
+    if not missing_timestamps:
+        return rates
+
+    stored_rates: dict[date, dict[str, Decimal]] = defaultdict(dict)
+    statement = select(
+        ExchangeRate.timestamp, ExchangeRate.currency_code, ExchangeRate.rate
+    ).where(ExchangeRate.timestamp.in_(missing_timestamps))
+    for row in db.execute(statement):
+        stored_rates[row.timestamp][row.currency_code] = row.rate
+
+    for timestamp in missing_timestamps:
+        if timestamp not in stored_rates:
+            stored_rates[timestamp] = __fetch_rates(timestamp)
+            __store_rates(db, timestamp, stored_rates[timestamp])
+        __cache_rates(timestamp, stored_rates[timestamp])
+        rates[timestamp] = stored_rates[timestamp]
+    return rates
+
 
+def get_exchange_rates(
+    db: Session, pairs_by_date: dict[date, set[tuple[str, str]]]
+) -> dict[tuple[date, str, str], Decimal]:
+    timestamps = {
+        timestamp
+        for timestamp, pairs in pairs_by_date.items()
+        if any(from_currency != to_currency for from_currency, to_currency in pairs)
+    }
+    rates = __load_rates(db, timestamps)
 
-def get_exchange_rate(from_currency: str, to_currency: str, date: date) -> Decimal:
-    if from_currency == to_currency:
-        return Decimal(1)
+    exchange_rates = {}
+    for timestamp, pairs in pairs_by_date.items():
+        for from_currency, to_currency in pairs:
+            if from_currency == to_currency:
+                exchange_rate = Decimal(1)
+            else:
+                from_rate = rates[timestamp][from_currency]
+                to_rate = rates[timestamp][to_currency]
+                exchange_rate = to_rate / from_rate
+            exchange_rates[(timestamp, from_currency, to_currency)] = exchange_rate
+    return exchange_rates
 
-    api_url = (
-        f"{BASE_URL}/historical/{date.isoformat()}.json?app_id={OPEN_EXCHANGE_RATES_ID}"
-    )
 
-    with requests_cache.CachedSession(expire_after=None) as session:
-        response = session.get(api_url)
-        response.raise_for_status()
-        data = response.json()
-        from_rate = Decimal(data["rates"][from_currency])
-        to_rate = Decimal(data["rates"][to_currency])
-        return to_rate / from_rate
+def get_exchange_rate(
+    db: Session, from_currency: str, to_currency: str, date: date
+) -> Decimal:
+    exchange_rates = get_exchange_rates(db, {date: {(from_currency, to_currency)}})
+    return exchange_rates[(date, from_currency, to_currency)]
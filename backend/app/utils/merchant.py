@@ -0,0 +1,45 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+from typing import Iterable
+
+
+class MerchantMatcher:
+    def __init__(self, patterns: Iterable[tuple[int, str]]) -> None:
+        # Merchants are tried in id order, the first one that matches wins
+        self.patterns = [(id, re.compile(pattern)) for id, pattern in sorted(patterns)]
+        self.prefilter = self.__get_prefilter()
+
+    def __get_prefilter(self) -> re.Pattern[str] | None:
+        # A single alternation of every pattern discards names that match no
+        # merchant in one scan; patterns with groups could break backreferences
+        if not self.patterns or any(p.groups for _, p in self.patterns):
+            return None
+        try:
+            return re.compile("|".join(f"(?:{p.pattern})" for _, p in self.patterns))
+        except re.error:
+            return None
+
+    def match(self, name: str) -> int | None:
+        if self.prefilter and not self.prefilter.search(name):
+            return None
+        for id, pattern in self.patterns:
+            if pattern.search(name):
+                return id
+        return None
+
+    def match_many(self, names: Iterable[str]) -> dict[str, int | None]:
+        return {name: self.match(name) for name in set(names)}
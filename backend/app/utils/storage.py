@@ -0,0 +1,152 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import IO, Any, Callable, Iterable, Iterator
+
+from app.settings import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class Storage(ABC):
+    # Content-addressed: blobs are keyed by the sha256 of their content,
+    # so identical uploads share a single blob
+    @abstractmethod
+    def put(
+        self, chunks: Iterable[bytes], lock: Callable[[str], Any] = lambda key: None
+    ) -> tuple[str, int]:
+        # lock is called with the key once known, before the blob is written
+        ...
+
+    @abstractmethod
+    def open(self, key: str) -> Iterator[bytes]:
+        # Opens the blob before returning, a missing one raises
+        # FileNotFoundError here rather than once the chunks are iterated
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+
+class LocalStorage(Storage):
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __get_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key[2:4], key)
+
+    def put(
+        self, chunks: Iterable[bytes], lock: Callable[[str], Any] = lambda key: None
+    ) -> tuple[str, int]:
+        os.makedirs(self.path, exist_ok=True)
+        hash = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=self.path, delete=False) as f:
+            try:
+                for chunk in chunks:
+                    hash.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            except BaseException:
+                os.remove(f.name)
+                raise
+        key = hash.hexdigest()
+        path = self.__get_path(key)
+        try:
+            lock(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(f.name, path)
+        except BaseException:
+            os.remove(f.name)
+            raise
+        return key, size
+
+    def open(self, key: str) -> Iterator[bytes]:
+        f = open(self.__get_path(key), "rb")
+        return close_after(iter_chunks(f), f.close)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.__get_path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage(Storage):
+    def __init__(self, bucket: str, endpoint_url: str | None = None) -> None:
+        # Optional dependency, only needed when this backend is configured
+        import boto3
+
+        self.bucket = bucket
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def put(
+        self, chunks: Iterable[bytes], lock: Callable[[str], Any] = lambda key: None
+    ) -> tuple[str, int]:
+        # The key is only known at the end, so spool the upload first
+        hash = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE) as f:
+            for chunk in chunks:
+                hash.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+            f.seek(0)
+            key = hash.hexdigest()
+            lock(key)
+            self.client.upload_fileobj(f, self.bucket, key)
+        return key, size
+
+    def open(self, key: str) -> Iterator[bytes]:
+        try:
+            response: dict[str, Any] = self.client.get_object(
+                Bucket=self.bucket, Key=key
+            )
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+        body = response["Body"]
+        return close_after(body.iter_chunks(CHUNK_SIZE), body.close)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+@lru_cache
+def get_storage() -> Storage:
+    match settings.STORAGE_BACKEND:
+        case "s3":
+            return S3Storage(settings.S3_BUCKET, settings.S3_ENDPOINT_URL)
+        case _:
+            return LocalStorage(settings.STORAGE_PATH)
+
+
+def iter_chunks(file: IO[bytes]) -> Iterator[bytes]:
+    while chunk := file.read(CHUNK_SIZE):
+        yield chunk
+
+
+def close_after(chunks: Iterator[bytes], close: Callable[[], Any]) -> Iterator[bytes]:
+    try:
+        yield from chunks
+    finally:
+        close()
@@ -14,52 +14,101 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import csv
+import hashlib
+import io
 
 # imports for exec
 import datetime  # noqa
 import decimal  # noqa
 import re
-from typing import Iterable, BinaryIO
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, TextIO
 
+from app.schemas.common import compile_code_snippet
 from app.schemas.transaction import TransactionApiIn
 from app.schemas.transactiondeserialiser import TransactionDeserialiserApiOut
 
+CHUNK_ROWS = 1000
+
+Deserialisers = dict[str, Callable[[list[str]], Any]]
+
+__deserialisers: dict[int, tuple[str, Deserialisers]] = {}
+
 
 def __sanitise_row(row: list[str]) -> None:
     for i in range(len(row)):
         row[i] = re.sub(r"[\s\t]+", " ", row[i]).strip()
 
 
-def __get_transactions_from_csv(
+def __get_reader(
+    deserialiser_out: TransactionDeserialiserApiOut, file: TextIO
+) -> Iterator[list[str]]:
+    # readline rather than iterating the file, which would disable file.tell()
+    lines = iter(file.readline, "")
+    return csv.reader(lines, delimiter=deserialiser_out.delimiter)
+
+
+def __skip_rows(deserialiser_out: TransactionDeserialiserApiOut, file: TextIO) -> None:
+    reader = __get_reader(deserialiser_out, file)
+    for _ in range(deserialiser_out.skip_rows):
+        next(reader, None)
+
+
+def __read_rows(
+    deserialiser_out: TransactionDeserialiserApiOut, file: TextIO
+) -> Iterator[list[str]]:
+    for row in __get_reader(deserialiser_out, file):
+        if len(row) != deserialiser_out.columns:
+            return
+        yield row
+
+
+def __get_snippets(deserialiser_out: TransactionDeserialiserApiOut) -> dict[str, str]:
+    return {
+        field.replace("_deserialiser", ""): snippet
+        for field, snippet in vars(deserialiser_out).items()
+        if "_deserialiser" in field
+    }
+
+
+def __get_deserialisers(
+    deserialiser_out: TransactionDeserialiserApiOut,
+) -> Deserialisers:
+    snippets = __get_snippets(deserialiser_out)
+    content_hash = hashlib.sha256(repr(sorted(snippets.items())).encode()).hexdigest()
+    cached = __deserialisers.get(deserialiser_out.id)
+    if cached and cached[0] == content_hash:
+        return cached[1]
+    deserializers = {}
+    for field_name, snippet in snippets.items():
+        namespace: dict[str, Any] = {}
+        exec(compile_code_snippet(snippet), globals(), namespace)
+        deserializers[field_name] = namespace["deserialize_field"]
+    __deserialisers[deserialiser_out.id] = content_hash, deserializers
+    return deserializers
+
+
+def invalidate_deserialisers(id: int) -> None:
+    __deserialisers.pop(id, None)
+
+
+def __get_row_deserialiser(
     deserialiser_out: TransactionDeserialiserApiOut,
-    file: BinaryIO,
     account_id: int,
     bucket_id: int,
-) -> Iterable[TransactionApiIn]:
-    deserializers = {}
-    for field, value in vars(deserialiser_out).items():
-        if "_deserialiser" not in field:
-            continue
-        field_name = field.replace("_deserialiser", "")
-        function_name = f"deserialize_{field_name}"
-        snippet = getattr(deserialiser_out, field)
-        exec(f"def {function_name}(row): return {snippet}")
-        deserializers[field_name] = locals()[function_name]
-    text_file = file.read().decode(encoding=deserialiser_out.encoding).splitlines()
-    reader = csv.reader(text_file, delimiter=deserialiser_out.delimiter)
-    for _ in range(deserialiser_out.skip_rows):
-        next(reader)
-    for row in reader:
-        if len(row) != deserialiser_out.columns:
-            break
+) -> Callable[[list[str]], TransactionApiIn]:
+    deserializers = __get_deserialisers(deserialiser_out)
+
+    def deserialise(row: list[str]) -> TransactionApiIn:
         __sanitise_row(row)
-        deserialized_row = {
+        deserialized_row: dict[str, Any] = {
             field: deserializer(row) for field, deserializer in deserializers.items()
         }
         deserialized_row["account_id"] = account_id
         deserialized_row["bucket_id"] = bucket_id
-        instance = TransactionApiIn(**deserialized_row)
-        yield instance
+        return TransactionApiIn(**deserialized_row)
+
+    return deserialise
 
 
 def get_transactions_from_csv(
@@ -68,18 +117,33 @@ def get_transactions_from_csv(
     account_id: int,
     bucket_id: int,
 ) -> Iterable[TransactionApiIn]:
-    ts = [
-        t
-        for t in __get_transactions_from_csv(
-            deserialiser_out, file, account_id, bucket_id
-        )
-    ]
-    # Return first old and then recent
-    if deserialiser_out.ascending_timestamp:
-        # transactions in the CSV are sorted from old to recent (ascending), no need to reverse
-        for t in ts:
-            yield t
-    else:
-        # transactions in the CSV are sorted from recent to old (descending), need to reverse
-        for t in ts[::-1]:
-            yield t
+    deserialise = __get_row_deserialiser(deserialiser_out, account_id, bucket_id)
+    # newline="" leaves \r, \n and \r\n line endings to the csv reader
+    text_file = io.TextIOWrapper(file, encoding=deserialiser_out.encoding, newline="")
+    try:
+        __skip_rows(deserialiser_out, text_file)
+        rows = __read_rows(deserialiser_out, text_file)
+        # Return first old and then recent
+        if deserialiser_out.ascending_timestamp:
+            # transactions in the CSV are sorted from old to recent (ascending), no need to reverse
+            for row in rows:
+                yield deserialise(row)
+        else:
+            # transactions in the CSV are sorted from recent to old (descending), need to reverse:
+            # remember where each chunk of rows starts and read the chunks back from the end.
+            # The positions are tell() cookies, valid to seek to whatever the encoding
+            chunks: list[tuple[int, int]] = []
+            while True:
+                position = text_file.tell()
+                n = sum(1 for _ in islice(rows, CHUNK_ROWS))
+                if not n:
+                    break
+                chunks.append((position, n))
+            for position, n in reversed(chunks):
+                text_file.seek(position)
+                chunk = list(islice(__read_rows(deserialiser_out, text_file), n))
+                for row in reversed(chunk):
+                    yield deserialise(row)
+    finally:
+        # The upload's file is closed by its owner
+        text_file.detach()
@@ -0,0 +1,209 @@
+# Copyright (C) 2024 Alexandre Amat
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import signal
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from sqlalchemy import and_, exists, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+# let SQLAlchemy see the base first, so all the models are loaded
+from app.database.base import Base  # noqa
+from app.database.deps import get_db, use_background_statement_timeout
+from app.jobs import tasks
+from app.models.job import Job
+from app.settings import settings
+
+POLL_INTERVAL = 1.0
+RETRY_DELAY = timedelta(seconds=30)
+HEARTBEAT_INTERVAL = timedelta(minutes=1)
+STALE_TIMEOUT = timedelta(minutes=10)
+CLAIM_LOCK_ID = 0x6A6F62
+
+logger = logging.getLogger(__name__)
+
+
+def claim_job(db: Session) -> Job | None:
+    # Claims are serialised so that concurrency limits and per-key
+    # deduplication see every running job
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(CLAIM_LOCK_ID)))
+    now = datetime.now(timezone.utc)
+
+    # Requeue the jobs of workers that died while running them, unless an
+    # equivalent job is queued already: that one will do the work
+    is_stale = and_(Job.status == Job.RUNNING, Job.heartbeat < now - STALE_TIMEOUT)
+    queued_job = aliased(Job)
+    has_queued_job = exists().where(
+        queued_job.status == Job.QUEUED, queued_job.dedup_key == Job.dedup_key
+    )
+    statement = (
+        update(Job)
+        .where(is_stale, ~has_queued_job)
+        .values(status=Job.QUEUED, updated=now)
+    )
+    db.execute(statement)
+    statement = (
+        update(Job)
+        .where(is_stale)
+        .values(status=Job.FAILED, error="Interrupted", updated=now)
+    )
+    db.execute(statement)
+
+    running = db.execute(
+        select(Job.name, Job.dedup_key).where(Job.status == Job.RUNNING)
+    ).all()
+    running_count = Counter(name for name, _ in running)
+    available_names = [
+        name for name, task in tasks.items() if running_count[name] < task.concurrency
+    ]
+    running_dedup_keys = [dedup_key for _, dedup_key in running if dedup_key]
+
+    job_statement = (
+        select(Job)
+        .where(
+            Job.status == Job.QUEUED,
+            Job.run_after <= now,
+            Job.name.in_(available_names),
+            or_(Job.dedup_key.is_(None), Job.dedup_key.not_in(running_dedup_keys)),
+        )
+        .order_by(Job.run_after, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = db.scalars(job_statement).first()
+    if job:
+        Job.update(
+            db, job.id, status=Job.RUNNING, attempts=job.attempts + 1, heartbeat=now
+        )
+    return job
+
+
+@contextmanager
+def send_heartbeats(job_id: int) -> Iterator[None]:
+    # Independent of the progress reports, which may be far apart
+    stop = threading.Event()
+
+    def send() -> None:
+        while not stop.wait(HEARTBEAT_INTERVAL.total_seconds()):
+            try:
+                for db in get_db():
+                    statement = (
+                        update(Job)
+                        .where(Job.id == job_id)
+                        .values(heartbeat=datetime.now(timezone.utc))
+                    )
+                    db.execute(statement)
+            except Exception as e:
+                logger.error("An error occurred while sending a heartbeat: %s", e)
+
+    thread = threading.Thread(target=send, name=f"heartbeat-{job_id}")
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job_id: int) -> None:
+    for db in get_db():
+        job = Job.read(db, id__eq=job_id)
+        name, args, attempts = job.name, job.args, job.attempts
+    task = tasks[name]
+    logger.info("Doing job %s: %s(%s).", job_id, name, args)
+    try:
+        with send_heartbeats(job_id):
+            for db in get_db():
+
+                def report_progress(progress: int, total: int) -> None:
+                    Job.update(db, job_id, progress=progress, total=total)
+                    db.commit()
+
+                task.function(db, report_progress, **args)
+    except Exception as e:
+        logger.error("An unexpected error occurred while doing job %s: %s", job_id, e)
+        for db in get_db():
+            retry_job(db, job_id, attempts < task.max_attempts, attempts, str(e))
+        return
+    for db in get_db():
+        Job.update(db, job_id, status=Job.FINISHED)
+    logger.info("Done job %s.", job_id)
+
+
+def retry_job(db: Session, id: int, retry: bool, attempts: int, error: str) -> None:
+    if retry:
+        run_after = datetime.now(timezone.utc) + RETRY_DELAY * 2 ** (attempts - 1)
+        try:
+            with db.begin_nested():
+                Job.update(db, id, status=Job.QUEUED, run_after=run_after, error=error)
+            return
+        except IntegrityError:
+            # An equivalent job was queued meanwhile and will do the work
+            pass
+    Job.update(db, id, status=Job.FAILED, error=error)
+
+
+def work(stop: threading.Event) -> None:
+    while not stop.is_set():
+        job_id = None
+        try:
+            for db in get_db():
+                if job := claim_job(db):
+                    job_id = job.id
+        except Exception as e:
+            logger.error("An error occurred while claiming a job: %s", e)
+        if job_id is None:
+            stop.wait(POLL_INTERVAL)
+            continue
+        run_job(job_id)
+
+
+def main() -> None:
+    use_background_statement_timeout()
+    stop = threading.Event()
+
+    def handle_signal(signum: int, frame: Any) -> None:
+        logger.info("Stopping after the running jobs...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    threads = [
+        threading.Thread(target=work, args=(stop,), name=f"worker-{i}")
+        for i in range(settings.WORKER_THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    logger.info("Started %s worker threads.", len(threads))
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s %(asctime)s - %(threadName)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        force=True,
+    )
+    main()
@@ -1716,7 +1716,7 @@ export type CategoryApiOut = {
   id: number;
   is_synced: boolean;
   name: string;
-  icon_base64: Blob;
+  icon_url: string;
 };
 export type InstitutionApiOut = {
   id: number;
@@ -1725,7 +1725,7 @@ export type InstitutionApiOut = {
   country_code: string;
   url: string | null;
   colour?: string | null;
-  logo_base64?: string | null;
+  logo_url?: string | null;
   transaction_deserialiser_id: number | null;
   replacement_pattern_id: number | null;
 };
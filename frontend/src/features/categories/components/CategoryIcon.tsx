@@ -12,7 +12,7 @@ export function CategoryIcon(props: { categoryId: number }) {
   return (
     <Image
       style={{ height: "90%", width: "auto", alignSelf: "center" }}
-      src={`data:image/png;base64,${query.data.icon_base64}`}
+      src={`${process.env.REACT_APP_BASE_URL}${query.data.icon_url}`}
     />
   );
 }
@@ -23,7 +23,7 @@ export function useCategoryOptions() {
       key: c.id,
       value: c.id,
       text: c.name,
-      image: <Image src={`data:image/png;base64,${c.icon_base64}`} />,
+      image: <Image src={`${process.env.REACT_APP_BASE_URL}${c.icon_url}`} />,
     })) || [];
   return { options, query };
 }
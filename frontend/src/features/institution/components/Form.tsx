@@ -69,7 +69,15 @@ export default function InstitutionForm(props: {
     transactionDeserialiserId.set(
       props.institution.transaction_deserialiser_id || undefined,
     );
-    logoBase64.set(props.institution.logo_base64 || "");
+    if (props.institution.logo_url)
+      fetch(`${process.env.REACT_APP_BASE_URL}${props.institution.logo_url}`)
+        .then((response) => response.blob())
+        .then((blob) => {
+          const reader = new FileReader();
+          reader.onload = () =>
+            logoBase64.set((reader.result as string).split(",")[1]);
+          reader.readAsDataURL(blob);
+        });
   }, [props.institution]);
 
   const handleClose = () => {
@@ -30,13 +30,13 @@ export function InstitutionLogo(props: {
       </Placeholder>
     );
 
-  if (props.institution?.logo_base64 !== undefined)
+  if (props.institution?.logo_url)
     return (
       <Image
         centered
         floated={props.floated}
         style={{ height: "auto", ...props.style }}
-        src={`data:image/png;base64,${props.institution.logo_base64}`}
+        src={`${process.env.REACT_APP_BASE_URL}${props.institution.logo_url}`}
       />
     );
 
@@ -24,7 +24,9 @@ export function useInstitutionOptions() {
       key: institution.id,
       value: institution.id,
       text: institution.name,
-      image: `data:image/png;base64,${institution.logo_base64}`,
+      image: institution.logo_url
+        ? `${process.env.REACT_APP_BASE_URL}${institution.logo_url}`
+        : undefined,
     })) || [];
 
   return {